@@ -0,0 +1,61 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+Count the configuration files (config, clouds.config) parsed while running commands.
+
+Every config parser read is counted from the moment the CLI is imported, so reads done at
+import time are included in the first command.
+
+Usage: python -m automation.benchmark.config_reads [cloud list] [--repeat 3]
+"""
+
+from __future__ import print_function
+
+import argparse
+import collections
+import os
+import shlex
+
+from six.moves import configparser  # pylint: disable=import-error
+
+DEFAULT_COMMANDS = ['cloud list', 'cloud show', 'account list']
+
+
+def _count_reads(reads):
+    original_read = configparser.RawConfigParser.read
+
+    def _read(self, filenames, *args, **kwargs):
+        for filename in [filenames] if isinstance(filenames, str) else filenames:
+            reads[os.path.basename(filename)] += 1
+        return original_read(self, filenames, *args, **kwargs)
+
+    configparser.RawConfigParser.read = _read
+
+
+def run_benchmark(commands, repeat):
+    reads = collections.Counter()
+    _count_reads(reads)
+
+    from azure.cli.main import main as cli_main
+    with open(os.devnull, 'w') as devnull:
+        for command in commands:
+            for i in range(repeat):
+                try:
+                    cli_main(shlex.split(command), file=devnull)
+                except SystemExit:
+                    pass
+                print('az {:<30} run {}: {} config file reads {}'.format(
+                    command, i + 1, sum(reads.values()), dict(reads)))
+                reads.clear()
+
+
+if __name__ == '__main__':
+    parse = argparse.ArgumentParser('Count the config files read while running commands.')
+    parse.add_argument('commands', nargs='*', default=DEFAULT_COMMANDS,
+                       help='The commands to run, each a single quoted string without "az".')
+    parse.add_argument('--repeat', type=int, default=2, help='Number of runs for each command.')
+    args = parse.parse_args()
+    run_benchmark(args.commands, args.repeat)
@@ -0,0 +1,65 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+Measure the time a leaf command spends in logging when --debug is off.
+
+The workload replays what the application does for a single command: the application events
+raised with the command table and a batch of debug and info log calls. It is timed once with
+logging configured as for a normal command and once with logging disabled altogether; the
+difference is the logging overhead.
+
+Usage: python -m automation.benchmark.logging_overhead [--module storage] [--repeat 20]
+"""
+
+from __future__ import print_function
+
+import argparse
+import logging
+import timeit
+
+LOG_CALLS_PER_COMMAND = 200
+
+
+def _run_command_workload(application, command_table, logger):
+    application.raise_event(application.COMMAND_TABLE_LOADED, command_table=command_table)
+    application.raise_event(application.COMMAND_TABLE_PARAMS_LOADED, command_table=command_table)
+    for i in range(LOG_CALLS_PER_COMMAND):
+        logger.debug('Debug message %s with data %s', i, command_table)
+        logger.info('Info message %s', i)
+
+
+def run_benchmark(module, repeat):
+    import azure.cli.core.azlogging as azlogging
+    from azure.cli.core.application import APPLICATION, Configuration
+
+    azlogging.configure_logging([])
+    logger = azlogging.get_az_logger(__name__)
+    command_table = Configuration([module]).get_command_table()
+
+    def _time_workload():
+        return min(timeit.repeat(lambda: _run_command_workload(APPLICATION, command_table, logger),
+                                 number=1, repeat=repeat))
+
+    enabled = _time_workload()
+    logging.disable(logging.CRITICAL)
+    try:
+        disabled = _time_workload()
+    finally:
+        logging.disable(logging.NOTSET)
+
+    print('Commands loaded:             {}'.format(len(command_table)))
+    print('Logging configured (no -d):  {:.3f} ms'.format(enabled * 1000))
+    print('Logging disabled:            {:.3f} ms'.format(disabled * 1000))
+    print('Logging overhead:            {:.3f} ms'.format((enabled - disabled) * 1000))
+
+
+if __name__ == '__main__':
+    parse = argparse.ArgumentParser('Measure the logging overhead of a command with debug off.')
+    parse.add_argument('--module', default='storage',
+                       help='The command module whose command table is used in the events.')
+    parse.add_argument('--repeat', type=int, default=20, help='Number of timed runs.')
+    args = parse.parse_args()
+    run_benchmark(args.module, args.repeat)
@@ -28,12 +28,58 @@ def get_config_parser():
         return configparser.SafeConfigParser()
 
 
+class ConfigFileCache(object):
+    """ Parsed config files shared by everything in the process that reads them. A file is only
+    parsed again when its modification time or size changes, or after it is invalidated. Parsers
+    returned are shared and must be treated as read-only unless the caller writes the file back
+    and invalidates it. """
+
+    def __init__(self):
+        self._entries = {}
+        self.read_count = 0
+
+    @staticmethod
+    def _get_file_version(path):
+        try:
+            st = os.stat(path)
+            return st.st_mtime, st.st_size
+        except OSError:
+            return None
+
+    def get(self, path):
+        version = ConfigFileCache._get_file_version(path)
+        entry = self._entries.get(path)
+        if entry and entry[0] == version:
+            return entry[1]
+        config = get_config_parser()
+        config.read(path)
+        self.read_count += 1
+        self._entries[path] = (version, config)
+        return config
+
+    def invalidate(self, path=None):
+        if path:
+            self._entries.pop(path, None)
+        else:
+            self._entries.clear()
+
+
+config_file_cache = ConfigFileCache()
+
+
 class AzConfig(object):
     _BOOLEAN_STATES = {'1': True, 'yes': True, 'true': True, 'on': True,
                        '0': False, 'no': False, 'false': False, 'off': False}
 
-    def __init__(self):
-        self.config_parser = get_config_parser()
+    def __init__(self, config_path=None):
+        self._config_path = config_path
+        self._config_parser = None if config_path else get_config_parser()
+
+    @property
+    def config_parser(self):
+        if self._config_path:
+            return config_file_cache.get(self._config_path)
+        return self._config_parser
 
     @staticmethod
     def env_var_name(section, option):
@@ -68,8 +114,7 @@ class AzConfig(object):
         return AzConfig._BOOLEAN_STATES[val.lower()]  # pylint: disable=E1101
 
 
-az_config = AzConfig()
-az_config.config_parser.read(GLOBAL_CONFIG_PATH)
+az_config = AzConfig(GLOBAL_CONFIG_PATH)
 
 
 def set_global_config(config):
@@ -79,7 +124,7 @@ def set_global_config(config):
         config.write(configfile)
     os.chmod(GLOBAL_CONFIG_PATH, stat.S_IRUSR | stat.S_IWUSR)
     # reload az_config
-    az_config.config_parser.read(GLOBAL_CONFIG_PATH)
+    config_file_cache.invalidate(GLOBAL_CONFIG_PATH)
 
 
 def set_global_config_value(section, option, value):
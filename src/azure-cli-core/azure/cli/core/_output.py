@@ -11,6 +11,7 @@ import platform
 import json
 import traceback
 from collections import OrderedDict
+from types import GeneratorType
 from six import StringIO, text_type, u, string_types
 import colorama
 from tabulate import tabulate
@@ -43,6 +44,18 @@ def format_json(obj):
                       separators=(',', ': ')) + '\n'
 
 
+def format_json_stream(obj):
+    """ Yield the JSON of a list produced item by item, as the items come. Joined, the chunks
+    are what format_json prints for the whole list. """
+    empty = True
+    for item in obj.result:
+        item_json = json.dumps(item, indent=2, sort_keys=True, cls=ComplexEncoder,
+                               separators=(',', ': '))
+        yield ('[\n' if empty else ',\n') + '  ' + item_json.replace('\n', '\n  ')
+        empty = False
+    yield '[]\n' if empty else '\n]\n'
+
+
 def format_json_color(obj):
     from pygments import highlight, lexers, formatters
     return highlight(format_json(obj), lexers.JsonLexer(), formatters.TerminalFormatter())  # pylint: disable=no-member
@@ -83,6 +96,11 @@ def format_tsv(obj):
     return TsvOutput.dump(result_list)
 
 
+def format_tsv_stream(obj):
+    for item in obj.result:
+        yield TsvOutput.dump([item])
+
+
 class CommandResultItem(object):  # pylint: disable=too-few-public-methods
 
     def __init__(self, result, table_transformer=None, is_query_active=False):
@@ -101,6 +119,13 @@ class OutputProducer(object):  # pylint: disable=too-few-public-methods
         'tsv': format_tsv,
     }
 
+    # the formats that can print a result produced item by item as the items come, the others
+    # lay out the whole result at once
+    stream_format_dict = {
+        format_json: format_json_stream,
+        format_tsv: format_tsv_stream,
+    }
+
     def __init__(self, formatter, file=sys.stdout):  # pylint: disable=redefined-builtin
         self.formatter = formatter
         self.file = file
@@ -108,17 +133,28 @@ class OutputProducer(object):  # pylint: disable=too-few-public-methods
     def out(self, obj):
         if platform.system() == 'Windows':
             self.file = colorama.AnsiToWin32(self.file).stream
-        output = self.formatter(obj)
+        if isinstance(obj.result, GeneratorType):
+            stream_formatter = OutputProducer.stream_format_dict.get(self.formatter)
+            if stream_formatter:
+                for output in stream_formatter(obj):
+                    if not self._print(output):
+                        return
+                return
+            obj.result = list(obj.result)
+        self._print(self.formatter(obj))
+
+    def _print(self, output):
+        """ Print the output, returns False if the reader of the output went away. """
         try:
             print(output, file=self.file, end='')
         except IOError as ex:
             if ex.errno == errno.EPIPE:
-                pass
-            else:
-                raise
+                return False
+            raise
         except UnicodeEncodeError:
             print(output.encode('ascii', 'ignore').decode('utf-8', 'ignore'),
                   file=self.file, end='')
+        return True
 
     @staticmethod
     def get_formatter(format_type):
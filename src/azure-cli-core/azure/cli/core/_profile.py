@@ -9,6 +9,7 @@ import collections
 import errno
 import json
 import os.path
+import threading
 from pprint import pformat
 from copy import deepcopy
 from enum import Enum
@@ -20,6 +21,7 @@ from azure.cli.core._session import ACCOUNT
 from azure.cli.core._util import CLIError, get_file_json
 from azure.cli.core.adal_authentication import AdalAuthentication
 from azure.cli.core.cloud import get_active_cloud, set_cloud_subscription
+from azure.cli.core.token_prefetch import token_prefetcher
 
 logger = azlogging.get_az_logger(__name__)
 
@@ -65,11 +67,30 @@ def _authentication_context_factory(authority, cache):
 
 _AUTH_CTX_FACTORY = _authentication_context_factory
 
-CLOUD = get_active_cloud()
+# the token file is rewritten in place, which must not interleave with reading it when the token
+# is acquired on a background thread (see token_prefetch)
+_TOKEN_FILE_LOCK = threading.Lock()
 
-logger.debug("Current active cloud '%s'", CLOUD.name)
-logger.debug(pformat(vars(CLOUD.endpoints)))
-logger.debug(pformat(vars(CLOUD.suffixes)))
+
+class _ActiveCloud(object):
+    """ Stands in for the active cloud, which is looked up when its attributes are read rather than
+    when this module is imported, so it follows the config files as the command being run sees
+    them. The config files are cached, so the lookup doesn't parse them again. """
+
+    def __init__(self):
+        self._logged_name = None
+
+    def __getattr__(self, name):
+        cloud = get_active_cloud()
+        if cloud.name != self._logged_name:
+            self._logged_name = cloud.name
+            logger.debug("Current active cloud '%s'", cloud.name)
+            logger.debug(pformat(vars(cloud.endpoints)))
+            logger.debug(pformat(vars(cloud.suffixes)))
+        return getattr(cloud, name)
+
+
+CLOUD = _ActiveCloud()
 
 
 def get_authority_url(tenant=None):
@@ -260,19 +281,13 @@ class Profile(object):
             raise CLIError("Please run 'az account set' to select active account.")
         return result[0]
 
-    def get_login_credentials(self, resource=CLOUD.endpoints.management,
-                              subscription_id=None):
+    def get_login_credentials(self, resource=None, subscription_id=None):
+        resource = resource or CLOUD.endpoints.management
         account = self.get_subscription(subscription_id)
-        user_type = account[_USER_ENTITY][_USER_TYPE]
-        username_or_sp_id = account[_USER_ENTITY][_USER_NAME]
+        token_key = Profile._get_token_key(account, resource)
 
         def _retrieve_token():
-            if user_type == _USER:
-                return self._creds_cache.retrieve_token_for_user(username_or_sp_id,
-                                                                 account[_TENANT_ID], resource)
-            else:
-                return self._creds_cache.retrieve_token_for_service_principal(username_or_sp_id,
-                                                                              resource)
+            return token_prefetcher.get(token_key) or self._retrieve_token(account, resource)
 
         auth_object = AdalAuthentication(_retrieve_token)
 
@@ -280,6 +295,26 @@ class Profile(object):
                 str(account[_SUBSCRIPTION_ID]),
                 str(account[_TENANT_ID]))
 
+    def acquire_login_token(self, resource=None, subscription_id=None):
+        """ Acquires the token get_login_credentials would use right away. Returns the key
+        identifying the token together with the token. """
+        resource = resource or CLOUD.endpoints.management
+        account = self.get_subscription(subscription_id)
+        return Profile._get_token_key(account, resource), self._retrieve_token(account, resource)
+
+    @staticmethod
+    def _get_token_key(account, resource):
+        return (account[_USER_ENTITY][_USER_NAME], account[_TENANT_ID], resource)
+
+    def _retrieve_token(self, account, resource):
+        username_or_sp_id = account[_USER_ENTITY][_USER_NAME]
+        if account[_USER_ENTITY][_USER_TYPE] == _USER:
+            return self._creds_cache.retrieve_token_for_user(username_or_sp_id,
+                                                             account[_TENANT_ID], resource)
+        else:
+            return self._creds_cache.retrieve_token_for_service_principal(username_or_sp_id,
+                                                                          resource)
+
     # per ask from java sdk
     def get_expanded_subscription_info(self, subscription_id=None, name=None, password=None):
         account = self.get_subscription(subscription_id)
@@ -432,18 +467,19 @@ class CredsCache(object):
         self._load_creds()
 
     def persist_cached_creds(self):
-        with os.fdopen(os.open(self._token_file, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600),
-                       'w+') as cred_file:
-            items = self.adal_token_cache.read_items()
-            all_creds = [entry for _, entry in items]
+        with _TOKEN_FILE_LOCK:
+            with os.fdopen(os.open(self._token_file, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600),
+                           'w+') as cred_file:
+                items = self.adal_token_cache.read_items()
+                all_creds = [entry for _, entry in items]
 
-            # trim away useless fields (needed for cred sharing with xplat)
-            for i in all_creds:
-                for key in TOKEN_FIELDS_EXCLUDED_FROM_PERSISTENCE:
-                    i.pop(key, None)
+                # trim away useless fields (needed for cred sharing with xplat)
+                for i in all_creds:
+                    for key in TOKEN_FIELDS_EXCLUDED_FROM_PERSISTENCE:
+                        i.pop(key, None)
 
-            all_creds.extend(self._service_principal_creds)
-            cred_file.write(json.dumps(all_creds))
+                all_creds.extend(self._service_principal_creds)
+                cred_file.write(json.dumps(all_creds))
 
         self.adal_token_cache.has_state_changed = False
 
@@ -480,7 +516,8 @@ class CredsCache(object):
     def _load_creds(self):
         if self.adal_token_cache is not None:
             return self.adal_token_cache
-        all_entries = _load_tokens_from_file(self._token_file)
+        with _TOKEN_FILE_LOCK:
+            all_entries = _load_tokens_from_file(self._token_file)
         self._load_service_principal_creds(all_entries)
         real_token = [x for x in all_entries if x not in self._service_principal_creds]
         self.adal_token_cache = adal.TokenCache(json.dumps(real_token))
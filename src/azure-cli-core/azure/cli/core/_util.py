@@ -11,6 +11,7 @@ import base64
 import binascii
 from datetime import datetime, timedelta
 from enum import Enum
+from types import GeneratorType
 
 import six
 import azure.cli.core.azlogging as azlogging
@@ -135,6 +136,8 @@ def todict(obj):  # pylint: disable=too-many-return-statements
         return {k: todict(v) for (k, v) in obj.items()}
     elif isinstance(obj, list):
         return [todict(a) for a in obj]
+    elif isinstance(obj, GeneratorType):
+        return (todict(a) for a in obj)
     elif isinstance(obj, Enum):
         return obj.value
     elif isinstance(obj, datetime):
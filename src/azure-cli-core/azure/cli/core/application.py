@@ -4,10 +4,12 @@
 # --------------------------------------------------------------------------------------------
 
 from collections import defaultdict
+from types import GeneratorType
 import sys
 import os
 import uuid
 import argparse
+import logging
 from azure.cli.core.parser import AzCliCommandParser, enable_autocomplete
 from azure.cli.core._output import CommandResultItem
 import azure.cli.core.extensions
@@ -118,6 +120,11 @@ class Application(object):
             nouns.append(noun)
         command = ' '.join(nouns)
 
+        if command in command_table and argv[-1] not in ('--help', '-h') \
+                and not self.session['completer_active']:
+            from azure.cli.core.token_prefetch import prefetch_login_token
+            prefetch_login_token(command_table[command])
+
         if argv[-1] in ('--help', '-h') or command in command_table:
             self.configuration.load_params(command)
             self.raise_event(self.COMMAND_TABLE_PARAMS_LOADED, command_table=command_table)
@@ -160,20 +167,39 @@ class Application(object):
 
         if len(results) == 1:
             results = results[0]
+        else:
+            results = [list(r) if isinstance(r, GeneratorType) else r for r in results]
+
+        if isinstance(results, GeneratorType) and self.session['query_active']:
+            # a query needs the whole result
+            results = list(results)
 
-        event_data = {'result': results}
-        self.raise_event(self.TRANSFORM_RESULT, event_data=event_data)
+        if isinstance(results, GeneratorType):
+            # a result produced item by item is transformed and printed item by item
+            event_data = {'result': self._transform_items(results)}
+        else:
+            event_data = {'result': results}
+            self.raise_event(self.TRANSFORM_RESULT, event_data=event_data)
         self.raise_event(self.FILTER_RESULT, event_data=event_data)
 
         return CommandResultItem(event_data['result'],
                                  table_transformer=command_table[args.command].table_transformer,
                                  is_query_active=self.session['query_active'])
 
+    def _transform_items(self, items):
+        for item in items:
+            event_data = {'result': item}
+            self.raise_event(self.TRANSFORM_RESULT, event_data=event_data)
+            yield event_data['result']
+
     def raise_event(self, name, **kwargs):
         '''Raise the event `name`.
         '''
-        data = truncate_text(str(kwargs), width=500)
-        logger.debug("Application event '%s' with event data %s", name, data)
+        if logger.isEnabledFor(logging.DEBUG):
+            # Stringifying the event data can be costly (e.g. the whole command table) so it is
+            # only done when debug logging is on.
+            logger.debug("Application event '%s' with event data %s", name,
+                         truncate_text(str(kwargs), width=500))
         for func in list(self._event_handlers[name]):  # Make copy in case handler modifies the list
             func(**kwargs)
 
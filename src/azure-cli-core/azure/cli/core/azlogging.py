@@ -9,6 +9,13 @@ import logging
 from logging.handlers import RotatingFileHandler
 
 import colorama
+from six.moves import queue
+
+try:
+    from logging.handlers import QueueHandler, QueueListener
+except ImportError:
+    # Python 2 doesn't have queue handlers, the file handler is then used synchronously.
+    QueueHandler = QueueListener = None
 
 from azure.cli.core._environment import get_config_dir
 from azure.cli.core._config import az_config
@@ -114,6 +121,36 @@ class CustomStreamHandler(logging.StreamHandler):
         return msg
 
 
+def _get_async_handler(target_handler):
+    """ Wrap target_handler so that records are handed off to a background thread which does the
+    actual I/O, keeping file writes and rollover checks off the command's thread. """
+    if QueueHandler is None:
+        return target_handler
+
+    log_queue = queue.Queue(-1)
+    listener = QueueListener(log_queue, target_handler)
+    handler = _ListenerQueueHandler(log_queue, listener)
+    handler.setLevel(target_handler.level)
+    listener.start()
+    return handler
+
+
+if QueueHandler is not None:
+    class _ListenerQueueHandler(QueueHandler):
+        """ A QueueHandler which owns the listener draining its queue. Closing the handler, which
+        logging.shutdown does on exit, flushes the pending records to the target handler. """
+
+        def __init__(self, log_queue, listener):
+            QueueHandler.__init__(self, log_queue)
+            self.listener = listener
+
+        def close(self):
+            if self.listener:
+                self.listener.stop()
+                self.listener = None
+            QueueHandler.close(self)
+
+
 def _init_console_handlers(root_logger, az_logger, log_level_config):
     root_logger.addHandler(CustomStreamHandler(log_level_config['root'],
                                                CONSOLE_LOG_FORMAT['root']))
@@ -135,8 +172,17 @@ def _init_logfile_handlers(root_logger, az_logger):
     lfmt = logging.Formatter('%(process)d : %(asctime)s : %(levelname)s : %(name)s : %(message)s')
     logfile_handler.setFormatter(lfmt)
     logfile_handler.setLevel(logging.DEBUG)
-    root_logger.addHandler(logfile_handler)
-    az_logger.addHandler(logfile_handler)
+    async_handler = _get_async_handler(logfile_handler)
+    root_logger.addHandler(async_handler)
+    az_logger.addHandler(async_handler)
+
+
+def _get_logger_levels(log_level_config):
+    # The loggers are set to the lowest level any of their handlers emits, so records that no
+    # handler would output are discarded by the logger before they are created and formatted.
+    if ENABLE_LOG_FILE:
+        return logging.DEBUG, logging.DEBUG
+    return log_level_config['root'], log_level_config['az']
 
 
 def configure_logging(argv):
@@ -145,10 +191,9 @@ def configure_logging(argv):
 
     root_logger = logging.getLogger()
     az_logger = logging.getLogger('az')
-    # Set the levels of the loggers to lowest level.
-    # Handlers can override by choosing a higher level.
-    root_logger.setLevel(logging.DEBUG)
-    az_logger.setLevel(logging.DEBUG)
+    root_level, az_level = _get_logger_levels(log_level_config)
+    root_logger.setLevel(root_level)
+    az_logger.setLevel(az_level)
     az_logger.propagate = False
 
     if len(root_logger.handlers) and len(az_logger.handlers):
@@ -8,7 +8,8 @@ from six.moves import configparser
 
 import azure.cli.core.azlogging as azlogging
 from azure.cli.core._config import \
-    (GLOBAL_CONFIG_DIR, GLOBAL_CONFIG_PATH, set_global_config_value, get_config_parser)
+    (GLOBAL_CONFIG_DIR, GLOBAL_CONFIG_PATH, set_global_config_value, get_config_parser,
+     config_file_cache)
 from azure.cli.core._util import CLIError
 
 CLOUD_CONFIG_FILE = os.path.join(GLOBAL_CONFIG_DIR, 'clouds.config')
@@ -188,8 +189,7 @@ def _set_active_cloud(cloud_name):
 
 
 def get_active_cloud_name():
-    global_config = get_config_parser()
-    global_config.read(GLOBAL_CONFIG_PATH)
+    global_config = config_file_cache.get(GLOBAL_CONFIG_PATH)
     try:
         return global_config.get('cloud', 'name')
     except (configparser.NoOptionError, configparser.NoSectionError):
@@ -207,8 +207,7 @@ def get_custom_clouds():
 
 
 def _init_known_clouds():
-    config = get_config_parser()
-    config.read(CLOUD_CONFIG_FILE)
+    config = config_file_cache.get(CLOUD_CONFIG_FILE)
     stored_cloud_names = config.sections()
     for c in KNOWN_CLOUDS:
         if c.name not in stored_cloud_names:
@@ -219,9 +218,8 @@ def get_clouds():
     # ensure the known clouds are always in cloud config
     _init_known_clouds()
     clouds = []
-    # load the config again as it may have changed
-    config = get_config_parser()
-    config.read(CLOUD_CONFIG_FILE)
+    # get the config again as it may have changed
+    config = config_file_cache.get(CLOUD_CONFIG_FILE)
     for section in config.sections():
         c = Cloud(section)
         for option in config.options(section):
@@ -250,8 +248,7 @@ def get_active_cloud():
 
 
 def get_cloud_subscription(cloud_name):
-    config = get_config_parser()
-    config.read(CLOUD_CONFIG_FILE)
+    config = config_file_cache.get(CLOUD_CONFIG_FILE)
     try:
         return config.get(cloud_name, 'subscription')
     except (configparser.NoOptionError, configparser.NoSectionError):
@@ -267,10 +264,7 @@ def set_cloud_subscription(cloud_name, subscription):
         config.set(cloud_name, 'subscription', subscription)
     else:
         config.remove_option(cloud_name, 'subscription')
-    if not os.path.isdir(GLOBAL_CONFIG_DIR):
-        os.makedirs(GLOBAL_CONFIG_DIR)
-    with open(CLOUD_CONFIG_FILE, 'w') as configfile:
-        config.write(configfile)
+    _write_cloud_config(config)
 
 
 def _set_active_subscription(cloud_name):
@@ -306,6 +300,14 @@ def switch_active_cloud(cloud_name):
     _set_active_subscription(cloud_name)
 
 
+def _write_cloud_config(config):
+    if not os.path.isdir(GLOBAL_CONFIG_DIR):
+        os.makedirs(GLOBAL_CONFIG_DIR)
+    with open(CLOUD_CONFIG_FILE, 'w') as configfile:
+        config.write(configfile)
+    config_file_cache.invalidate(CLOUD_CONFIG_FILE)
+
+
 def _save_cloud(cloud, overwrite=False):
     config = get_config_parser()
     config.read(CLOUD_CONFIG_FILE)
@@ -320,10 +322,7 @@ def _save_cloud(cloud, overwrite=False):
     for k, v in cloud.suffixes.__dict__.items():
         if v is not None:
             config.set(cloud.name, 'suffix_{}'.format(k), v)
-    if not os.path.isdir(GLOBAL_CONFIG_DIR):
-        os.makedirs(GLOBAL_CONFIG_DIR)
-    with open(CLOUD_CONFIG_FILE, 'w') as configfile:
-        config.write(configfile)
+    _write_cloud_config(config)
 
 
 def add_cloud(cloud):
@@ -351,5 +350,4 @@ def remove_cloud(cloud_name):
     config = get_config_parser()
     config.read(CLOUD_CONFIG_FILE)
     config.remove_section(cloud_name)
-    with open(CLOUD_CONFIG_FILE, 'w') as configfile:
-        config.write(configfile)
+    _write_cloud_config(config)
@@ -183,7 +183,7 @@ class CliCommand(object):  # pylint:disable=too-many-instance-attributes
 
     def __init__(self, name, handler, description=None, table_transformer=None,
                  arguments_loader=None, description_loader=None,
-                 formatter_class=None):
+                 formatter_class=None, needs_login_token=False):
         self.name = name
         self.handler = handler
         self.help = None
@@ -194,6 +194,9 @@ class CliCommand(object):  # pylint:disable=too-many-instance-attributes
         self.arguments_loader = arguments_loader
         self.table_transformer = table_transformer
         self.formatter_class = formatter_class
+        # whether the command calls the resource manager with the logged in account, so that its
+        # token is worth acquiring in the background while the command loads
+        self.needs_login_token = needs_login_token
 
     @staticmethod
     def _should_load_description():
@@ -322,7 +325,7 @@ def cli_command(module_name, name, operation,
     command_table[name] = create_command(module_name, name, operation, transform, table_transformer,
                                          client_factory, no_wait_param, confirmation=confirmation,
                                          exception_handler=exception_handler,
-                                         formatter_class=formatter_class)
+                                         formatter_class=formatter_class, needs_login_token=True)
 
 
 def get_op_handler(operation):
@@ -340,7 +343,7 @@ def get_op_handler(operation):
 def create_command(module_name, name, operation,
                    transform_result, table_transformer, client_factory,
                    no_wait_param=None, confirmation=None, exception_handler=None,
-                   formatter_class=None):
+                   formatter_class=None, needs_login_token=False):
     if not isinstance(operation, string_types):
         raise ValueError("Operation must be a string. Got '{}'".format(operation))
 
@@ -412,7 +415,7 @@ def create_command(module_name, name, operation,
 
     cmd = CliCommand(name, _execute_command, table_transformer=table_transformer,
                      arguments_loader=arguments_loader, description_loader=description_loader,
-                     formatter_class=formatter_class)
+                     formatter_class=formatter_class, needs_login_token=needs_login_token)
     if confirmation:
         cmd.add_argument(CONFIRM_PARAM_NAME, '--yes', '-y',
                          action='store_true',
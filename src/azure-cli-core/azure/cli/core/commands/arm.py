@@ -334,7 +334,7 @@ def cli_generic_update_command(module_name, name, getter_op, setter_op, factory=
             namespace.ordered_arguments.append((option_string, values))
 
     cmd = CliCommand(name, handler, table_transformer=table_transformer,
-                     arguments_loader=arguments_loader)
+                     arguments_loader=arguments_loader, needs_login_token=True)
     group_name = 'Generic Update'
     cmd.add_argument('properties_to_set', '--set', nargs='+', action=OrderedArgsAction, default=[],
                      help='Update an object by specifying a property path and value to set.'
@@ -426,7 +426,7 @@ def cli_generic_wait_command(module_name, name, getter_op, factory=None):
 
         return CLIError('Wait operation timed-out after {} seconds'.format(timeout))
 
-    cmd = CliCommand(name, handler, arguments_loader=arguments_loader)
+    cmd = CliCommand(name, handler, arguments_loader=arguments_loader, needs_login_token=True)
     group_name = 'Wait Condition'
     cmd.add_argument('timeout', '--timeout', default=3600, arg_group=group_name, type=int,
                      help='maximum wait in seconds')
@@ -0,0 +1,151 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+Resource group metadata (location, tags and provisioning state) shared by all command modules.
+
+Looking up the location of a resource group costs an ARM round-trip, which create commands
+used to pay once per lookup. The metadata is kept per subscription in a JSON file under the
+config directory for a short time so that lookups within a command, and across commands run
+in quick succession, are served locally.
+"""
+
+import os
+import time
+
+import azure.cli.core.azlogging as azlogging
+from azure.cli.core._environment import get_config_dir
+from azure.cli.core._session import Session
+
+logger = azlogging.get_az_logger(__name__)
+
+RESOURCE_GROUP_CACHE_FILE_NAME = 'resourceGroups.json'
+DEFAULT_RESOURCE_GROUP_CACHE_TTL = 300
+
+_LOCATION = 'location'
+_TAGS = 'tags'
+_PROVISIONING_STATE = 'provisioningState'
+_EXPIRES_ON = 'expiresOn'
+
+
+class ResourceGroupCache(object):
+    """ Resource group metadata keyed by subscription id and resource group name, persisted in a
+    JSON file. Entries older than ttl seconds are treated as missing and dropped on save. """
+
+    def __init__(self, filename, ttl=DEFAULT_RESOURCE_GROUP_CACHE_TTL):
+        self.filename = filename
+        self.ttl = ttl
+        self._session = None
+
+    def _get_session(self):
+        if self._session is None:
+            self._session = Session()
+            try:
+                self._session.load(self.filename)
+            except ValueError:
+                # corrupted cache file, start over
+                logger.debug("Discarding unreadable resource group cache '%s'", self.filename)
+                self._session.data = {}
+                self._session.save()
+        return self._session
+
+    def get(self, subscription_id, resource_group_name):
+        if self.ttl <= 0:
+            return None
+        subscription = self._get_session().get(subscription_id.lower()) or {}
+        entry = subscription.get(resource_group_name.lower())
+        if not entry or entry.get(_EXPIRES_ON, 0) < time.time():
+            return None
+        return {k: v for k, v in entry.items() if k != _EXPIRES_ON}
+
+    def set(self, subscription_id, resource_group):
+        metadata = _get_metadata(resource_group)
+        if self.ttl <= 0:
+            return metadata
+        entry = dict(metadata)
+        entry[_EXPIRES_ON] = time.time() + self.ttl
+        session = self._get_session()
+        subscription = session.get(subscription_id.lower()) or {}
+        subscription[resource_group.name.lower()] = entry
+        session.data[subscription_id.lower()] = subscription
+        self._save()
+        return metadata
+
+    def remove(self, subscription_id, resource_group_name):
+        session = self._get_session()
+        subscription = session.get(subscription_id.lower()) or {}
+        if subscription.pop(resource_group_name.lower(), None):
+            self._save()
+
+    def _save(self):
+        session = self._get_session()
+        now = time.time()
+        for subscription_id in list(session.data):
+            subscription = {name: entry for name, entry in session.data[subscription_id].items()
+                            if entry.get(_EXPIRES_ON, 0) >= now}
+            if subscription:
+                session.data[subscription_id] = subscription
+            else:
+                del session.data[subscription_id]
+        try:
+            session.save_with_retry()
+        except (OSError, IOError) as ex:
+            logger.debug('Unable to save the resource group cache: %s', ex)
+
+
+def _get_metadata(resource_group):
+    properties = getattr(resource_group, 'properties', None)
+    return {
+        _LOCATION: resource_group.location,
+        _TAGS: resource_group.tags or {},
+        _PROVISIONING_STATE: getattr(properties, 'provisioning_state', None)
+    }
+
+
+_resource_group_cache = None
+
+
+def _get_resource_group_cache():
+    global _resource_group_cache  # pylint: disable=global-statement
+    if _resource_group_cache is None:
+        from azure.cli.core._config import az_config
+        ttl = az_config.getint('core', 'resource_group_cache_ttl',
+                               fallback=DEFAULT_RESOURCE_GROUP_CACHE_TTL)
+        _resource_group_cache = ResourceGroupCache(
+            os.path.join(get_config_dir(), RESOURCE_GROUP_CACHE_FILE_NAME), ttl)
+    return _resource_group_cache
+
+
+def get_resource_group_metadata(resource_group_name, subscription_id=None):
+    """ Returns a dict with the location, tags and provisioningState of the resource group. The
+    resource group is only retrieved from ARM if it isn't cached or its entry has expired. """
+    from azure.cli.core.commands.client_factory import get_subscription_id
+    subscription_id = subscription_id or get_subscription_id()
+    cache = _get_resource_group_cache()
+    metadata = cache.get(subscription_id, resource_group_name)
+    if metadata:
+        return metadata
+
+    from azure.mgmt.resource.resources import ResourceManagementClient
+    from azure.cli.core.commands.client_factory import get_mgmt_service_client
+    client = get_mgmt_service_client(ResourceManagementClient, subscription_id=subscription_id)
+    resource_group = client.resource_groups.get(resource_group_name)
+    return cache.set(subscription_id, resource_group)
+
+
+def get_resource_group_location(resource_group_name, subscription_id=None):
+    return get_resource_group_metadata(resource_group_name, subscription_id)[_LOCATION]
+
+
+def update_resource_group_cache(resource_group, subscription_id=None):
+    """ Record a resource group returned by ARM, e.g. after it was created or updated. """
+    from azure.cli.core.commands.client_factory import get_subscription_id
+    _get_resource_group_cache().set(subscription_id or get_subscription_id(), resource_group)
+
+
+def invalidate_resource_group_cache(resource_group_name, subscription_id=None):
+    from azure.cli.core.commands.client_factory import get_subscription_id
+    _get_resource_group_cache().remove(subscription_id or get_subscription_id(),
+                                       resource_group_name)
@@ -0,0 +1,218 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+Storage account lookups (resource group, endpoints and keys) shared by all command modules.
+
+Commands given only the name of a storage account used to list every storage account in the
+subscription to find its resource group and then ask ARM for its keys, every time they ran. The
+result of a lookup is kept per subscription under the config directory for a short time. As the
+entries hold account keys, the cache file and a separate file with the key it is encrypted with
+are only readable by the current user, and nothing is cached if the encryption isn't available.
+
+The encryption only hides the account keys from casual reading, e.g. of a config directory copied
+or attached to a bug report along with the cache file but not its key file. The key has the same
+access control as the cache, so anyone who can read one can read the other and decrypt the
+account keys, much like the access tokens kept in the same directory. Set
+storage_account_cache_ttl to 0 in the [core] section of the config to keep no account keys on disk.
+"""
+
+import json
+import os
+import threading
+import time
+
+import azure.cli.core.azlogging as azlogging
+from azure.cli.core._environment import get_config_dir
+
+logger = azlogging.get_az_logger(__name__)
+
+STORAGE_ACCOUNT_CACHE_FILE_NAME = 'storageAccounts.cache'
+STORAGE_ACCOUNT_CACHE_KEY_FILE_NAME = 'storageAccounts.key'
+DEFAULT_STORAGE_ACCOUNT_CACHE_TTL = 900
+
+STORAGE_ACCOUNT_TYPE = 'Microsoft.Storage/storageAccounts'
+
+_RESOURCE_GROUP = 'resourceGroup'
+_ENDPOINTS = 'endpoints'
+_KEYS = 'keys'
+_EXPIRES_ON = 'expiresOn'
+
+
+class StorageAccountCache(object):
+    """ The resource group, primary endpoints and keys of storage accounts keyed by subscription id
+    and account name, persisted in an encrypted file. Entries older than ttl seconds are treated as
+    missing and dropped on save. The accounts may be looked up from several threads at once. """
+
+    def __init__(self, filename, key_filename, ttl=DEFAULT_STORAGE_ACCOUNT_CACHE_TTL):
+        self.filename = filename
+        self.key_filename = key_filename
+        self.ttl = ttl
+        self._data = None
+        self._cipher = None
+        self._lock = threading.RLock()
+
+    def _get_cipher(self):
+        if self._cipher is None:
+            from cryptography.fernet import Fernet
+            try:
+                with open(self.key_filename, 'rb') as f:
+                    self._cipher = Fernet(f.read().strip())
+            except (OSError, IOError, ValueError):
+                # no key yet or an invalid one, whatever was encrypted with it can't be read
+                key = Fernet.generate_key()
+                try:
+                    _write_private_file(self.key_filename, key)
+                except (OSError, IOError) as ex:
+                    logger.debug('Unable to save the storage account cache key: %s', ex)
+                self._cipher = Fernet(key)
+        return self._cipher
+
+    def _get_data(self):
+        if self._data is None:
+            from cryptography.fernet import InvalidToken
+            self._data = {}
+            try:
+                with open(self.filename, 'rb') as f:
+                    token = f.read()
+                self._data = json.loads(self._get_cipher().decrypt(token).decode('utf-8'))
+            except (OSError, IOError):
+                pass
+            except (InvalidToken, ValueError):
+                # corrupted cache file or lost key, start over
+                logger.debug("Discarding unreadable storage account cache '%s'", self.filename)
+        return self._data
+
+    def get(self, subscription_id, account_name):
+        if self.ttl <= 0:
+            return None
+        with self._lock:
+            subscription = self._get_data().get(subscription_id.lower()) or {}
+            entry = subscription.get(account_name.lower())
+        if not entry or entry.get(_EXPIRES_ON, 0) < time.time():
+            return None
+        return {k: v for k, v in entry.items() if k != _EXPIRES_ON}
+
+    def set(self, subscription_id, account_name, info):
+        if self.ttl <= 0:
+            return info
+        entry = dict(info)
+        entry[_EXPIRES_ON] = time.time() + self.ttl
+        with self._lock:
+            data = self._get_data()
+            data.setdefault(subscription_id.lower(), {})[account_name.lower()] = entry
+            self._save()
+        return info
+
+    def remove(self, subscription_id, account_name):
+        with self._lock:
+            subscription = self._get_data().get(subscription_id.lower()) or {}
+            if subscription.pop(account_name.lower(), None):
+                self._save()
+
+    def _save(self):
+        data = self._get_data()
+        now = time.time()
+        for subscription_id in list(data):
+            subscription = {name: entry for name, entry in data[subscription_id].items()
+                            if entry.get(_EXPIRES_ON, 0) >= now}
+            if subscription:
+                data[subscription_id] = subscription
+            else:
+                del data[subscription_id]
+        try:
+            token = self._get_cipher().encrypt(json.dumps(data).encode('utf-8'))
+            _write_private_file(self.filename, token)
+        except (OSError, IOError) as ex:
+            logger.debug('Unable to save the storage account cache: %s', ex)
+
+
+def _write_private_file(filename, content):
+    """ Write a file only the current user can read. """
+    temp_filename = '{}.{}.tmp'.format(filename, os.getpid())
+    fd = os.open(temp_filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(content)
+    if os.path.exists(filename):
+        os.remove(filename)
+    os.rename(temp_filename, filename)
+
+
+def _get_info(resource_group_name, account, keys):
+    endpoints = account.primary_endpoints
+    return {
+        _RESOURCE_GROUP: resource_group_name,
+        _ENDPOINTS: {name: getattr(endpoints, name, None)
+                     for name in ('blob', 'queue', 'table', 'file')} if endpoints else {},
+        _KEYS: [k.value for k in keys.keys]
+    }
+
+
+_storage_account_cache = None
+
+
+def _get_storage_account_cache():
+    global _storage_account_cache  # pylint: disable=global-statement
+    if _storage_account_cache is None:
+        from azure.cli.core._config import az_config
+        ttl = az_config.getint('core', 'storage_account_cache_ttl',
+                               fallback=DEFAULT_STORAGE_ACCOUNT_CACHE_TTL)
+        try:
+            import cryptography.fernet  # pylint: disable=unused-import
+        except ImportError:
+            logger.debug('cryptography is not available, storage accounts are not cached')
+            ttl = 0
+        _storage_account_cache = StorageAccountCache(
+            os.path.join(get_config_dir(), STORAGE_ACCOUNT_CACHE_FILE_NAME),
+            os.path.join(get_config_dir(), STORAGE_ACCOUNT_CACHE_KEY_FILE_NAME), ttl)
+    return _storage_account_cache
+
+
+def get_storage_account_info(account_name, subscription_id=None, resource_group_name=None):
+    """ Returns a dict with the resourceGroup, the primary endpoints by service and the keys of a
+    storage account, or None if the subscription has no storage account with that name. ARM is
+    only queried if the account isn't cached or its entry has expired, and the account isn't
+    searched for when its resource group is known. """
+    from azure.cli.core.commands.client_factory import get_subscription_id
+    subscription_id = subscription_id or get_subscription_id()
+    cache = _get_storage_account_cache()
+    info = cache.get(subscription_id, account_name)
+    if info:
+        return info
+
+    from azure.mgmt.resource.resources import ResourceManagementClient
+    from azure.mgmt.storage import StorageManagementClient
+    from azure.cli.core.commands.arm import parse_resource_id
+    from azure.cli.core.commands.client_factory import get_mgmt_service_client
+
+    # a filtered query rather than listing every storage account of the subscription
+    if not resource_group_name:
+        query = "name eq '{}' and resourceType eq '{}'".format(account_name,
+                                                               STORAGE_ACCOUNT_TYPE)
+        client = get_mgmt_service_client(ResourceManagementClient,
+                                         subscription_id=subscription_id)
+        resource = next(iter(client.resources.list(filter=query)), None)
+        if resource is None:
+            return None
+        resource_group_name = parse_resource_id(resource.id)['resource_group']
+        account_name = resource.name
+
+    client = get_mgmt_service_client(StorageManagementClient, subscription_id=subscription_id)
+    account = client.storage_accounts.get_properties(resource_group_name, account_name)
+    keys = client.storage_accounts.list_keys(resource_group_name, account_name)
+    return cache.set(subscription_id, account_name, _get_info(resource_group_name, account, keys))
+
+
+def get_storage_account_key(account_name, subscription_id=None, secondary=False,
+                            resource_group_name=None):
+    """ Returns the primary or secondary key of a storage account, None if it isn't found. """
+    info = get_storage_account_info(account_name, subscription_id, resource_group_name)
+    return info[_KEYS][1 if secondary else 0] if info else None
+
+
+def invalidate_storage_account_cache(account_name, subscription_id=None):
+    """ Forget a storage account, e.g. after it was deleted or its keys were regenerated. """
+    from azure.cli.core.commands.client_factory import get_subscription_id
+    _get_storage_account_cache().remove(subscription_id or get_subscription_id(), account_name)
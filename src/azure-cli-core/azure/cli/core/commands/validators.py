@@ -43,11 +43,8 @@ def generate_deployment_name(namespace):
 
 def get_default_location_from_resource_group(namespace):
     if not namespace.location:
-        from azure.mgmt.resource.resources import ResourceManagementClient
-        from azure.cli.core.commands.client_factory import get_mgmt_service_client
-        resource_client = get_mgmt_service_client(ResourceManagementClient)
-        rg = resource_client.resource_groups.get(namespace.resource_group_name)
-        namespace.location = rg.location  # pylint: disable=no-member
+        from azure.cli.core.commands.resource_group_cache import get_resource_group_location
+        namespace.location = get_resource_group_location(namespace.resource_group_name)
 
 
 SPECIFIED_SENTINEL = '__SET__'
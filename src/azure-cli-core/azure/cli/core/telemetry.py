@@ -206,8 +206,11 @@ def conclude():
 
     payload = _session.generate_payload()
     if payload:
-        import subprocess
-        subprocess.Popen([sys.executable, os.path.realpath(telemetry_core.__file__), payload])
+        spool_dir = _get_spool_dir()
+        telemetry_core.append_to_spool(spool_dir, payload)
+        if telemetry_core.should_upload_spool(spool_dir):
+            import subprocess
+            subprocess.Popen([sys.executable, os.path.realpath(telemetry_core.__file__), spool_dir])
 
 
 @decorators.suppress_all_exceptions(raise_in_diagnostics=True)
@@ -271,6 +274,11 @@ def _get_azure_cli_config():
 
 # internal utility functions
 
+def _get_spool_dir():
+    from azure.cli.core._environment import get_config_dir
+    return os.path.join(get_config_dir(), 'telemetry')
+
+
 @decorators.suppress_all_exceptions(fallback_return=None)
 def _get_core_version():
     from azure.cli.core import __version__ as core_version
@@ -6,12 +6,28 @@
 import os
 import sys
 import json
+import time
 import six
 import azure.cli.core.decorators as decorators
 
 DIAGNOSTICS_TELEMETRY_ENV_NAME = 'AZURE_CLI_DIAGNOSTICS_TELEMETRY'
+TELEMETRY_ENDPOINT_ENV_NAME = 'AZURE_CLI_TELEMETRY_ENDPOINT'
 INSTRUMENTATION_KEY = 'c4395b75-49cc-422c-bc95-c7d51aef5d46'
 
+SPOOL_FILE_NAME = 'telemetry.spool'
+SPOOL_MARKER_FILE_NAME = 'telemetry.lastupload'
+# The spool is uploaded once it grows beyond this size or when the last upload is older than the
+# interval, whichever comes first. Uploads don't start more often than the minimum interval, and
+# after failed uploads, e.g. while offline, both intervals back off up to the maximum interval.
+SPOOL_UPLOAD_THRESHOLD_BYTES = 64 * 1024
+SPOOL_UPLOAD_INTERVAL_SECONDS = 15 * 60
+SPOOL_UPLOAD_MIN_INTERVAL_SECONDS = 60
+SPOOL_UPLOAD_MAX_INTERVAL_SECONDS = 24 * 60 * 60
+# The records which couldn't be uploaded are dropped, oldest first, beyond this size of the spool
+SPOOL_MAX_BYTES = 4 * 1024 * 1024
+# Maximum number of events sent to the service in a single request
+UPLOAD_BATCH_SIZE = 500
+
 
 def in_diagnostic_mode():
     """
@@ -21,23 +37,215 @@ def in_diagnostic_mode():
     return bool(os.environ.get(DIAGNOSTICS_TELEMETRY_ENV_NAME, False))
 
 
-@decorators.suppress_all_exceptions(raise_in_diagnostics=True)
-def upload(data_to_save):
+def append_to_spool(spool_dir, payload):
+    """
+    Append a serialized payload to the telemetry spool as a single line. The spool is written with
+    a single append so that concurrent az processes don't interleave their records.
+    """
+    if not os.path.isdir(spool_dir):
+        os.makedirs(spool_dir)
+    spool_path = os.path.join(spool_dir, SPOOL_FILE_NAME)
+    with open(spool_path, 'a') as spool:
+        spool.write(payload.replace('\n', ' ') + '\n')
+    return spool_path
+
+
+def should_upload_spool(spool_dir):
+    """
+    Return True if the spool is due for upload and mark the upload as started so that other az
+    processes don't schedule the same spool.
+    """
+    spool_path = os.path.join(spool_dir, SPOOL_FILE_NAME)
+    marker_path = os.path.join(spool_dir, SPOOL_MARKER_FILE_NAME)
+    try:
+        spool_size = os.path.getsize(spool_path)
+    except OSError:
+        return False
+
+    try:
+        last_upload = os.path.getmtime(marker_path)
+    except OSError:
+        last_upload = 0
+
+    if spool_size < SPOOL_UPLOAD_THRESHOLD_BYTES:
+        interval = SPOOL_UPLOAD_INTERVAL_SECONDS
+    else:
+        interval = SPOOL_UPLOAD_MIN_INTERVAL_SECONDS
+    interval = min(interval * 2 ** _get_failed_uploads(marker_path),
+                   SPOOL_UPLOAD_MAX_INTERVAL_SECONDS)
+    if not in_diagnostic_mode() and time.time() - last_upload < interval:
+        return False
+
+    with open(marker_path, 'a'):
+        os.utime(marker_path, None)
+    return True
+
+
+def _get_failed_uploads(marker_path):
+    """ Return the number of uploads in a row which failed, as recorded in the marker. """
+    try:
+        with open(marker_path, 'r') as marker:
+            return int(marker.read() or 0)
+    except (OSError, IOError, ValueError):
+        return 0
+
+
+def _record_upload_result(spool_dir, failed):
+    marker_path = os.path.join(spool_dir, SPOOL_MARKER_FILE_NAME)
+    failures = _get_failed_uploads(marker_path)
+    if failed or failures:
+        with open(marker_path, 'w') as marker:
+            marker.write(str(failures + 1) if failed else '')
+
+
+def _claim_spool(spool_dir):
+    """
+    Move the spool aside so that az processes concluding during the upload start a new spool.
+    Returns the path of the claimed spool, or None if there is nothing to claim.
+    """
+    spool_path = os.path.join(spool_dir, SPOOL_FILE_NAME)
+    claimed_path = '{}.{}'.format(spool_path, os.getpid())
+    try:
+        os.rename(spool_path, claimed_path)
+    except OSError:
+        # another uploader claimed the spool first
+        return None
+    return claimed_path
+
+
+def _read_spool(claimed_path):
+    records = []
+    with open(claimed_path, 'r') as spool:
+        for line in spool:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.extend(json.loads(line.replace("'", '"')))
+            except ValueError as err:
+                if in_diagnostic_mode():
+                    sys.stdout.write('{}\n'.format(str(err)))
+                    sys.stdout.write('Raw [{}]\n'.format(line))
+    return records
+
+
+def _return_spool(spool_dir, claimed_path, records):
+    """
+    Put the records of a claimed spool which weren't uploaded back in the spool, with a single
+    append like the records of concluding az processes, and drop the claimed spool. The oldest
+    records are dropped if the spool would grow beyond SPOOL_MAX_BYTES.
+    """
+    spool_path = os.path.join(spool_dir, SPOOL_FILE_NAME)
+    try:
+        budget = SPOOL_MAX_BYTES - os.path.getsize(spool_path)
+    except OSError:
+        budget = SPOOL_MAX_BYTES
+    lines = []
+    for record in reversed(records):
+        line = json.dumps([record]) + '\n'
+        budget -= len(line)
+        if budget < 0:
+            break
+        lines.append(line)
+    if lines:
+        with open(spool_path, 'a') as spool:
+            spool.write(''.join(reversed(lines)))
+    os.remove(claimed_path)
+
+
+class UploadError(Exception):
+    pass
+
+
+class _UnsentEvents(list):
+    """ Stands in for the queue of a sender, which puts the events it fails to send back. """
+    put = list.append
+
+
+def _get_sender_class():
+    from applicationinsights.channel import SynchronousSender
+
+    class _Sender(SynchronousSender):
+        """ A sender raising UploadError when a request fails. The sender of the SDK puts the
+        events back on the queue instead, which the synchronous queue then sends again until
+        it succeeds. """
+
+        def send(self, data_to_send):
+            queue = self._queue
+            self._queue = unsent = _UnsentEvents()
+            try:
+                SynchronousSender.send(self, data_to_send)
+            finally:
+                self._queue = queue
+            if unsent:
+                raise UploadError('Failed to send {} telemetry events'.format(len(unsent)))
+
+    return _Sender
+
+
+def _get_telemetry_client():
     from applicationinsights import TelemetryClient
+    from applicationinsights.channel import TelemetryChannel, SynchronousQueue
     from applicationinsights.exceptions import enable
 
-    client = TelemetryClient(INSTRUMENTATION_KEY)
+    endpoint = os.environ.get(TELEMETRY_ENDPOINT_ENV_NAME, None)
+    sender_class = _get_sender_class()
+    sender = sender_class(endpoint) if endpoint else sender_class()
+    sender.send_buffer_size = UPLOAD_BATCH_SIZE
+    queue = SynchronousQueue(sender)
+    queue.max_queue_length = UPLOAD_BATCH_SIZE
+    client = TelemetryClient(INSTRUMENTATION_KEY, TelemetryChannel(None, queue))
     enable(INSTRUMENTATION_KEY)
+    return client
 
-    if in_diagnostic_mode():
-        sys.stdout.write('Telemetry upload begins\n')
 
+@decorators.suppress_all_exceptions(raise_in_diagnostics=True)
+def upload_spool(spool_dir):
+    """
+    Upload the records of the spool in batches. The claimed spool is only removed once they are
+    sent, if a batch fails, e.g. while offline, the records not sent yet are put back for the next
+    upload, which backs off.
+    """
+    claimed_path = _claim_spool(spool_dir)
+    if not claimed_path:
+        return
+    records = _read_spool(claimed_path)
+    sent = 0
     try:
-        data_to_save = json.loads(data_to_save.replace("'", '"'))
-    except Exception as err:  # pylint: disable=broad-except
-        if in_diagnostic_mode():
-            sys.stdout.write('{}/n'.format(str(err)))
-            sys.stdout.write('Raw [{}]/n'.format(data_to_save))
+        client = _get_telemetry_client()
+        while sent < len(records):
+            batch = records[sent:sent + UPLOAD_BATCH_SIZE]
+            _upload(batch, client)
+            sent += len(batch)
+    except Exception:
+        _return_spool(spool_dir, claimed_path, records[sent:])
+        _record_upload_result(spool_dir, failed=True)
+        raise
+    os.remove(claimed_path)
+    _record_upload_result(spool_dir, failed=False)
+
+
+@decorators.suppress_all_exceptions(raise_in_diagnostics=True)
+def upload(data_to_save):
+    _upload(data_to_save)
+
+
+def _upload(data_to_save, client=None):
+    if not data_to_save:
+        return
+
+    if isinstance(data_to_save, six.string_types):
+        try:
+            data_to_save = json.loads(data_to_save.replace("'", '"'))
+        except Exception as err:  # pylint: disable=broad-except
+            if in_diagnostic_mode():
+                sys.stdout.write('{}/n'.format(str(err)))
+                sys.stdout.write('Raw [{}]/n'.format(data_to_save))
+
+    client = client or _get_telemetry_client()
+
+    if in_diagnostic_mode():
+        sys.stdout.write('Telemetry upload begins\n')
 
     for record in data_to_save:
         name = record['name']
@@ -66,4 +274,4 @@ if __name__ == '__main__':
     # If user doesn't agree to upload telemetry, this scripts won't be executed. The caller should
     # control.
     decorators.is_diagnostics_mode = in_diagnostic_mode
-    upload(sys.argv[1])
+    upload_spool(sys.argv[1])
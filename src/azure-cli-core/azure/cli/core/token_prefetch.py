@@ -0,0 +1,102 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+Acquires the resource manager token of the active account on a background thread.
+
+The token used to be read (and refreshed when expired) by the first request of a command, after
+the command module was imported and the arguments were parsed and validated. Once the command
+is known the token is acquired in the background instead, so that work overlaps with the rest
+of the start up and the first request usually finds the token ready.
+"""
+
+import atexit
+import threading
+import time
+
+import azure.cli.core.azlogging as azlogging
+
+logger = azlogging.get_az_logger(__name__)
+
+# Top level groups whose commands don't call the resource manager with the logged in account
+SKIPPED_COMMAND_GROUPS = ('login', 'logout', 'account', 'cloud', 'configure', 'feedback',
+                          'component')
+
+# adal refreshes a token which expires within 5 minutes, so a token it just returned can be used
+# for a little less than that without looking at its expiry
+PREFETCHED_TOKEN_LIFETIME = 240
+
+# how long a consumer waits for the background acquisition before acquiring the token itself
+PREFETCH_WAIT_TIMEOUT = 60
+
+# how long the exit of the process waits for an acquisition nobody asked for, long enough for a
+# refreshed token to be persisted but not to hang on a stuck refresh
+PREFETCH_EXIT_TIMEOUT = 2
+
+
+class TokenPrefetcher(object):
+    """ Runs one token acquisition on a daemon thread and hands the token to the first consumer
+    asking for the same (user or service principal, tenant, resource). """
+
+    def __init__(self):
+        self._thread = None
+        self._key = None
+        self._token = None
+        self._acquired_at = 0
+
+    def start(self, acquire):
+        """ Starts acquire, a callable returning (key, (token_type, token)), in the background.
+        Only the first call in a process has any effect. """
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._acquire, args=(acquire,))
+        self._thread.daemon = True
+        self._thread.start()
+        # don't let the interpreter kill the thread while it persists a refreshed token
+        atexit.register(self._thread.join, PREFETCH_EXIT_TIMEOUT)
+
+    def _acquire(self, acquire):
+        try:
+            key, token = acquire()
+        except Exception as ex:  # pylint: disable=broad-except
+            # not logged in, expired credentials, no network... the command itself will report
+            # whatever is relevant when it acquires the token
+            logger.debug('Unable to prefetch the access token: %s', ex)
+            return
+        self._key = key
+        self._token = token
+        self._acquired_at = time.time()
+
+    def get(self, key):
+        """ Returns the prefetched (token_type, token) if it was acquired for key and is still
+        fresh, otherwise None. Waits for the acquisition to finish if it is running. """
+        if self._thread is None:
+            return None
+        # waiting also keeps the caller from refreshing the same token concurrently
+        self._thread.join(PREFETCH_WAIT_TIMEOUT)
+        if self._key != key or time.time() - self._acquired_at > PREFETCHED_TOKEN_LIFETIME:
+            return None
+        return self._token
+
+
+token_prefetcher = TokenPrefetcher()
+
+
+def _acquire_login_token():
+    from azure.cli.core._profile import Profile
+    return Profile().acquire_login_token()
+
+
+def prefetch_login_token(command):
+    """ Starts acquiring the resource manager token in the background if the command, a
+    CliCommand, is likely to need it. Only the commands registered as calling the resource manager
+    opt in, data plane commands authenticated otherwise, like those of storage, don't. """
+    from azure.cli.core._config import az_config
+    if not getattr(command, 'needs_login_token', False) or \
+            command.name.split()[0] in SKIPPED_COMMAND_GROUPS or \
+            not az_config.getboolean('core', 'prefetch_token', fallback=True):
+        return
+    logger.debug("Prefetching the access token for '%s'", command.name)
+    token_prefetcher.start(_acquire_login_token)
@@ -60,6 +60,25 @@ class TestApplication(unittest.TestCase):
 
         app.raise_event('other_handler_called', args='secret sauce')
 
+    def test_application_transform_items(self):
+        def handler(**kwargs):
+            kwargs['event_data']['result']['transformed'] = True
+
+        app = Application(Configuration([]))
+        app.register(app.TRANSFORM_RESULT, handler)
+        produced = []
+
+        def _items():
+            for i in range(2):
+                produced.append(i)
+                yield {'index': i}
+
+        items = app._transform_items(_items())  # pylint: disable=protected-access
+        self.assertEqual(next(items), {'index': 0, 'transformed': True})
+        # the items are transformed as they are produced
+        self.assertEqual(produced, [0])
+        self.assertEqual(list(items), [{'index': 1, 'transformed': True}])
+
     def test_list_value_parameter(self):
         hellos = []
 
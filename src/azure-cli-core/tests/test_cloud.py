@@ -15,9 +15,10 @@ from azure.cli.core.cloud import (Cloud,
                                   remove_cloud,
                                   get_active_cloud_name,
                                   AZURE_PUBLIC_CLOUD,
+                                  AZURE_CHINA_CLOUD,
                                   CloudEndpointNotSetException)
 from azure.cli.core._config import get_config_parser
-from azure.cli.core._profile import Profile
+from azure.cli.core._profile import Profile, CLOUD
 
 
 class TestCloud(unittest.TestCase):
@@ -28,6 +29,13 @@ class TestCloud(unittest.TestCase):
             profile = Profile()
             profile.get_login_credentials()
 
+    def test_profile_cloud_follows_active_cloud(self):
+        # the active cloud is looked up when it is used, not when _profile is imported
+        with mock.patch('azure.cli.core._profile.get_active_cloud', lambda: AZURE_PUBLIC_CLOUD):
+            self.assertEqual(CLOUD.name, AZURE_PUBLIC_CLOUD.name)
+        with mock.patch('azure.cli.core._profile.get_active_cloud', lambda: AZURE_CHINA_CLOUD):
+            self.assertEqual(CLOUD.endpoints.management, AZURE_CHINA_CLOUD.endpoints.management)
+
     @mock.patch('azure.cli.core.cloud.get_custom_clouds', lambda: [])
     def test_add_get_delete_custom_cloud(self):
         endpoint_rm = 'http://management.contoso.com'
@@ -13,7 +13,7 @@ import tempfile
 import mock
 
 from azure.cli.core._config import \
-    (CONFIG_FILE_NAME, AzConfig, set_global_config_value, get_config_parser)
+    (CONFIG_FILE_NAME, AzConfig, ConfigFileCache, set_global_config_value, get_config_parser)
 
 
 class TestAzConfig(unittest.TestCase):
@@ -171,5 +171,47 @@ class TestSetConfig(unittest.TestCase):
             self.assertFalse(bool(file_mode & stat.S_IXOTH))
 
 
+class TestConfigFileCache(unittest.TestCase):
+
+    def setUp(self):
+        self.config_dir = tempfile.mkdtemp()
+        self.config_path = os.path.join(self.config_dir, CONFIG_FILE_NAME)
+        self.cache = ConfigFileCache()
+
+    def _write_config(self, value):
+        with open(self.config_path, 'w') as f:
+            f.write('[test_section]\ntest_option = {}\n'.format(value))
+
+    def test_config_file_read_once(self):
+        self._write_config('a_value')
+        for _ in range(5):
+            config = self.cache.get(self.config_path)
+            self.assertEqual(config.get('test_section', 'test_option'), 'a_value')
+        self.assertEqual(self.cache.read_count, 1)
+
+    def test_config_file_read_again_on_change(self):
+        self._write_config('a_value')
+        self.cache.get(self.config_path)
+        self._write_config('another_value')
+        os.utime(self.config_path, (0, 0))
+        config = self.cache.get(self.config_path)
+        self.assertEqual(config.get('test_section', 'test_option'), 'another_value')
+        self.assertEqual(self.cache.read_count, 2)
+
+    def test_config_file_read_again_after_invalidate(self):
+        self._write_config('a_value')
+        self.cache.get(self.config_path)
+        self.cache.invalidate(self.config_path)
+        self.cache.get(self.config_path)
+        self.assertEqual(self.cache.read_count, 2)
+
+    def test_config_file_missing(self):
+        config = self.cache.get(self.config_path)
+        self.assertEqual(config.sections(), [])
+        self._write_config('a_value')
+        config = self.cache.get(self.config_path)
+        self.assertEqual(config.get('test_section', 'test_option'), 'a_value')
+
+
 if __name__ == '__main__':
     unittest.main()
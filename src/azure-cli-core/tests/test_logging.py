@@ -3,7 +3,14 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import logging
+import logging.handlers
 import unittest
+try:
+    import unittest.mock as mock
+except ImportError:
+    import mock
+
 import azure.cli.core.azlogging as azlogging
 
 
@@ -65,6 +72,38 @@ class TestLogging(unittest.TestCase):
         az_module_logger = azlogging.get_az_logger('azure.cli.module')
         self.assertEqual(az_module_logger.name, 'az.azure.cli.module')
 
+    def test_get_logger_levels_default(self):
+        log_level_config = azlogging.CONSOLE_LOG_CONFIGS[0]
+        with mock.patch.object(azlogging, 'ENABLE_LOG_FILE', False):
+            root_level, az_level = azlogging._get_logger_levels(log_level_config)  # pylint: disable=protected-access
+        self.assertEqual(root_level, logging.CRITICAL)
+        self.assertEqual(az_level, logging.WARNING)
+
+    def test_get_logger_levels_log_file(self):
+        log_level_config = azlogging.CONSOLE_LOG_CONFIGS[0]
+        with mock.patch.object(azlogging, 'ENABLE_LOG_FILE', True):
+            root_level, az_level = azlogging._get_logger_levels(log_level_config)  # pylint: disable=protected-access
+        self.assertEqual(root_level, logging.DEBUG)
+        self.assertEqual(az_level, logging.DEBUG)
+
+    def test_async_handler_delivers_records_on_close(self):
+        target = logging.handlers.BufferingHandler(capacity=100)
+        target.setLevel(logging.DEBUG)
+        handler = azlogging._get_async_handler(target)  # pylint: disable=protected-access
+        self.assertEqual(handler.level, logging.DEBUG)
+
+        test_logger = logging.getLogger('test_async_handler')
+        test_logger.setLevel(logging.DEBUG)
+        test_logger.propagate = False
+        test_logger.addHandler(handler)
+        try:
+            test_logger.warning('message %s', 1)
+        finally:
+            test_logger.removeHandler(handler)
+            handler.close()
+
+        self.assertEqual([r.getMessage() for r in target.buffer], ['message 1'])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -177,6 +177,47 @@ qwerty  0b1f6472qwerty         1  0b1f6472
         result = format_tsv(CommandResultItem([obj1, obj2]))
         self.assertEqual(result, '1\t2\n3\t4\n')
 
+    # Streamed output tests
+    def test_out_json_stream(self):
+        items = [{'name': 'a', 'tags': {'x': 1}}, {'name': 'b', 'tags': {}}]
+        output_producer = OutputProducer(formatter=format_json, file=self.io)
+        output_producer.out(CommandResultItem(item for item in items))
+        self.assertEqual(self.io.getvalue(), format_json(CommandResultItem(items)))
+
+    def test_out_json_stream_empty(self):
+        output_producer = OutputProducer(formatter=format_json, file=self.io)
+        output_producer.out(CommandResultItem(item for item in []))
+        self.assertEqual(self.io.getvalue(), '[]\n')
+
+    def test_out_json_stream_prints_as_items_come(self):
+        printed = []
+
+        def _items():
+            for name in ('a', 'b'):
+                printed.append(self.io.getvalue())
+                yield {'name': name}
+
+        output_producer = OutputProducer(formatter=format_json, file=self.io)
+        output_producer.out(CommandResultItem(_items()))
+        # the first item is printed before the second one is produced
+        self.assertEqual(printed[0], '')
+        self.assertIn('"a"', printed[1])
+
+    def test_out_tsv_stream(self):
+        output_producer = OutputProducer(formatter=format_tsv, file=self.io)
+        output_producer.out(CommandResultItem({'a': i, 'b': 'x'} for i in range(3)))
+        self.assertEqual(self.io.getvalue(), '0\tx\n1\tx\n2\tx\n')
+
+    def test_out_table_stream(self):
+        output_producer = OutputProducer(formatter=format_table, file=self.io)
+        output_producer.out(CommandResultItem({'name': n} for n in ('a', 'bb')))
+        self.assertEqual(util.normalize_newlines(self.io.getvalue()), util.normalize_newlines(
+            """Name
+------
+a
+bb
+"""))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,92 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from azure.cli.core.commands.resource_group_cache import (ResourceGroupCache,
+                                                          get_resource_group_location,
+                                                          get_resource_group_metadata)
+
+SUBSCRIPTION_ID = '00000000-0000-0000-0000-000000000000'
+
+
+def _resource_group(name, location='westus', tags=None):
+    resource_group = mock.MagicMock(location=location, tags=tags)
+    resource_group.name = name
+    resource_group.properties.provisioning_state = 'Succeeded'
+    return resource_group
+
+
+class TestResourceGroupCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache_file = os.path.join(self.cache_dir, 'resourceGroups.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_resource_group_cache_set_get(self):
+        cache = ResourceGroupCache(self.cache_file)
+        self.assertIsNone(cache.get(SUBSCRIPTION_ID, 'myRG'))
+        metadata = cache.set(SUBSCRIPTION_ID, _resource_group('myRG', tags={'a': 'b'}))
+        self.assertEqual(metadata, {'location': 'westus', 'tags': {'a': 'b'},
+                                    'provisioningState': 'Succeeded'})
+        self.assertEqual(cache.get(SUBSCRIPTION_ID.upper(), 'MYRG'), metadata)
+        self.assertIsNone(cache.get('other-subscription', 'myRG'))
+
+    def test_resource_group_cache_persisted(self):
+        ResourceGroupCache(self.cache_file).set(SUBSCRIPTION_ID, _resource_group('myRG'))
+        cache = ResourceGroupCache(self.cache_file)
+        self.assertEqual(cache.get(SUBSCRIPTION_ID, 'myRG')['location'], 'westus')
+
+    def test_resource_group_cache_expired(self):
+        cache = ResourceGroupCache(self.cache_file, ttl=60)
+        with mock.patch('time.time', return_value=1000):
+            cache.set(SUBSCRIPTION_ID, _resource_group('myRG'))
+        with mock.patch('time.time', return_value=1059):
+            self.assertIsNotNone(cache.get(SUBSCRIPTION_ID, 'myRG'))
+        with mock.patch('time.time', return_value=1061):
+            self.assertIsNone(cache.get(SUBSCRIPTION_ID, 'myRG'))
+
+    def test_resource_group_cache_remove(self):
+        cache = ResourceGroupCache(self.cache_file)
+        cache.set(SUBSCRIPTION_ID, _resource_group('myRG'))
+        cache.remove(SUBSCRIPTION_ID, 'myRG')
+        self.assertIsNone(ResourceGroupCache(self.cache_file).get(SUBSCRIPTION_ID, 'myRG'))
+
+    def test_resource_group_cache_disabled(self):
+        cache = ResourceGroupCache(self.cache_file, ttl=0)
+        cache.set(SUBSCRIPTION_ID, _resource_group('myRG'))
+        self.assertIsNone(cache.get(SUBSCRIPTION_ID, 'myRG'))
+
+    def test_resource_group_cache_corrupted_file(self):
+        with open(self.cache_file, 'w') as f:
+            f.write('{not json')
+        cache = ResourceGroupCache(self.cache_file)
+        self.assertIsNone(cache.get(SUBSCRIPTION_ID, 'myRG'))
+
+    @mock.patch('azure.cli.core.commands.client_factory.get_mgmt_service_client', autospec=True)
+    def test_get_resource_group_location_single_round_trip(self, client_factory):
+        client_factory.return_value.resource_groups.get.return_value = \
+            _resource_group('myRG', location='eastus')
+        cache = ResourceGroupCache(self.cache_file)
+        with mock.patch('azure.cli.core.commands.resource_group_cache._get_resource_group_cache',
+                        return_value=cache):
+            self.assertEqual(get_resource_group_location('myRG', SUBSCRIPTION_ID), 'eastus')
+            self.assertEqual(get_resource_group_location('myRG', SUBSCRIPTION_ID), 'eastus')
+            self.assertEqual(
+                get_resource_group_metadata('myRG', SUBSCRIPTION_ID)['provisioningState'],
+                'Succeeded')
+        client_factory.return_value.resource_groups.get.assert_called_once_with('myRG')
+
+
+if __name__ == '__main__':
+    unittest.main()
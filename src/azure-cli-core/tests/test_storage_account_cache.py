@@ -0,0 +1,138 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+import mock
+
+from azure.cli.core.commands.storage_account_cache import (StorageAccountCache,
+                                                           get_storage_account_info,
+                                                           get_storage_account_key)
+
+SUBSCRIPTION_ID = '00000000-0000-0000-0000-000000000000'
+INFO = {'resourceGroup': 'myRG',
+        'endpoints': {'blob': 'https://mystorage.blob.core.windows.net/', 'queue': None,
+                      'table': None, 'file': None},
+        'keys': ['key1', 'key2']}
+
+
+class TestStorageAccountCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache_file = os.path.join(self.cache_dir, 'storageAccounts.cache')
+        self.key_file = os.path.join(self.cache_dir, 'storageAccounts.key')
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def _cache(self, ttl=900):
+        return StorageAccountCache(self.cache_file, self.key_file, ttl)
+
+    def test_storage_account_cache_set_get(self):
+        cache = self._cache()
+        self.assertIsNone(cache.get(SUBSCRIPTION_ID, 'mystorage'))
+        cache.set(SUBSCRIPTION_ID, 'mystorage', INFO)
+        self.assertEqual(cache.get(SUBSCRIPTION_ID.upper(), 'MyStorage'), INFO)
+        self.assertIsNone(cache.get('other-subscription', 'mystorage'))
+
+    def test_storage_account_cache_encrypted(self):
+        self._cache().set(SUBSCRIPTION_ID, 'mystorage', INFO)
+        self.assertEqual(self._cache().get(SUBSCRIPTION_ID, 'mystorage'), INFO)
+
+        with open(self.cache_file, 'rb') as f:
+            self.assertNotIn(b'key1', f.read())
+        if os.name == 'posix':
+            for filename in (self.cache_file, self.key_file):
+                self.assertEqual(stat.S_IMODE(os.stat(filename).st_mode), 0o600)
+
+        # without the key the cache can't be read
+        os.remove(self.key_file)
+        self.assertIsNone(self._cache().get(SUBSCRIPTION_ID, 'mystorage'))
+
+    def test_storage_account_cache_expired(self):
+        cache = self._cache(ttl=60)
+        with mock.patch('time.time', return_value=1000):
+            cache.set(SUBSCRIPTION_ID, 'mystorage', INFO)
+        with mock.patch('time.time', return_value=1059):
+            self.assertIsNotNone(cache.get(SUBSCRIPTION_ID, 'mystorage'))
+        with mock.patch('time.time', return_value=1061):
+            self.assertIsNone(cache.get(SUBSCRIPTION_ID, 'mystorage'))
+
+    def test_storage_account_cache_remove(self):
+        cache = self._cache()
+        cache.set(SUBSCRIPTION_ID, 'mystorage', INFO)
+        cache.remove(SUBSCRIPTION_ID, 'mystorage')
+        self.assertIsNone(self._cache().get(SUBSCRIPTION_ID, 'mystorage'))
+
+    def test_storage_account_cache_disabled(self):
+        cache = self._cache(ttl=0)
+        cache.set(SUBSCRIPTION_ID, 'mystorage', INFO)
+        self.assertIsNone(cache.get(SUBSCRIPTION_ID, 'mystorage'))
+        self.assertFalse(os.path.exists(self.cache_file))
+
+    def test_storage_account_cache_corrupted_file(self):
+        with open(self.cache_file, 'wb') as f:
+            f.write(b'not encrypted')
+        self.assertIsNone(self._cache().get(SUBSCRIPTION_ID, 'mystorage'))
+
+    @mock.patch('azure.cli.core.commands.client_factory.get_mgmt_service_client', autospec=True)
+    def test_get_storage_account_info_queries_once(self, client_factory):
+        client = client_factory.return_value
+        resource = mock.MagicMock(id='/subscriptions/{}/resourceGroups/myRG/providers/'
+                                     'Microsoft.Storage/storageAccounts/mystorage'
+                                     .format(SUBSCRIPTION_ID))
+        resource.name = 'mystorage'
+        client.resources.list.return_value = iter([resource])
+        client.storage_accounts.get_properties.return_value.primary_endpoints = mock.MagicMock(
+            blob='https://mystorage.blob.core.windows.net/', queue=None, table=None, file=None)
+        client.storage_accounts.list_keys.return_value.keys = [mock.MagicMock(value='key1'),
+                                                               mock.MagicMock(value='key2')]
+
+        cache = self._cache()
+        with mock.patch('azure.cli.core.commands.storage_account_cache._get_storage_account_cache',
+                        return_value=cache):
+            self.assertEqual(get_storage_account_info('mystorage', SUBSCRIPTION_ID), INFO)
+            self.assertEqual(get_storage_account_key('mystorage', SUBSCRIPTION_ID), 'key1')
+            self.assertEqual(get_storage_account_key('mystorage', SUBSCRIPTION_ID,
+                                                     secondary=True), 'key2')
+
+        self.assertEqual(client.resources.list.call_count, 1)
+        self.assertIn("name eq 'mystorage'", client.resources.list.call_args[1]['filter'])
+        client.storage_accounts.list_keys.assert_called_once_with('myRG', 'mystorage')
+        self.assertFalse(client.storage_accounts.list.called)
+
+    @mock.patch('azure.cli.core.commands.client_factory.get_mgmt_service_client', autospec=True)
+    def test_get_storage_account_key_in_resource_group(self, client_factory):
+        client = client_factory.return_value
+        client.storage_accounts.get_properties.return_value.primary_endpoints = None
+        client.storage_accounts.list_keys.return_value.keys = [mock.MagicMock(value='key1')]
+
+        cache = self._cache()
+        with mock.patch('azure.cli.core.commands.storage_account_cache._get_storage_account_cache',
+                        return_value=cache):
+            self.assertEqual(get_storage_account_key('mystorage', SUBSCRIPTION_ID,
+                                                     resource_group_name='myRG'), 'key1')
+            self.assertEqual(get_storage_account_key('mystorage', SUBSCRIPTION_ID), 'key1')
+
+        # the account isn't searched for, and the second lookup is served by the cache
+        self.assertFalse(client.resources.list.called)
+        client.storage_accounts.list_keys.assert_called_once_with('myRG', 'mystorage')
+
+    @mock.patch('azure.cli.core.commands.client_factory.get_mgmt_service_client', autospec=True)
+    def test_get_storage_account_info_not_found(self, client_factory):
+        client_factory.return_value.resources.list.return_value = iter([])
+        with mock.patch('azure.cli.core.commands.storage_account_cache._get_storage_account_cache',
+                        return_value=self._cache()):
+            self.assertIsNone(get_storage_account_info('missing', SUBSCRIPTION_ID))
+            self.assertIsNone(get_storage_account_key('missing', SUBSCRIPTION_ID))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,195 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+import mock
+from six.moves import BaseHTTPServer  # pylint: disable=import-error
+
+import azure.cli.core.telemetry_upload as telemetry_upload
+
+
+class _TelemetryEndpoint(BaseHTTPServer.HTTPServer):
+    """ A local stand-in for the Application Insights ingestion endpoint which records the
+    envelopes of every request it receives. """
+
+    def __init__(self):
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', 0), _TelemetryRequestHandler)
+        self.requests = []
+        self.status = 200
+        self.statuses = []
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{}/v2/track'.format(self.server_address[1])
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+
+class _TelemetryRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        length = int(self.headers['Content-Length'])
+        self.server.requests.append(json.loads(self.rfile.read(length).decode('utf-8')))
+        statuses = self.server.statuses
+        self.send_response(statuses.pop(0) if statuses else self.server.status)
+        self.end_headers()
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+def _payload(name):
+    return json.dumps([{'name': name, 'properties': {'Reserved.EventId': name, 'Count': 1}}])
+
+
+class TestTelemetryUpload(unittest.TestCase):
+
+    def setUp(self):
+        self.spool_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.spool_dir)
+
+    def test_append_to_spool_one_record_per_line(self):
+        spool_path = telemetry_upload.append_to_spool(self.spool_dir, _payload('a'))
+        telemetry_upload.append_to_spool(self.spool_dir, _payload('b'))
+        with open(spool_path) as spool:
+            lines = spool.read().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(json.loads(lines[1])[0]['name'], 'b')
+
+    def test_should_upload_spool_below_threshold(self):
+        self.assertFalse(telemetry_upload.should_upload_spool(self.spool_dir))
+
+        # the first upload is due immediately, after that the spool accumulates
+        telemetry_upload.append_to_spool(self.spool_dir, _payload('a'))
+        self.assertTrue(telemetry_upload.should_upload_spool(self.spool_dir))
+        self.assertFalse(telemetry_upload.should_upload_spool(self.spool_dir))
+
+    def test_should_upload_spool_above_threshold(self):
+        telemetry_upload.append_to_spool(self.spool_dir, _payload('a'))
+        self.assertTrue(telemetry_upload.should_upload_spool(self.spool_dir))
+
+        big_payload = _payload('x' * telemetry_upload.SPOOL_UPLOAD_THRESHOLD_BYTES)
+        telemetry_upload.append_to_spool(self.spool_dir, big_payload)
+        # a large spool is uploaded early, but not by every az process
+        self.assertFalse(telemetry_upload.should_upload_spool(self.spool_dir))
+        self._age_marker(telemetry_upload.SPOOL_UPLOAD_MIN_INTERVAL_SECONDS)
+        self.assertTrue(telemetry_upload.should_upload_spool(self.spool_dir))
+
+    def _age_marker(self, seconds):
+        marker_path = os.path.join(self.spool_dir, telemetry_upload.SPOOL_MARKER_FILE_NAME)
+        last_upload = time.time() - seconds - 1
+        os.utime(marker_path, (last_upload, last_upload))
+
+    def test_should_upload_spool_backs_off_after_failures(self):
+        big_payload = _payload('x' * telemetry_upload.SPOOL_UPLOAD_THRESHOLD_BYTES)
+        telemetry_upload.append_to_spool(self.spool_dir, big_payload)
+        self.assertTrue(telemetry_upload.should_upload_spool(self.spool_dir))
+        telemetry_upload._record_upload_result(self.spool_dir, failed=True)  # pylint: disable=protected-access
+        telemetry_upload._record_upload_result(self.spool_dir, failed=True)  # pylint: disable=protected-access
+
+        self._age_marker(telemetry_upload.SPOOL_UPLOAD_MIN_INTERVAL_SECONDS * 2)
+        self.assertFalse(telemetry_upload.should_upload_spool(self.spool_dir))
+        self._age_marker(telemetry_upload.SPOOL_UPLOAD_MIN_INTERVAL_SECONDS * 4)
+        self.assertTrue(telemetry_upload.should_upload_spool(self.spool_dir))
+
+        # a successful upload ends the back off
+        telemetry_upload._record_upload_result(self.spool_dir, failed=False)  # pylint: disable=protected-access
+        self._age_marker(telemetry_upload.SPOOL_UPLOAD_MIN_INTERVAL_SECONDS)
+        self.assertTrue(telemetry_upload.should_upload_spool(self.spool_dir))
+
+    def test_upload_spool_batches_events(self):
+        for i in range(10):
+            telemetry_upload.append_to_spool(self.spool_dir, _payload('event{}'.format(i)))
+
+        with _TelemetryEndpoint() as endpoint:
+            os.environ[telemetry_upload.TELEMETRY_ENDPOINT_ENV_NAME] = endpoint.url
+            try:
+                telemetry_upload.upload_spool(self.spool_dir)
+            finally:
+                del os.environ[telemetry_upload.TELEMETRY_ENDPOINT_ENV_NAME]
+
+        self.assertEqual(len(endpoint.requests), 1)
+        self.assertEqual(len(endpoint.requests[0]), 10)
+        self.assertEqual(os.listdir(self.spool_dir), [])
+
+    def _upload_spool(self, endpoint):
+        os.environ[telemetry_upload.TELEMETRY_ENDPOINT_ENV_NAME] = endpoint.url
+        try:
+            telemetry_upload.upload_spool(self.spool_dir)
+        finally:
+            del os.environ[telemetry_upload.TELEMETRY_ENDPOINT_ENV_NAME]
+
+    def test_upload_spool_failure_keeps_records(self):
+        for i in range(3):
+            telemetry_upload.append_to_spool(self.spool_dir, _payload('event{}'.format(i)))
+
+        with _TelemetryEndpoint() as endpoint:
+            endpoint.status = 503
+            self._upload_spool(endpoint)
+            # the failed request isn't sent again and again
+            self.assertEqual(len(endpoint.requests), 1)
+            self.assertEqual(sorted(os.listdir(self.spool_dir)),
+                             [telemetry_upload.SPOOL_MARKER_FILE_NAME,
+                              telemetry_upload.SPOOL_FILE_NAME])
+
+            telemetry_upload.append_to_spool(self.spool_dir, _payload('event3'))
+            endpoint.status = 200
+            self._upload_spool(endpoint)
+
+        names = [e['data']['baseData']['name'] for e in endpoint.requests[-1]]
+        self.assertEqual(sorted(names), ['event0', 'event1', 'event2', 'event3'])
+        self.assertEqual(os.listdir(self.spool_dir), [telemetry_upload.SPOOL_MARKER_FILE_NAME])
+
+    @mock.patch('azure.cli.core.telemetry_upload.UPLOAD_BATCH_SIZE', 2)
+    def test_upload_spool_failure_keeps_unsent_records(self):
+        for i in range(5):
+            telemetry_upload.append_to_spool(self.spool_dir, _payload('event{}'.format(i)))
+
+        with _TelemetryEndpoint() as endpoint:
+            endpoint.statuses = [200, 503]
+            self._upload_spool(endpoint)
+            self.assertEqual(len(endpoint.requests), 2)
+
+            self._upload_spool(endpoint)
+
+        # the batch which went out isn't sent again
+        names = [e['data']['baseData']['name'] for r in endpoint.requests[2:] for e in r]
+        self.assertEqual(sorted(names), ['event2', 'event3', 'event4'])
+
+    @mock.patch('azure.cli.core.telemetry_upload.SPOOL_MAX_BYTES', 200)
+    def test_upload_spool_failure_drops_oldest_records(self):
+        for i in range(5):
+            telemetry_upload.append_to_spool(self.spool_dir, _payload('event{}'.format(i)))
+
+        with _TelemetryEndpoint() as endpoint:
+            endpoint.status = 503
+            self._upload_spool(endpoint)
+
+        spool_path = os.path.join(self.spool_dir, telemetry_upload.SPOOL_FILE_NAME)
+        self.assertLessEqual(os.path.getsize(spool_path), 200)
+        with open(spool_path) as spool:
+            names = [json.loads(line)[0]['name'] for line in spool]
+        self.assertEqual(names, ['event3', 'event4'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+# pylint: disable=protected-access
+import threading
+import unittest
+
+import mock
+
+from azure.cli.core._profile import Profile
+from azure.cli.core.commands import CliCommand, cli_command, command_table, create_command
+from azure.cli.core.token_prefetch import (TokenPrefetcher, prefetch_login_token,
+                                           PREFETCHED_TOKEN_LIFETIME, PREFETCH_EXIT_TIMEOUT)
+
+TOKEN_KEY = ('foo@foo.com', 'microsoft.com', 'https://management.core.windows.net/')
+TOKEN = ('Bearer', 'some-token')
+OPERATION = 'azure.cli.core.token_prefetch#prefetch_login_token'
+
+
+class TestTokenPrefetch(unittest.TestCase):
+
+    def test_token_prefetcher_not_started(self):
+        self.assertIsNone(TokenPrefetcher().get(TOKEN_KEY))
+
+    def test_token_prefetcher_get(self):
+        prefetcher = TokenPrefetcher()
+        prefetcher.start(lambda: (TOKEN_KEY, TOKEN))
+        self.assertEqual(prefetcher.get(TOKEN_KEY), TOKEN)
+        self.assertIsNone(prefetcher.get(('bar@bar.com',) + TOKEN_KEY[1:]))
+
+    def test_token_prefetcher_waits_for_acquisition(self):
+        acquiring = threading.Event()
+        release = threading.Event()
+
+        def _acquire():
+            acquiring.set()
+            release.wait()
+            return TOKEN_KEY, TOKEN
+
+        prefetcher = TokenPrefetcher()
+        prefetcher.start(_acquire)
+        acquiring.wait()
+        threading.Timer(0.1, release.set).start()
+        self.assertEqual(prefetcher.get(TOKEN_KEY), TOKEN)
+
+    def test_token_prefetcher_starts_once(self):
+        acquire = mock.MagicMock(return_value=(TOKEN_KEY, TOKEN))
+        prefetcher = TokenPrefetcher()
+        prefetcher.start(acquire)
+        prefetcher.start(acquire)
+        prefetcher.get(TOKEN_KEY)
+        self.assertEqual(acquire.call_count, 1)
+
+    @mock.patch('atexit.register', autospec=True)
+    def test_token_prefetcher_exit_timeout(self, register):
+        prefetcher = TokenPrefetcher()
+        prefetcher.start(lambda: (TOKEN_KEY, TOKEN))
+        self.assertTrue(prefetcher._thread.daemon)
+        register.assert_called_once_with(prefetcher._thread.join, PREFETCH_EXIT_TIMEOUT)
+
+    def test_token_prefetcher_stale_token(self):
+        prefetcher = TokenPrefetcher()
+        with mock.patch('time.time', return_value=1000):
+            prefetcher.start(lambda: (TOKEN_KEY, TOKEN))
+            prefetcher.get(TOKEN_KEY)
+        with mock.patch('time.time', return_value=1000 + PREFETCHED_TOKEN_LIFETIME + 1):
+            self.assertIsNone(prefetcher.get(TOKEN_KEY))
+
+    def test_token_prefetcher_acquisition_failure(self):
+        def _acquire():
+            raise ValueError('not logged in')
+
+        prefetcher = TokenPrefetcher()
+        prefetcher.start(_acquire)
+        self.assertIsNone(prefetcher.get(TOKEN_KEY))
+
+    @mock.patch('azure.cli.core.token_prefetch.token_prefetcher', autospec=True)
+    def test_prefetch_login_token_skipped_groups(self, prefetcher):
+        prefetch_login_token(CliCommand('login', None, needs_login_token=True))
+        prefetch_login_token(CliCommand('account set', None, needs_login_token=True))
+        self.assertFalse(prefetcher.start.called)
+        prefetch_login_token(CliCommand('vm list', None, needs_login_token=True))
+        self.assertTrue(prefetcher.start.called)
+
+    @mock.patch('azure.cli.core.token_prefetch.token_prefetcher', autospec=True)
+    def test_prefetch_login_token_opt_in(self, prefetcher):
+        # data plane commands are registered with create_command, they don't opt in
+        command = create_command(__name__, 'storage blob list', OPERATION, None, None, None)
+        prefetch_login_token(command)
+        self.assertFalse(prefetcher.start.called)
+
+        with mock.patch.dict(command_table, clear=True):
+            cli_command(__name__, 'vm list', OPERATION)
+            prefetch_login_token(command_table['vm list'])
+        self.assertTrue(prefetcher.start.called)
+
+    @mock.patch('azure.cli.core._profile.CredsCache.retrieve_token_for_user', autospec=True)
+    @mock.patch('azure.cli.core._profile.token_prefetcher', autospec=True)
+    def test_login_credentials_use_prefetched_token(self, prefetcher, retrieve_token):
+        account = {'id': '1', 'tenantId': TOKEN_KEY[1],
+                   'user': {'name': TOKEN_KEY[0], 'type': 'user'}}
+        profile = Profile({'subscriptions': None})
+        with mock.patch.object(profile, 'get_subscription', return_value=account):
+            cred, _, _ = profile.get_login_credentials()
+
+        prefetcher.get.return_value = TOKEN
+        self.assertEqual(cred._token_retriever(), TOKEN)
+        prefetcher.get.assert_called_with(TOKEN_KEY)
+        self.assertFalse(retrieve_token.called)
+
+        prefetcher.get.return_value = None
+        retrieve_token.return_value = ('Bearer', 'another-token')
+        self.assertEqual(cred._token_retriever(), ('Bearer', 'another-token'))
+        retrieve_token.assert_called_once_with(mock.ANY, TOKEN_KEY[0], TOKEN_KEY[1], TOKEN_KEY[2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,6 +7,7 @@
 from collections import namedtuple
 import unittest
 import tempfile
+from types import GeneratorType
 
 from azure.cli.core._util import get_file_json, todict, to_snake_case, truncate_text
 
@@ -37,6 +38,13 @@ class TestUtils(unittest.TestCase):
         expected = [{'a': 'b'}]
         self.assertEqual(actual, expected)
 
+    def test_application_todict_generator(self):
+        MyObject = namedtuple('MyObject', 'a b')
+        the_input = (MyObject('x', i) for i in range(2))
+        actual = todict(the_input)
+        self.assertIsInstance(actual, GeneratorType)
+        self.assertEqual(list(actual), [{'a': 'x', 'b': 0}, {'a': 'x', 'b': 1}])
+
     def test_application_todict_obj(self):
         MyObject = namedtuple('MyObject', 'a b')
         the_input = MyObject('x', 'y')
@@ -213,5 +213,5 @@ def random_storage_account_name(registry_name):
             return storage_account_name
 
 def get_location_from_resource_group(resource_group_name):
-    group = get_arm_service_client().resource_groups.get(resource_group_name)
-    return group.location #pylint: disable=no-member
+    from azure.cli.core.commands.resource_group_cache import get_resource_group_location
+    return get_resource_group_location(resource_group_name)
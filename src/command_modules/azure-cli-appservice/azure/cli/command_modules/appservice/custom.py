@@ -20,7 +20,6 @@ from azure.mgmt.web.models import (Site, SiteConfig, User, AppServicePlan,
                                    BackupRequest, DatabaseBackupSetting, BackupSchedule,
                                    RestoreRequest, FrequencyUnit, Certificate, HostNameSslState)
 
-from azure.cli.core.commands.client_factory import get_mgmt_service_client
 from azure.cli.core.commands.arm import is_valid_resource_id, parse_resource_id
 from azure.cli.core.commands import LongRunningOperation
 
@@ -614,10 +613,8 @@ def _get_sku_name(tier):
 
 
 def _get_location_from_resource_group(resource_group_name):
-    from azure.mgmt.resource.resources import ResourceManagementClient
-    client = get_mgmt_service_client(ResourceManagementClient)
-    group = client.resource_groups.get(resource_group_name)
-    return group.location
+    from azure.cli.core.commands.resource_group_cache import get_resource_group_location
+    return get_resource_group_location(resource_group_name)
 
 
 def _get_location_from_webapp(client, resource_group_name, webapp):
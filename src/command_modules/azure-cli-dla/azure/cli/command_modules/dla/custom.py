@@ -18,7 +18,6 @@ from azure.mgmt.datalake.analytics.job.models import (JobType,
 # pylint: disable=line-too-long
 from azure.mgmt.datalake.analytics.catalog.models import (DataLakeAnalyticsCatalogCredentialCreateParameters,
                                                           DataLakeAnalyticsCatalogCredentialUpdateParameters)
-from azure.cli.core.commands.client_factory import get_mgmt_service_client
 from azure.cli.core._util import CLIError
 import azure.cli.core.azlogging as azlogging
 
@@ -259,7 +258,5 @@ def _get_uuid_str():
 
 
 def _get_resource_group_location(resource_group_name):
-    from azure.mgmt.resource.resources import ResourceManagementClient
-    client = get_mgmt_service_client(ResourceManagementClient)
-    # pylint: disable=no-member
-    return client.resource_groups.get(resource_group_name).location
+    from azure.cli.core.commands.resource_group_cache import get_resource_group_location
+    return get_resource_group_location(resource_group_name)
@@ -14,7 +14,6 @@ from azure.mgmt.datalake.store.models import (DataLakeStoreAccountUpdateParamete
 from azure.datalake.store.enums import ExpiryOptionType
 from azure.datalake.store.multithread import (ADLUploader, ADLDownloader)
 from azure.cli.command_modules.dls._client_factory import (cf_dls_filesystem)
-from azure.cli.core.commands.client_factory import get_mgmt_service_client
 from azure.cli.core._util import CLIError
 import azure.cli.core.azlogging as azlogging
 
@@ -325,7 +324,5 @@ def set_adls_item_permissions(account_name,
 
 # helpers
 def _get_resource_group_location(resource_group_name):
-    from azure.mgmt.resource.resources import ResourceManagementClient
-    client = get_mgmt_service_client(ResourceManagementClient)
-    # pylint: disable=no-member
-    return client.resource_groups.get(resource_group_name).location
+    from azure.cli.core.commands.resource_group_cache import get_resource_group_location
+    return get_resource_group_location(resource_group_name)
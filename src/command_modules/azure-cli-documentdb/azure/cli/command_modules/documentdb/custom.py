@@ -29,11 +29,8 @@ def cli_documentdb_create(client,
     if default_consistency_level is not None:
         consistency_policy = ConsistencyPolicy(default_consistency_level, max_staleness_prefix, max_interval)
 
-    from azure.mgmt.resource.resources import ResourceManagementClient
-    from azure.cli.core.commands.client_factory import get_mgmt_service_client
-    resource_client = get_mgmt_service_client(ResourceManagementClient)
-    rg = resource_client.resource_groups.get(resource_group_name)
-    resource_group_location = rg.location  # pylint: disable=no-member
+    from azure.cli.core.commands.resource_group_cache import get_resource_group_location
+    resource_group_location = get_resource_group_location(resource_group_name)
 
     if not locations:
         locations.append(Location(location_name=resource_group_location, failover_priority=0))
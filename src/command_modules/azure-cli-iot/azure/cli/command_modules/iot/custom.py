@@ -18,7 +18,6 @@ from azure.cli.command_modules.iot.mgmt_iot_hub_device.lib.models.authentication
 from azure.cli.command_modules.iot.mgmt_iot_hub_device.lib.models.device_description import DeviceDescription
 from azure.cli.command_modules.iot.mgmt_iot_hub_device.lib.models.x509_thumbprint import X509Thumbprint
 from azure.cli.command_modules.iot.sas_token_auth import SasTokenAuthentication
-from ._factory import resource_service_factory
 from ._utils import create_self_signed_certificate
 
 
@@ -370,8 +369,8 @@ def _get_iot_hub_by_name(client, hub_name):
 
 def _ensure_location(resource_group_name, location):
     if location is None:
-        resource_group_client = resource_service_factory().resource_groups
-        return resource_group_client.get(resource_group_name).location
+        from azure.cli.core.commands.resource_group_cache import get_resource_group_location
+        return get_resource_group_location(resource_group_name)
     else:
         return location
 
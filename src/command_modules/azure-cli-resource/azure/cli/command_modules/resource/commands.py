@@ -25,7 +25,7 @@ def transform_resource_group_list(result):
     return [OrderedDict([('Name', r['name']), \
             ('Location', r['location']), ('Status', r['properties']['provisioningState'])]) for r in result]
 
-cli_command(__name__, 'group delete', 'azure.mgmt.resource.resources.operations.resource_groups_operations#ResourceGroupsOperations.delete', cf_resource_groups, no_wait_param='raw', confirmation=True)
+cli_command(__name__, 'group delete', 'azure.cli.command_modules.resource.custom#delete_resource_group', no_wait_param='no_wait', confirmation=True)
 cli_generic_wait_command(__name__, 'group wait', 'azure.mgmt.resource.resources.operations.resource_groups_operations#ResourceGroupsOperations.get', cf_resource_groups)
 cli_command(__name__, 'group show', 'azure.mgmt.resource.resources.operations.resource_groups_operations#ResourceGroupsOperations.get', cf_resource_groups, exception_handler=empty_on_404)
 cli_command(__name__, 'group exists', 'azure.mgmt.resource.resources.operations.resource_groups_operations#ResourceGroupsOperations.check_existence', cf_resource_groups)
@@ -95,7 +95,7 @@ cli_generic_update_command(__name__, 'resource update',
 
 cli_generic_update_command(__name__, 'group update',
                            'azure.mgmt.resource.resources.operations.resource_groups_operations#ResourceGroupsOperations.get',
-                           'azure.mgmt.resource.resources.operations.resource_groups_operations#ResourceGroupsOperations.create_or_update',
+                           'azure.cli.command_modules.resource.custom#update_resource_group',
                            lambda: _resource_client_factory().resource_groups)
 
 cli_command(__name__, 'policy assignment create', 'azure.cli.command_modules.resource.custom#create_policy_assignment')
@@ -25,6 +25,8 @@ from azure.cli.core._util import CLIError, get_file_json
 import azure.cli.core.azlogging as azlogging
 from azure.cli.core.commands.client_factory import get_mgmt_service_client
 from azure.cli.core.commands.arm import is_valid_resource_id, parse_resource_id
+from azure.cli.core.commands.resource_group_cache import (update_resource_group_cache,
+                                                          invalidate_resource_group_cache)
 
 from ._client_factory import (_resource_client_factory,
                               _resource_policy_client_factory,
@@ -62,7 +64,24 @@ def create_resource_group(rg_name, location, tags=None):
         location=location,
         tags=tags
     )
-    return rcf.resource_groups.create_or_update(rg_name, parameters)
+    resource_group = rcf.resource_groups.create_or_update(rg_name, parameters)
+    update_resource_group_cache(resource_group, rcf.config.subscription_id)
+    return resource_group
+
+def delete_resource_group(resource_group_name, no_wait=False):
+    ''' Delete a resource group.
+    :param str resource_group_name:the name of the resource group
+    '''
+    rcf = _resource_client_factory()
+    # a group being deleted isn't served from the cache anymore
+    invalidate_resource_group_cache(resource_group_name, rcf.config.subscription_id)
+    return rcf.resource_groups.delete(resource_group_name, raw=no_wait)
+
+def update_resource_group(client, resource_group_name, parameters):
+    ''' Update a resource group and record its new tags in the resource group cache. '''
+    resource_group = client.create_or_update(resource_group_name, parameters)
+    update_resource_group_cache(resource_group, client.config.subscription_id)
+    return resource_group
 
 def export_group_as_template(
         resource_group_name, include_comments=False, include_parameter_default_value=False):
@@ -12,6 +12,7 @@ from azure.cli.core.commands.client_factory import (
     get_mgmt_service_client,
     get_subscription_id)
 from azure.cli.core._util import CLIError
+from azure.cli.core.commands.storage_account_cache import get_storage_account_info
 from azure.mgmt.sql.models.sql_management_client_enums import (
     BlobAuditingPolicyState,
     CreateMode,
@@ -411,6 +412,11 @@ def db_update(
 # resource group just to update some unrelated property, which is annoying and makes no sense to
 # the customer.
 def _find_storage_account_resource_group(name):
+    info = get_storage_account_info(name)
+    if info:
+        return info['resourceGroup']
+
+    # find out why the account wasn't found
     storage_type = 'Microsoft.Storage/storageAccounts'
     classic_storage_type = 'Microsoft.ClassicStorage/storageAccounts'
 
@@ -447,19 +453,22 @@ def _get_storage_endpoint(
         resource_group_name):
 
     # Get storage account
-    client = get_mgmt_service_client(StorageManagementClient)
-    account = client.storage_accounts.get_properties(
-        resource_group_name=resource_group_name,
-        account_name=storage_account)
+    info = get_storage_account_info(storage_account)
+    if info and info['resourceGroup'].lower() == resource_group_name.lower():
+        endpoint = info['endpoints'].get('blob')
+    else:
+        client = get_mgmt_service_client(StorageManagementClient)
+        account = client.storage_accounts.get_properties(
+            resource_group_name=resource_group_name,
+            account_name=storage_account)
+        # pylint: disable=no-member
+        endpoint = getattr(account.primary_endpoints, 'blob', None)
 
     # Get endpoint
-    # pylint: disable=no-member
-    endpoints = account.primary_endpoints
-    try:
-        return endpoints.blob
-    except AttributeError:
-        raise CLIError("The storage account with name '{}' (id '{}') has no blob endpoint. Use a"
-                       " different storage account.".format(account.name, account.id))
+    if not endpoint:
+        raise CLIError("The storage account with name '{}' has no blob endpoint. Use a"
+                       " different storage account.".format(storage_account))
+    return endpoint
 
 
 # Gets storage account key by querying storage ARM API.
@@ -469,14 +478,18 @@ def _get_storage_key(
         use_secondary_key):
 
     # Get storage keys
-    client = get_mgmt_service_client(StorageManagementClient)
-    keys = client.storage_accounts.list_keys(
-        resource_group_name=resource_group_name,
-        account_name=storage_account)
+    info = get_storage_account_info(storage_account)
+    if info and info['resourceGroup'].lower() == resource_group_name.lower():
+        keys = info['keys']
+    else:
+        client = get_mgmt_service_client(StorageManagementClient)
+        keys = [k.value for k in client.storage_accounts.list_keys(  # pylint: disable=no-member
+            resource_group_name=resource_group_name,
+            account_name=storage_account).keys]
 
     # Choose storage key
     index = 1 if use_secondary_key else 0
-    return keys.keys[index].value  # pylint: disable=no-member
+    return keys[index]
 
 
 # Common code for updating audit and threat detection policy
@@ -129,14 +129,12 @@ def transform_file_directory_result(result):
     list.
     """
     from azure.storage.file.models import File, Directory
-    return_list = []
-    for each in result:
+    from ._validators import transform_storage_list_output
+    for each in transform_storage_list_output(result):
         if isinstance(each, File):
             delattr(each, 'content')
             setattr(each, 'type', 'file')
         elif isinstance(each, Directory):
             setattr(each, 'type', 'dir')
 
-        return_list.append(each)
-
-    return return_list
+        yield each
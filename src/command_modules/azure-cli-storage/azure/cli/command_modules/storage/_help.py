@@ -28,10 +28,21 @@ helps['storage entity insert'] = """
 helps['storage blob upload'] = """
     type: command
     short-summary: Upload a specified file to a storage blob.
-    long-summary: Creates a new blob from a file path, or updates the content of an existing blob, with automatic chunking and progress notifications.
+    long-summary: Creates a new blob from a file path, or updates the content of an existing blob, with automatic chunking and progress notifications. With --file - the block or append blob is read from stdin, block blobs being staged in parallel with --max-connections blocks in flight.
     examples:
         - name: Upload to a blob with all required fields.
           text: az storage blob upload -f /path/to/file -c MyContainer -n MyBlob
+        - name: Upload an archive as it is created.
+          text: tar cz ./logs | az storage blob upload -f - -c MyContainer -n logs.tar.gz --max-connections 8
+"""
+
+helps['storage blob download'] = """
+    type: command
+    short-summary: Downloads a blob to a file path, with automatic chunking and progress notifications.
+    long-summary: With --file - the blob is written to stdout, its ranges being fetched in parallel with --max-connections ranges in flight.
+    examples:
+        - name: Extract an archive without saving it first.
+          text: az storage blob download -f - -c MyContainer -n logs.tar.gz --max-connections 8 | tar xz
 """
 
 helps['storage file upload'] = """
@@ -131,6 +142,7 @@ helps['storage account show-connection-string'] = """
 helps['storage'] = """
     type: group
     short-summary: Durable, highly available, and massively scalable cloud storage.
+    long-summary: Uploads, downloads and copies report their progress on stderr. Set AZURE_STORAGE_PROGRESS, or progress in the [storage] section of the configuration, to tty for a status line, json for JSON progress events, log for a log line every 10 seconds or off. By default a status line is shown on terminals and log lines otherwise.
 """
 
 helps['storage account'] = """
@@ -169,6 +181,14 @@ helps['storage blob exists'] = """
 helps['storage blob list'] = """
     type: command
     short-summary: List blobs in a given container.
+    long-summary: The blobs are printed as the pages of the listing come in, in JSON or TSV output.
+    examples:
+        - name: List the first 1000 blobs under a virtual directory, then continue from the marker logged.
+          text: |
+            az storage blob list -c MyContainer --prefix logs/2017/ --num-results 1000
+            az storage blob list -c MyContainer --prefix logs/2017/ --num-results 1000 --marker <marker>
+        - name: List the virtual directories at the root of a container.
+          text: az storage blob list -c MyContainer --delimiter / --query "[].name"
 """
 
 helps['storage blob copy'] = """
@@ -202,6 +222,12 @@ helps['storage blob copy start-batch'] = """
         - name: --dryrun
           type: bool
           short-summary: List of files or blobs to be uploaded. No actual data transfer will occur.
+        - name: --wait
+          type: bool
+          short-summary: Wait for the copies to complete, polling their status and reporting the progress of the batch.
+        - name: --max-connections
+          type: int
+          short-summary: The maximum number of copy requests to send or copies to poll in parallel.
         - name: --source-account-name
           type: string
           short-summary: The source storage account from which the files or blobs are copied to the destination. If omitted, it is assumed that source is in the same storage account as destination.
@@ -234,6 +260,7 @@ helps['storage container exists'] = """
 helps['storage container list'] = """
     type: command
     short-summary: List containers in a storage account.
+    long-summary: The containers are printed as the pages of the listing come in, in JSON or TSV output.
 """
 
 helps['storage container lease'] = """
@@ -254,11 +281,15 @@ helps['storage container policy'] = """
 helps['storage cors'] = """
     type: group
     short-summary: Manage Storage service Cross-Origin Resource Sharing (CORS).
+    long-summary: The services of an account are handled at once. With --account-names or --resource-group, the commands apply to many accounts at once and report the result of each account.
 """
 
 helps['storage cors add'] = """
     type: command
     short-summary: Add a CORS rule to a storage account.
+    examples:
+        - name: Allow GET requests from a domain to the blobs of every storage account of a resource group.
+          text: az storage cors add --services b --methods GET --origins https://contoso.com -g MyResourceGroup
 """
 
 helps['storage cors clear'] = """
@@ -299,6 +330,7 @@ helps['storage entity'] = """
 helps['storage entity query'] = """
     type: command
     short-summary: List entities which satisfy a given query.
+    long-summary: Returns a page of entities and the marker of the next one, unless --all, --partition-bounds or --export-file is given to follow the markers. With --partition-bounds the table is scanned as several PartitionKey ranges queried in parallel, so the entities aren't returned in order.
 """
 
 
@@ -315,6 +347,7 @@ helps['storage file exists'] = """
 helps['storage file list'] = """
     type: command
     short-summary: List files and directories in the specified share.
+    long-summary: The entries are printed as the pages of the listing come in, in JSON or TSV output.
     parameters:
         - name: --exclude-dir
           type: bool
@@ -349,10 +382,13 @@ helps['storage file upload-batch'] = """
           short-summary: The list of files to upload. No actual data transfer occurs.
         - name: --max-connections
           type: integer
-          short-summary: The maximum number of parallel connections to use. Default value is 1.
+          short-summary: The maximum number of parallel connections for the whole batch. They are shared between uploading several files at once and uploading the ranges of large files. Default value is 8.
         - name: --validate-content
           type: bool
           short-summary: If set, calculates an MD5 hash for each range of the file. The Storage service checks the hash of the content that has arrived with the hash that was sent. This is primarily valuable for detecting bitflips on the wire if using http instead of https as https (the default) will already validate. Note that this MD5 hash is not stored with the file.
+        - name: --put-md5
+          type: bool
+          short-summary: Set the Content-MD5 of every file in the share to the MD5 of its local file. The files are hashed in parallel and their MD5 is cached, so files which haven't changed are not hashed again by later batches.
 """
 
 helps['storage file download-batch'] = """
@@ -379,6 +415,133 @@ helps['storage file download-batch'] = """
           short-summary: If set, calculates an MD5 hash for each range of the file. The Storage service checks the hash of the content that has arrived with the hash that was sent. This is primarily valuable for detecting bitflips on the wire if using http instead of https as https (the default) will already validate. Note that this MD5 hash is not stored with the file.
 """
 
+helps['storage file delete-batch'] = """
+    type: command
+    short-summary: Delete files from an Azure Storage File Share in batch.
+    long-summary: The share is crawled and the matching files are deleted in parallel as they are found. Returns the number of files deleted, skipped because they were already gone and the files which failed.
+    parameters:
+        - name: --source -s
+          type: string
+          short-summary: The source of the file delete operation. The source can be the file share URL or the share name. When the source is the share URL, the storage account name is parsed from the URL.
+        - name: --pattern
+          type: string
+          short-summary: The pattern used for file globbing. The supported patterns are '*', '?', '[seq', and '[!seq]'.
+        - name: --dryrun
+          type: bool
+          short-summary: The list of files to be deleted. No files are deleted.
+        - name: --max-connections
+          type: integer
+          short-summary: The maximum number of files to delete in parallel.
+"""
+
+helps['storage file sync'] = """
+    type: command
+    short-summary: Upload the files of a local directory which are new or have changed to an Azure Storage File Share.
+    long-summary: Files are compared with those in the share by size and modification time, or by MD5 when --check-md5 is used.
+    parameters:
+        - name: --source -s
+          type: string
+          short-summary: The directory from which the files should be synchronized.
+        - name: --destination -d
+          type: string
+          short-summary: The destination of the operation. The destination can be the file share URL or the share name. When the destination is the share URL, the storage account name is parsed from the URL.
+        - name: --pattern
+          type: string
+          short-summary: The pattern used for file globbing. The supported patterns are '*', '?', '[seq', and '[!seq]'. Files in the share which don't match the pattern are left alone.
+        - name: --check-md5
+          type: bool
+          short-summary: Compare the MD5 of local files with the Content-MD5 of files of the same size in the share instead of their modification times. The MD5 of local files is cached so unchanged files are not hashed again.
+        - name: --delete-destination
+          type: bool
+          short-summary: Delete the files in the share matching the pattern which have no corresponding local file.
+        - name: --dryrun
+          type: bool
+          short-summary: The list of files to upload or delete. No actual data transfer occurs.
+        - name: --max-connections
+          type: integer
+          short-summary: The maximum number of parallel connections to use. Default value is 8.
+    examples:
+        - name: Upload the build output which changed since the last run and remove stale files.
+          text: az storage file sync -s ./out -d MyShare --check-md5 --delete-destination
+"""
+
+helps['storage blob delete-batch'] = """
+    type: command
+    short-summary: Delete blobs from a blob container recursively.
+    long-summary: The matching blobs are deleted in parallel as they are listed. Returns the number of blobs deleted, skipped because they were already gone or their pre-conditions didn't hold and the blobs which failed.
+    examples:
+        - name: Delete the logs of 2016 which were not modified since, along with their snapshots.
+          text: az storage blob delete-batch -s logs --pattern '2016/*' --if-unmodified-since 2017-01-01 --delete-snapshots include
+"""
+
+helps['storage blob generate-sas-batch'] = """
+    type: command
+    short-summary: Generate a SAS URL for each of many blobs.
+    long-summary: The SAS tokens are signed locally with the account key and written to stdout as they are signed, one line per blob with the name and the URL separated by a tab. Only listing the blobs matching --pattern goes over the network.
+    examples:
+        - name: Sign read access to the blobs named in a file for a day, on 4 cores.
+          text: az storage blob generate-sas-batch -c MyContainer --names-file names.txt --permissions r --expiry 2017-01-02T00:00Z --processes 4 > urls.tsv
+        - name: Sign read access to the images of a container.
+          text: az storage blob generate-sas-batch -c MyContainer --pattern 'images/*' --permissions r --expiry 2017-01-02T00:00Z --https-only
+"""
+
+helps['storage file generate-sas-batch'] = """
+    type: command
+    short-summary: Generate a SAS URL for each of many files.
+    long-summary: The SAS tokens are signed locally with the account key and written to stdout as they are signed, one line per file with the path and the URL separated by a tab. Only listing the files matching --pattern goes over the network.
+    examples:
+        - name: Sign read access to the files of a directory.
+          text: az storage file generate-sas-batch -s MyShare --pattern 'reports/*' --permissions r --expiry 2017-01-02T00:00Z
+"""
+
+helps['storage blob sync'] = """
+    type: command
+    short-summary: Upload the files of a local directory which are new or have changed to a blob container.
+    long-summary: Files are compared with the blobs by size and modification time, or by MD5 when --check-md5 is used.
+    examples:
+        - name: Upload the build output which changed since the last run and remove stale blobs.
+          text: az storage blob sync -s ./out -d MyContainer --check-md5 --delete-destination
+        - name: Compare the files with the local inventory of the container instead of listing it.
+          text: az storage blob sync -s ./out -d MyContainer --inventory
+"""
+
+helps['storage blob inventory'] = """
+    type: group
+    short-summary: Manage local inventories of the blobs of containers.
+    long-summary: An inventory is a SQLite database under the config directory with the name, size, type, last modified time and ETag of every blob of a container. download-batch and sync read it instead of listing the container when given --inventory, and upload-batch, sync and delete-batch keep an existing inventory current with the blobs they write and delete.
+"""
+
+helps['storage blob inventory update'] = """
+    type: command
+    short-summary: List the blobs of a container into its local inventory, creating it if needed.
+    long-summary: The virtual directories of the container are listed in parallel. With --prefixes only the blobs starting with the prefixes are listed again, the other blobs of the inventory are kept as they are.
+    examples:
+        - name: Create or refresh the inventory of a container.
+          text: az storage blob inventory update -c MyContainer --max-connections 16
+        - name: Refresh only the blobs of two virtual directories.
+          text: az storage blob inventory update -c MyContainer --prefixes logs/2017-01/ logs/2017-02/
+"""
+
+helps['storage blob inventory show'] = """
+    type: command
+    short-summary: Show the number and total size of the blobs of the local inventory of a container, and when it was last fully refreshed.
+"""
+
+helps['storage blob inventory list'] = """
+    type: command
+    short-summary: List the blobs of the local inventory of a container, without listing the container.
+    examples:
+        - name: Find the large blobs of a virtual directory.
+          text: az storage blob inventory list -c MyContainer --prefix images/ --query "[?properties.contentLength > `1048576`].name"
+        - name: List the blobs matching a pattern.
+          text: az storage blob inventory list -c MyContainer --pattern '*.json' -o table
+"""
+
+helps['storage blob inventory delete'] = """
+    type: command
+    short-summary: Delete the local inventory of a container. The container is left alone.
+"""
+
 helps['storage file copy start-batch'] = """
     type: command
     short-summary: Copy multiple files or blobs to a file share.
@@ -396,6 +559,12 @@ helps['storage file copy start-batch'] = """
           type: bool
 
           short-summary: The list of files or blobs to be uploaded. No actual data transfer occurs.
+        - name: --wait
+          type: bool
+          short-summary: Wait for the copies to complete, polling their status and reporting the progress of the batch.
+        - name: --max-connections
+          type: int
+          short-summary: The maximum number of copy requests to send or copies to poll in parallel.
         - name: --source-account-name
           type: string
           short-summary: The source storage account from which the files or blobs are copied to the destination. If omitted, it is assumed that source is in the same storage account as destination.
@@ -419,6 +588,7 @@ helps['storage file copy start-batch'] = """
 helps['storage logging'] = """
     type: group
     short-summary: Manage Storage service logging information.
+    long-summary: The services of an account are handled at once. With --account-names or --resource-group, the commands apply to many accounts at once and report the result of each account.
 """
 
 helps['storage logging show'] = """
@@ -429,6 +599,9 @@ helps['storage logging show'] = """
 helps['storage logging update'] = """
     type: command
     short-summary: Update logging settings for a storage account.
+    examples:
+        - name: Log the writes and deletes of the blobs and tables of several accounts for 90 days.
+          text: az storage logging update --services bt --log wd --retention 90 --account-names account1 account2 account3
 """
 
 helps['storage message'] = """
@@ -436,14 +609,35 @@ helps['storage message'] = """
     short-summary: Manage queue storage messages.
 """
 
+helps['storage message put-batch'] = """
+    type: command
+    short-summary: Put messages read from a file or stdin onto a queue.
+    long-summary: The messages are sent in parallel as the input is read. Returns the number of messages sent and the lines which failed.
+    examples:
+        - name: Replay the messages drained from a poison queue.
+          text: az storage message put-batch -q orders -f orders-poison.jsonl --input-format jsonl
+"""
+
+helps['storage message drain'] = """
+    type: command
+    short-summary: Receive the messages of a queue, write them to a file and delete them.
+    examples:
+        - name: Save the messages of a poison queue to a file and empty it.
+          text: az storage message drain -q orders-poison -f orders-poison.jsonl
+"""
+
 helps['storage metrics'] = """
     type: group
     short-summary: Manage Storage service metrics.
+    long-summary: The services of an account are handled at once. With --account-names or --resource-group, the commands apply to many accounts at once and report the result of each account.
 """
 
 helps['storage metrics show'] = """
     type: command
     short-summary: Show metrics settings for a storage account.
+    examples:
+        - name: Show the hourly metrics settings of every storage account of a resource group.
+          text: az storage metrics show --interval hour -g MyResourceGroup -o table
 """
 
 helps['storage metrics update'] = """
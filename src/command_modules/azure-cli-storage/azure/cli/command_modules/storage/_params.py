@@ -34,7 +34,9 @@ from ._validators import \
      validate_select, validate_source_uri, validate_blob_type, validate_included_datasets,
      validate_custom_domain, validate_public_access, public_access_types,
      process_blob_upload_batch_parameters, process_blob_download_batch_parameters,
+     process_blob_sync_parameters, process_blob_delete_batch_parameters,
      process_file_upload_batch_parameters, process_file_download_batch_parameters,
+     process_file_delete_batch_parameters,
      get_content_setting_validator, validate_encryption, validate_accept,
      validate_key, storage_account_key_options,
      process_file_download_namespace, process_logging_update_namespace,
@@ -288,6 +290,7 @@ for item in ['download', 'upload']:
     register_cli_argument('storage blob {}'.format(item), 'file_path', options_list=('--file', '-f'), type=file_type, completer=FilesCompleter())
     register_cli_argument('storage blob {}'.format(item), 'max_connections', type=int)
     register_cli_argument('storage blob {}'.format(item), 'validate_content', action='store_true')
+    register_cli_argument('storage blob {}'.format(item), 'stream_window', type=int, help='The maximum number of MiB of blocks held in memory when --file is - and the blob streams through stdin or stdout.')
 
 for item in ['update', 'upload', 'upload-batch']:
     register_content_settings_argument('storage blob {}'.format(item), BlobContentSettings, item == 'update')
@@ -304,6 +307,15 @@ register_cli_argument('storage blob download-batch', 'source', options_list=('--
                       validator=process_blob_download_batch_parameters)
 
 register_cli_argument('storage blob download-batch', 'source_container_name', ignore_type)
+register_cli_argument('storage blob download-batch', 'max_connections', type=int)
+register_cli_argument('storage blob download-batch', 'use_inventory', options_list=('--inventory',), action='store_true')
+
+# BLOB DELETE-BATCH PARAMETERS
+register_cli_argument('storage blob delete-batch', 'source', options_list=('--source', '-s'),
+                      validator=process_blob_delete_batch_parameters)
+register_cli_argument('storage blob delete-batch', 'source_container_name', ignore_type)
+register_cli_argument('storage blob delete-batch', 'delete_snapshots', **enum_choice_list(list(delete_snapshot_types.keys())))
+register_cli_argument('storage blob delete-batch', 'max_connections', type=int)
 
 # BLOB UPLOAD-BATCH PARAMETERS
 register_cli_argument('storage blob upload-batch', 'destination', options_list=('--destination', '-d'))
@@ -331,7 +343,19 @@ register_cli_argument('storage blob upload-batch', 'content_md5', arg_group='Con
 register_cli_argument('storage blob upload-batch', 'content_type', arg_group='Content Control')
 register_cli_argument('storage blob upload-batch', 'content_cache_control', arg_group='Content Control')
 register_cli_argument('storage blob upload-batch', 'content_language', arg_group='Content Control')
-register_cli_argument('storage blob upload-batch', 'max_connections', type=int)
+register_cli_argument('storage blob upload-batch', 'put_md5', arg_group='Content Control')
+
+# BLOB SYNC PARAMETERS
+register_cli_argument('storage blob sync', 'destination', options_list=('--destination', '-d'))
+register_cli_argument('storage blob sync', 'source', options_list=('--source', '-s'),
+                      validator=process_blob_sync_parameters)
+register_cli_argument('storage blob sync', 'destination_container_name', ignore_type)
+register_cli_argument('storage blob sync', 'max_connections', type=int)
+register_cli_argument('storage blob sync', 'use_inventory', options_list=('--inventory',), action='store_true')
+
+# BLOB INVENTORY PARAMETERS
+register_cli_argument('storage blob inventory update', 'prefixes', nargs='+')
+register_cli_argument('storage blob inventory update', 'max_connections', type=int)
 
 # BLOB COPY-BATCH PARAMETERS
 
@@ -347,9 +371,12 @@ with CommandContext('storage blob copy start-batch') as c:
         group.reg_arg('source_share')
         group.reg_arg('prefix', validator=process_blob_copy_batch_namespace)
 
+    c.reg_arg('max_connections', type=int)
+
 # TODO: Remove workaround when Python storage SDK issue #190 is fixed.
-for item in ['upload', 'upload-batch']:
-    register_cli_argument('storage blob {}'.format(item), 'max_connections', type=int, help='Maximum number of parallel connections to use when the blob size exceeds 64MB.', default=1)
+register_cli_argument('storage blob upload', 'max_connections', type=int, help='Maximum number of parallel connections to use when the blob size exceeds 64MB.', default=1)
+register_cli_argument('storage blob upload-batch', 'max_connections', type=int, default=8,
+                      help='Maximum number of files to upload at once. Each blob is uploaded over a single connection.')
 
 # FILE UPLOAD-BATCH PARAMETERS
 with CommandContext('storage file upload-batch') as c:
@@ -358,10 +385,11 @@ with CommandContext('storage file upload-batch') as c:
 
     with c.arg_group('Download Control') as group:
         group.reg_arg('validate_content')
-        group.reg_arg('max_connections')
+        group.reg_arg('max_connections', type=int)
 
 register_content_settings_argument('storage file upload-batch', FileContentSettings,
                                    update=False, arg_group='Content Settings')
+register_cli_argument('storage file upload-batch', 'put_md5', arg_group='Content Settings')
 
 # FILE DOWNLOAD-BATCH PARAMETERS
 with CommandContext('storage file download-batch') as c:
@@ -372,6 +400,17 @@ with CommandContext('storage file download-batch') as c:
         group.reg_arg('validate_content')
         group.reg_arg('max_connections')
 
+# FILE DELETE-BATCH PARAMETERS
+with CommandContext('storage file delete-batch') as c:
+    c.reg_arg('source', options_list=('--source', '-s'), validator=process_file_delete_batch_parameters)
+    c.reg_arg('max_connections', type=int)
+
+# FILE SYNC PARAMETERS
+with CommandContext('storage file sync') as c:
+    c.reg_arg('source', options_list=('--source', '-s'), validator=process_file_upload_batch_parameters)
+    c.reg_arg('destination', options_list=('--destination', '-d'))
+    c.reg_arg('max_connections', type=int)
+
 # FILE COPY-BATCH PARAMETERS
 with CommandContext('storage file copy start-batch') as c:
     c.reg_arg('source_client', ignore_type, validator=get_source_file_or_blob_service_client)
@@ -384,6 +423,8 @@ with CommandContext('storage file copy start-batch') as c:
         group.reg_arg('source_container')
         group.reg_arg('source_share')
 
+    c.reg_arg('max_connections', type=int)
+
 for item in ['file', 'blob']:
     register_cli_argument('storage {} url'.format(item), 'protocol', help='Protocol to use.', default='https', **enum_choice_list(['http', 'https']))
     register_source_uri_arguments('storage {} copy start'.format(item))
@@ -461,6 +502,14 @@ register_path_argument('storage file upload', default_file_param='local_file_pat
 
 register_path_argument('storage file url')
 
+for item in ['container', 'blob', 'share', 'directory', 'file', 'table', 'queue']:
+    register_cli_argument('storage {} list'.format(item), 'num_results', type=int, help='The maximum number of items to list, over as many pages as it takes. Everything is listed if omitted. When there are more items, the marker to continue from is logged.')
+    register_cli_argument('storage {} list'.format(item), 'marker', help='Continue the listing from the marker logged by a listing cut short by --num-results.')
+
+register_cli_argument('storage blob list', 'delimiter', help='List the blobs whose names continue past the delimiter after the prefix as a single BlobPrefix entry, like a directory.')
+for item in ['directory', 'file']:
+    register_cli_argument('storage {} list'.format(item), 'prefix', help='List only the entries of the directory whose names start with the prefix.')
+
 for item in ['container', 'share', 'table', 'queue']:
     register_cli_argument('storage {} policy'.format(item), 'start', type=get_datetime_type(True), help='start UTC datetime (Y-m-d\'T\'H:M:S\'Z\'). Defaults to time of request.')
     register_cli_argument('storage {} policy'.format(item), 'expiry', type=get_datetime_type(True), help='expiration UTC datetime in (Y-m-d\'T\'H:M:S\'Z\')')
@@ -480,8 +529,15 @@ register_cli_argument('storage entity', 'property_resolver', ignore_type)
 register_cli_argument('storage entity', 'select', nargs='+', help='Space separated list of properties to return for each entity.', validator=validate_select)
 
 register_cli_argument('storage entity insert', 'if_exists', **enum_choice_list(['fail', 'merge', 'replace']))
+register_cli_argument('storage entity insert-batch', 'file_path', options_list=('--file', '-f'), type=file_type, completer=FilesCompleter())
+register_cli_argument('storage entity insert-batch', 'if_exists', **enum_choice_list(['fail', 'merge', 'replace']))
+register_cli_argument('storage entity insert-batch', 'max_connections', type=int)
 
 register_cli_argument('storage entity query', 'accept', help='Specifies how much metadata to include in the response payload.', default='minimal', validator=validate_accept, **enum_choice_list(table_payload_formats.keys()))
+register_cli_argument('storage entity query', 'all_pages', options_list=('--all',), action='store_true')
+register_cli_argument('storage entity query', 'partition_bounds', nargs='+')
+register_cli_argument('storage entity query', 'export_file', type=file_type, completer=FilesCompleter())
+register_cli_argument('storage entity query', 'max_connections', type=int)
 
 register_cli_argument('storage queue', 'queue_name', queue_name_type, options_list=('--name', '-n'))
 
@@ -494,11 +550,20 @@ register_cli_argument('storage message', 'queue_name', queue_name_type)
 register_cli_argument('storage message', 'message_id', options_list=('--id',))
 register_cli_argument('storage message', 'content', type=unicode_string, help='Message content, up to 64KB in size.')
 
-for item in ['account', 'blob', 'container', 'file', 'share', 'table', 'queue']:
-    register_cli_argument('storage {} generate-sas'.format(item), 'ip', help='Specifies the IP address or range of IP addresses from which to accept requests. Supports only IPv4 style addresses.', type=ipv4_range_type)
-    register_cli_argument('storage {} generate-sas'.format(item), 'expiry', help='Specifies the UTC datetime (Y-m-d\'T\'H:M\'Z\') at which the SAS becomes invalid. Do not use if a stored access policy is referenced with --id that specifies this value.', type=get_datetime_type(True))
-    register_cli_argument('storage {} generate-sas'.format(item), 'start', help='Specifies the UTC datetime (Y-m-d\'T\'H:M\'Z\') at which the SAS becomes valid. Do not use if a stored access policy is referenced with --id that specifies this value. Defaults to the time of the request.', type=get_datetime_type(True))
-    register_cli_argument('storage {} generate-sas'.format(item), 'protocol', options_list=('--https-only',), help='Only permit requests made with the HTTPS protocol. If omitted, requests from both the HTTP and HTTPS protocol are permitted.', action='store_const', const='https')
+register_cli_argument('storage message put-batch', 'file_path', options_list=('--file', '-f'), type=file_type, completer=FilesCompleter())
+register_cli_argument('storage message put-batch', 'input_format', **enum_choice_list(['text', 'jsonl']))
+register_cli_argument('storage message drain', 'file_path', options_list=('--file', '-f'), type=file_type, completer=FilesCompleter())
+for item in ['put-batch', 'drain']:
+    register_cli_argument('storage message {}'.format(item), 'visibility_timeout', type=int)
+    register_cli_argument('storage message {}'.format(item), 'max_connections', type=int)
+register_cli_argument('storage message put-batch', 'time_to_live', type=int)
+register_cli_argument('storage message drain', 'max_messages', type=int)
+
+for scope in ['storage {} generate-sas'.format(item) for item in ['account', 'blob', 'container', 'file', 'share', 'table', 'queue']] + ['storage blob generate-sas-batch', 'storage file generate-sas-batch']:
+    register_cli_argument(scope, 'ip', help='Specifies the IP address or range of IP addresses from which to accept requests. Supports only IPv4 style addresses.', type=ipv4_range_type)
+    register_cli_argument(scope, 'expiry', help='Specifies the UTC datetime (Y-m-d\'T\'H:M\'Z\') at which the SAS becomes invalid. Do not use if a stored access policy is referenced with --id that specifies this value.', type=get_datetime_type(True))
+    register_cli_argument(scope, 'start', help='Specifies the UTC datetime (Y-m-d\'T\'H:M\'Z\') at which the SAS becomes valid. Do not use if a stored access policy is referenced with --id that specifies this value. Defaults to the time of the request.', type=get_datetime_type(True))
+    register_cli_argument(scope, 'protocol', options_list=('--https-only',), help='Only permit requests made with the HTTPS protocol. If omitted, requests from both the HTTP and HTTPS protocol are permitted.', action='store_const', const='https')
 
 help_format = 'The permissions the SAS grants. Allowed values: {}. Do not use if a stored access policy is referenced with --id that specifies this value. Can be combined.'
 policies = [
@@ -515,6 +580,12 @@ for item in policies:
     register_cli_argument('storage {} generate-sas'.format(item['name']), 'permission', options_list=('--permissions',), help=item['sas_perm_help'], validator=item['perm_validator'])
     register_cli_argument('storage {} policy'.format(item['name']), 'permission', options_list=('--permissions',), help=item['policy_perm_help'], validator=item['perm_validator'])
 
+for item in [p for p in policies if p['name'] in ['blob', 'file']]:
+    register_cli_argument('storage {} generate-sas-batch'.format(item['name']), 'id', options_list=('--policy-name',), help='The name of a stored access policy within the {}\'s ACL.'.format(item['container']), completer=get_storage_acl_name_completion_list(item['class'], '{}_name'.format(item['container']), 'get_{}_acl'.format(item['container'])))
+    register_cli_argument('storage {} generate-sas-batch'.format(item['name']), 'permission', options_list=('--permissions',), help=item['sas_perm_help'], validator=item['perm_validator'])
+    register_cli_argument('storage {} generate-sas-batch'.format(item['name']), 'names_file', type=file_type, completer=FilesCompleter())
+    register_cli_argument('storage {} generate-sas-batch'.format(item['name']), 'processes', type=int)
+
 register_cli_argument('storage account generate-sas', 'services', help='The storage services the SAS is applicable for. Allowed values: (b)lob (f)ile (q)ueue (t)able. Can be combined.', type=services_type)
 register_cli_argument('storage account generate-sas', 'resource_types', help='The resource types the SAS is applicable for. Allowed values: (s)ervice (c)ontainer (o)bject. Can be combined.', type=resource_type_type)
 register_cli_argument('storage account generate-sas', 'expiry', help='Specifies the UTC datetime (Y-m-d\'T\'H:M\'Z\') at which the SAS becomes invalid.', type=get_datetime_type(True))
@@ -548,3 +619,8 @@ register_cli_argument('storage cors add', 'services', help='The storage service(
 register_cli_argument('storage cors clear', 'services', help='The storage service(s) for which to clear CORS rules: (b)lob (f)ile (q)ueue (t)able. Can be combined.')
 
 register_cli_argument('storage cors list', 'services', help='The storage service(s) for which to list the CORS rules: (b)lob (f)ile (q)ueue (t)able. Can be combined.')
+
+for item in ['cors', 'logging', 'metrics']:
+    register_cli_argument('storage {}'.format(item), 'account_names', nargs='+', arg_group='Storage Accounts', help='Apply to each of these storage accounts of the subscription, all at once. Their keys are looked up.')
+    register_cli_argument('storage {}'.format(item), 'resource_group_name', arg_group='Storage Accounts', help='Apply to each storage account of the resource group, all at once, or to those of them named with --account-names. Their keys are looked up.')
+    register_cli_argument('storage {}'.format(item), 'max_connections', type=int, arg_group='Storage Accounts', help='The number of requests to the storage accounts in flight at once.')
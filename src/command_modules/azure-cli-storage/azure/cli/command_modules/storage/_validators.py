@@ -12,9 +12,7 @@ from datetime import datetime, timedelta
 from azure.cli.core._config import az_config
 from azure.cli.core._profile import CLOUD
 from azure.cli.core._util import CLIError
-from azure.cli.core.commands.client_factory import get_mgmt_service_client
 from azure.cli.core.commands.validators import validate_key_value_pairs
-from azure.mgmt.storage import StorageManagementClient
 from azure.storage.sharedaccesssignature import SharedAccessSignature
 from azure.storage.blob import Include, PublicAccess
 from azure.storage.blob.baseblobservice import BaseBlobService
@@ -33,12 +31,10 @@ storage_account_key_options = {'primary': 'key1', 'secondary': 'key2'}
 # Utilities
 
 def _query_account_key(account_name):
-    scf = get_mgmt_service_client(StorageManagementClient)
-    acc = next((x for x in scf.storage_accounts.list() if x.name == account_name), None)
-    if acc:
-        from azure.cli.core.commands.arm import parse_resource_id
-        rg = parse_resource_id(acc.id)['resource_group']
-        return scf.storage_accounts.list_keys(rg, account_name).keys[0].value  # pylint: disable=no-member
+    from azure.cli.core.commands.storage_account_cache import get_storage_account_key
+    key = get_storage_account_key(account_name)
+    if key:
+        return key
     else:
         raise ValueError("Storage account '{}' not found.".format(account_name))
 
@@ -291,8 +287,17 @@ def validate_entity(namespace):
     ''' Converts a list of key value pairs into a dictionary. Ensures that required
     RowKey and PartitionKey are converted to the correct case and included. '''
     values = dict(x.split('=', 1) for x in namespace.entity)
-    keys = values.keys()
-    for key in keys:
+    values, missing_keys = normalize_entity_keys(values)
+    if missing_keys:
+        raise argparse.ArgumentError(
+            None, 'incorrect usage: entity requires: {}'.format(missing_keys))
+    namespace.entity = cast_entity_values(values)
+
+
+def normalize_entity_keys(values):
+    ''' Converts RowKey and PartitionKey to the correct case. Returns the entity and the
+    missing keys. '''
+    for key in list(values.keys()):
         if key.lower() == 'rowkey':
             val = values[key]
             del values[key]
@@ -305,10 +310,11 @@ def validate_entity(namespace):
     missing_keys = 'RowKey ' if 'RowKey' not in keys else ''
     missing_keys = '{}PartitionKey'.format(missing_keys) \
         if 'PartitionKey' not in keys else missing_keys
-    if missing_keys:
-        raise argparse.ArgumentError(
-            None, 'incorrect usage: entity requires: {}'.format(missing_keys))
+    return values, missing_keys.strip()
+
 
+def cast_entity_values(values):
+    ''' Casts the string values of an entity to numbers where possible. '''
     def cast_val(key, val):
         """ Attempts to cast numeric values (except RowKey and PartitionKey) to numbers so they
         can be queried correctly. """
@@ -323,8 +329,7 @@ def validate_entity(namespace):
         return try_cast(int) or try_cast(float) or val
 
     # ensure numbers are converted from strings so querying will work correctly
-    values = {key: cast_val(key, val) for key, val in values.items()}
-    namespace.entity = values
+    return {key: cast_val(key, val) for key, val in values.items()}
 
 
 def get_file_path_validator(default_file_param=None):
@@ -523,6 +528,15 @@ def process_blob_download_batch_parameters(namespace):
         raise ValueError('incorrect usage: destination must be an existing directory')
 
     # 2. try to extract account name and container name from source string
+    _process_blob_batch_container_parameters(namespace)
+
+
+def process_blob_delete_batch_parameters(namespace):
+    """Process the parameters for storage blob delete-batch command"""
+    _process_blob_batch_container_parameters(namespace)
+
+
+def _process_blob_batch_container_parameters(namespace):
     from .storage_url_helpers import StorageResourceIdentifier
     identifier = StorageResourceIdentifier(namespace.source)
 
@@ -539,6 +553,33 @@ def process_blob_download_batch_parameters(namespace):
 def process_blob_upload_batch_parameters(namespace):
     """Process the source and destination of storage blob upload command"""
 
+    _process_blob_upload_source_and_destination(namespace)
+
+    # 3. collect the files to be uploaded
+    namespace.source_files = [c for c in glob_files_locally(namespace.source, namespace.pattern)]
+
+    # 4. determine blob type
+    if namespace.blob_type is None:
+        vhd_files = [f for f in namespace.source_files if f[0].endswith('.vhd')]
+        if any(vhd_files) and len(vhd_files) == len(namespace.source_files):
+            # when all the listed files are vhd files use page
+            namespace.blob_type = 'page'
+        elif any(vhd_files):
+            # source files contain vhd files but not all of them
+            raise CLIError('''Fail to guess the required blob type. Type of the files to be
+            uploaded are not consistent. Default blob type for .vhd files is "page", while
+            others are "block". You can solve this problem by either explicitly set the blob
+            type or ensure the pattern matches a correct set of files.''')
+        else:
+            namespace.blob_type = 'block'
+
+
+def process_blob_sync_parameters(namespace):
+    """Process the source and destination of storage blob sync command"""
+    _process_blob_upload_source_and_destination(namespace)
+
+
+def _process_blob_upload_source_and_destination(namespace):
     # 1. quick check
     if not os.path.exists(namespace.source):
         raise ValueError('incorrect usage: source {} does not exist'.format(namespace.source))
@@ -559,24 +600,7 @@ def process_blob_upload_batch_parameters(namespace):
         if not namespace.account_name:
             namespace.account_name = identifier.account_name
 
-    # 3. collect the files to be uploaded
     namespace.source = os.path.realpath(namespace.source)
-    namespace.source_files = [c for c in glob_files_locally(namespace.source, namespace.pattern)]
-
-    # 4. determine blob type
-    if namespace.blob_type is None:
-        vhd_files = [f for f in namespace.source_files if f[0].endswith('.vhd')]
-        if any(vhd_files) and len(vhd_files) == len(namespace.source_files):
-            # when all the listed files are vhd files use page
-            namespace.blob_type = 'page'
-        elif any(vhd_files):
-            # source files contain vhd files but not all of them
-            raise CLIError('''Fail to guess the required blob type. Type of the files to be
-            uploaded are not consistent. Default blob type for .vhd files is "page", while
-            others are "block". You can solve this problem by either explicitly set the blob
-            type or ensure the pattern matches a correct set of files.''')
-        else:
-            namespace.blob_type = 'block'
 
 
 def process_blob_copy_batch_namespace(namespace):
@@ -617,6 +641,15 @@ def process_file_download_batch_parameters(namespace):
         raise ValueError('incorrect usage: destination must be an existing directory')
 
     # 2. try to extract account name and share name from source string
+    _process_file_batch_share_parameters(namespace)
+
+
+def process_file_delete_batch_parameters(namespace):
+    """Process the parameters for storage file batch delete command"""
+    _process_file_batch_share_parameters(namespace)
+
+
+def _process_file_batch_share_parameters(namespace):
     from .storage_url_helpers import StorageResourceIdentifier
     identifier = StorageResourceIdentifier(namespace.source)
     if identifier.is_url():
@@ -733,7 +766,7 @@ def transform_container_permission_output(result):
     return {'publicAccess': result.public_access or 'off'}
 
 
-def transform_cors_list_output(result):
+def _transform_cors_list(result):
     new_result = []
     for service in sorted(result.keys()):
         service_name = service
@@ -752,6 +785,26 @@ def transform_cors_list_output(result):
     return new_result
 
 
+def _transform_each_account(transform, result):
+    """ Apply a transform of the results by service of an account to the results of each account
+    of a command run on several accounts, with the account in the first column. """
+    if not isinstance(result, list):
+        return transform(result)
+    new_result = []
+    for entry in result:
+        account = entry['account']
+        for row in transform(entry['services']):
+            new_entry = OrderedDict([('Account', account)])
+            account = ''
+            new_entry.update(row)
+            new_result.append(new_entry)
+    return new_result
+
+
+def transform_cors_list_output(result):
+    return _transform_each_account(_transform_cors_list, result)
+
+
 def transform_entity_query_output(result):
     new_results = []
     ignored_keys = ['etag', 'Timestamp', 'RowKey', 'PartitionKey']
@@ -766,7 +819,7 @@ def transform_entity_query_output(result):
     return new_results
 
 
-def transform_logging_list_output(result):
+def _transform_logging_list(result):
     new_result = []
     for key in sorted(result.keys()):
         new_entry = OrderedDict()
@@ -779,7 +832,7 @@ def transform_logging_list_output(result):
     return new_result
 
 
-def transform_metrics_list_output(result):
+def _transform_metrics_list(result):
     new_result = []
     for service in sorted(result.keys()):
         service_name = service
@@ -804,7 +857,29 @@ def create_boolean_result_output_transformer(property_name):
 
 
 def transform_storage_list_output(result):
-    return list(result)
+    """ Yield the items of a listing as its pages come, so that printing them starts with the
+    first page and the listing is never held whole. A listing cut short by --num-results logs the
+    marker to continue it from with --marker. """
+    from azure.common import AzureException
+    from azure.cli.core.azlogging import get_az_logger
+    try:
+        for item in result:
+            yield item
+    except AzureException as ex:
+        # the later pages are listed as the output is printed, out of reach of the error
+        # handling of the command
+        raise CLIError(getattr(ex, 'message', None) or str(ex))
+    next_marker = getattr(result, 'next_marker', None)
+    if next_marker:
+        get_az_logger(__name__).warning('Next marker: %s', next_marker)
+
+
+def transform_logging_list_output(result):
+    return _transform_each_account(_transform_logging_list, result)
+
+
+def transform_metrics_list_output(result):
+    return _transform_each_account(_transform_metrics_list, result)
 
 
 def transform_url(result):
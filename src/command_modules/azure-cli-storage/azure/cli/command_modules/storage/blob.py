@@ -5,26 +5,28 @@
 
 from __future__ import print_function
 import os.path
-from collections import namedtuple
-from azure.common import AzureException
+from azure.common import AzureException, AzureHttpError
 
 from azure.cli.core._util import CLIError
 from azure.cli.core.azlogging import get_az_logger
+from azure.cli.command_modules.storage.transfer import CopyResult
 from azure.cli.command_modules.storage.util import (create_blob_service_from_storage_client,
                                                     create_file_share_from_storage_client,
                                                     create_short_lived_share_sas,
                                                     create_short_lived_container_sas,
-                                                    filter_none, collect_blobs, collect_files,
-                                                    mkdir_p)
+                                                    filter_none, collect_blobs, collect_blob_objects,
+                                                    collect_files, glob_files_locally, mkdir_p)
 
 
-BlobCopyResult = namedtuple('BlobCopyResult', ['name', 'copy_id'])
+DOWNLOAD_JOURNAL_FILE_NAME = '.az-download-batch.journal'
+DOWNLOAD_PARTIAL_SUFFIX = '.partial'
 
 
 # pylint: disable=too-many-arguments
 def storage_blob_copy_batch(client, source_client,
                             destination_container=None, source_container=None, source_share=None,
-                            source_sas=None, pattern=None, dryrun=False):
+                            source_sas=None, pattern=None, dryrun=False, wait=False,
+                            max_connections=8):
     """Copy a group of blob or files to a blob container."""
     logger = None
     if dryrun:
@@ -54,12 +56,14 @@ def storage_blob_copy_batch(client, source_client,
             if dryrun:
                 logger.warning('  - copy blob %s', blob_name)
             else:
-                return _copy_blob_to_blob_container(client, source_client, destination_container,
-                                                    source_container, source_sas, blob_name)
+                return lambda: _copy_blob_to_blob_container(client, source_client,
+                                                            destination_container,
+                                                            source_container, source_sas,
+                                                            blob_name)
 
-        return list(filter_none(action_blob_copy(blob) for blob in collect_blobs(source_client,
-                                                                                 source_container,
-                                                                                 pattern)))
+        actions = filter_none(action_blob_copy(blob) for blob in collect_blobs(source_client,
+                                                                               source_container,
+                                                                               pattern))
 
     elif source_share:
         # copy blob from file share
@@ -78,19 +82,31 @@ def storage_blob_copy_batch(client, source_client,
             if dryrun:
                 logger.warning('  - copy file %s', os.path.join(dir_name, file_name))
             else:
-                return _copy_file_to_blob_container(client, source_client, destination_container,
-                                                    source_share, source_sas, dir_name, file_name)
+                return lambda: _copy_file_to_blob_container(client, source_client,
+                                                            destination_container, source_share,
+                                                            source_sas, dir_name, file_name)
 
-        return list(filter_none(action_file_copy(file) for file in collect_files(source_client,
-                                                                                 source_share,
-                                                                                 pattern)))
+        actions = filter_none(action_file_copy(file) for file in collect_files(source_client,
+                                                                               source_share,
+                                                                               pattern))
     else:
         raise ValueError('Fail to find source. Neither blob container or file share is specified')
 
+    from .transfer import start_copies, wait_for_copies, widen_connection_pool
+
+    widen_connection_pool(client, max_connections)
+    copies = start_copies(actions, max_connections)
+    if wait and copies:
+        def _get_copy(blob_name):
+            return client.get_blob_properties(destination_container, blob_name).properties.copy
+
+        wait_for_copies(copies, _get_copy, max_connections)
+    return [client.make_blob_url(destination_container, c.name) for c in copies]
+
 
 # pylint: disable=unused-argument
 def storage_blob_download_batch(client, source, destination, source_container_name, pattern=None,
-                                dryrun=False):
+                                dryrun=False, max_connections=8, use_inventory=False):
     """
     Download blobs in a container recursively
 
@@ -109,10 +125,23 @@ def storage_blob_download_batch(client, source, destination, source_container_na
     :param str pattern:
         The pattern is used for files globbing. The supported patterns are '*', '?', '[seq]',
         and '[!seq]'.
+
+    :param int max_connections:
+        The maximum number of blobs to download in parallel.
+
+    :param bool use_inventory:
+        Take the blobs to download from the local inventory of the container instead of listing
+        the container. See az storage blob inventory.
     """
-    source_blobs = collect_blobs(client, source_container_name, pattern)
+    def _get_source_blobs():
+        if use_inventory:
+            from .inventory import get_inventory_blobs
+            return get_inventory_blobs(client, source_container_name, pattern=pattern)
+        return collect_blob_objects(client, source_container_name, pattern)
 
     if dryrun:
+        source_blobs = [b.name for b in _get_source_blobs()] if use_inventory else \
+            list(collect_blobs(client, source_container_name, pattern))
         logger = get_az_logger(__name__)
         logger.warning('download action: from %s to %s', source, destination)
         logger.warning('    pattern %s', pattern)
@@ -123,16 +152,46 @@ def storage_blob_download_batch(client, source, destination, source_container_na
             logger.warning('  - %s', b)
         return []
     else:
-        return list(_download_blob(client, source_container_name, destination, blob) for blob in
-                    source_blobs)
+        from .progress import TransferProgress
+        from .transfer import TransferJournal, run_transfers, widen_connection_pool
+
+        journal = TransferJournal(os.path.join(destination, DOWNLOAD_JOURNAL_FILE_NAME))
+        source_blobs = list(_get_source_blobs())
+        widen_connection_pool(client, max_connections)
+
+        pending = [b for b in source_blobs if not _is_downloaded(journal, source_container_name,
+                                                                 destination, b)]
+        progress = TransferProgress('download', len(pending),
+                                    sum(b.properties.content_length for b in pending))
+        progress.watch_retries(client)
+
+        def _transfer(blob):
+            def _action(_):
+                file_progress = progress.track_file(blob.properties.content_length)
+                try:
+                    _download_blob(client, source_container_name, destination, blob, journal,
+                                   file_progress.callback)
+                except BaseException:
+                    progress.update(files_failed=1)
+                    raise
+                file_progress.done()
+            return blob.properties.content_length, 1, _action
+
+        try:
+            run_transfers((_transfer(b) for b in pending), max_connections)
+        finally:
+            progress.done()
+        logger = get_az_logger(__name__)
+        logger.info('skipped %d blobs downloaded before', len(source_blobs) - len(pending))
+        return [b.name for b in source_blobs]
 
 
 def storage_blob_upload_batch(client, source, destination, pattern=None, source_files=None,
                               destination_container_name=None, blob_type=None,
                               content_settings=None, metadata=None, validate_content=False,
-                              maxsize_condition=None, max_connections=2, lease_id=None,
+                              maxsize_condition=None, max_connections=8, lease_id=None,
                               if_modified_since=None, if_unmodified_since=None, if_match=None,
-                              if_none_match=None, timeout=None, dryrun=False):
+                              if_none_match=None, timeout=None, dryrun=False, put_md5=False):
     """
     Upload files to storage container as blobs
 
@@ -160,13 +219,32 @@ def storage_blob_upload_batch(client, source, destination, pattern=None, source_
         operation only if the resource's ETag does not match the value specified. Specify the
         wildcard character (*) to perform the operation only if the resource does not exist,
         and fail the operation if it does exist.
+
+    :param bool put_md5:
+        Set the Content-MD5 of every blob to the MD5 of its file. The files are hashed in parallel
+        and their MD5 is cached, so files which haven't changed are not hashed again by later
+        batches.
     """
-    def _append_blob(file_path, blob_name):
+    from azure.storage.blob.models import ContentSettings
+    from .inventory import BLOB_TYPES, updating_inventory
+    from .sync import get_file_manifest, with_content_md5
+
+    if put_md5 and content_settings and content_settings.content_md5:
+        raise CLIError('usage error: --content-md5 | --put-md5')
+
+    md5s = {}
+
+    def _get_content_settings(file_path):
+        if file_path not in md5s:
+            return content_settings
+        return with_content_md5(content_settings, md5s[file_path], ContentSettings)
+
+    def _append_blob(file_path, blob_name, progress_callback):
         if not client.exists(destination_container_name, blob_name):
             client.create_blob(
                 container_name=destination_container_name,
                 blob_name=blob_name,
-                content_settings=content_settings,
+                content_settings=_get_content_settings(file_path),
                 metadata=metadata,
                 lease_id=lease_id,
                 if_modified_since=if_modified_since,
@@ -178,19 +256,19 @@ def storage_blob_upload_batch(client, source, destination, pattern=None, source_
             container_name=destination_container_name,
             blob_name=blob_name,
             file_path=file_path,
-            progress_callback=lambda c, t: None,
+            progress_callback=progress_callback,
             validate_content=validate_content,
             maxsize_condition=maxsize_condition,
             lease_id=lease_id,
             timeout=timeout)
 
-    def _upload_blob(file_path, blob_name):
+    def _upload_blob(file_path, blob_name, max_connections, progress_callback):
         return client.create_blob_from_path(
             container_name=destination_container_name,
             blob_name=blob_name,
             file_path=file_path,
-            progress_callback=lambda c, t: None,
-            content_settings=content_settings,
+            progress_callback=progress_callback,
+            content_settings=_get_content_settings(file_path),
             metadata=metadata,
             validate_content=validate_content,
             max_connections=max_connections,
@@ -201,7 +279,11 @@ def storage_blob_upload_batch(client, source, destination, pattern=None, source_
             if_none_match=if_none_match,
             timeout=timeout)
 
-    upload_action = _upload_blob if blob_type == 'block' or blob_type == 'page' else _append_blob
+    def _append_blob_action(file_path, blob_name, _, progress_callback):
+        return _append_blob(file_path, blob_name, progress_callback)
+
+    upload_action = _upload_blob if blob_type == 'block' or blob_type == 'page' \
+        else _append_blob_action
 
     if dryrun:
         logger = get_az_logger(__name__)
@@ -214,30 +296,299 @@ def storage_blob_upload_batch(client, source, destination, pattern=None, source_
         for f in source_files or []:
             logger.warning('  - %s => %s', *f)
     else:
-        for f in source_files or []:
-            print('uploading {}'.format(f[0]))
-            upload_action(*f)
+        if put_md5 and source_files:
+            manifest = get_file_manifest()
+            md5s.update(manifest.hash_files([f[0] for f in source_files]))
+            manifest.save()
+        with updating_inventory(client, destination_container_name) as inventory:
+            def _upload_action(file_path, blob_name, connections, progress_callback):
+                result = upload_action(file_path, blob_name, connections, progress_callback)
+                if inventory and upload_action is _upload_blob:
+                    settings = _get_content_settings(file_path)
+                    inventory.record_upload(blob_name, os.path.getsize(file_path), result,
+                                            BLOB_TYPES[blob_type],
+                                            settings.content_md5 if settings else None)
+                elif inventory:
+                    # an appended blob is larger than the file, it is listed again by the next
+                    # refresh
+                    inventory.record_delete(blob_name)
+                return result
+
+            _upload_files_concurrently(client, source_files or [], _upload_action,
+                                       max_connections)
+
+
+def storage_blob_delete_batch(client, source, source_container_name, pattern=None, dryrun=False,
+                              delete_snapshots=None, if_modified_since=None,
+                              if_unmodified_since=None, max_connections=8, timeout=None):
+    """
+    Delete blobs in a container recursively
+
+    :param str source:
+        The string represents the source of this delete operation. The source can be the
+        container URL or the container name. When the source is the container URL, the storage
+        account name will parsed from the URL.
+
+    :param str pattern:
+        The pattern is used for files globbing. The supported patterns are '*', '?', '[seq]',
+        and '[!seq]'. Every blob of the container is deleted if it is omitted.
+
+    :param bool dryrun:
+        Show the summary of the operations to be taken instead of actually deleting the blob(s)
+
+    :param str delete_snapshots:
+        Delete the snapshots of the blobs along with them, or only their snapshots. A blob which
+        has snapshots is not deleted without it.
+
+    :param datetime if_modified_since:
+        Delete only the blobs modified since the supplied UTC datetime (Y-m-d'T'H:M'Z').
+
+    :param datetime if_unmodified_since:
+        Delete only the blobs not modified since the supplied UTC datetime (Y-m-d'T'H:M'Z').
+
+    :param int max_connections:
+        The maximum number of blobs to delete in parallel.
+    """
+    from .inventory import updating_inventory
+    from .sync import get_timestamp
+    from .transfer import run_deletes, widen_connection_pool
+
+    modified_since = get_timestamp(if_modified_since)
+    unmodified_since = get_timestamp(if_unmodified_since)
+
+    def _is_selected(blob):
+        # the listing already tells which blobs the pre-conditions would spare, don't send a
+        # request for those
+        last_modified = get_timestamp(blob.properties.last_modified)
+        if last_modified is None:
+            return True
+        return (modified_since is None or last_modified > modified_since) and \
+            (unmodified_since is None or last_modified <= unmodified_since)
+
+    source_blobs = (b.name for b in collect_blob_objects(client, source_container_name,
+                                                         pattern or '*') if _is_selected(b))
+
+    if dryrun:
+        source_blobs = list(source_blobs)
+        logger = get_az_logger(__name__)
+        logger.warning('delete action: from %s', source)
+        logger.warning('    pattern %s', pattern)
+        logger.warning('  container %s', source_container_name)
+        logger.warning('      total %d', len(source_blobs))
+        logger.warning(' operations')
+        for b in source_blobs:
+            logger.warning('  - %s', b)
+        return {'deleted': 0, 'skipped': 0, 'failed': []}
+
+    with updating_inventory(client, source_container_name) as inventory:
+        def _delete(blob_name):
+            try:
+                client.delete_blob(source_container_name, blob_name,
+                                   delete_snapshots=delete_snapshots,
+                                   if_modified_since=if_modified_since,
+                                   if_unmodified_since=if_unmodified_since, timeout=timeout)
+            except AzureHttpError as ex:
+                if ex.status_code == 404 and inventory:
+                    inventory.record_delete(blob_name)
+                if ex.status_code == 409 and 'snapshot' in str(ex).lower():
+                    raise CLIError('the blob has snapshots, use --delete-snapshots to delete them')
+                raise
+            if inventory:
+                inventory.record_delete(blob_name)
+
+        widen_connection_pool(client, max_connections)
+        return run_deletes(_delete, source_blobs, max_connections)
+
+
+def storage_blob_sync(client, source, destination, destination_container_name=None, pattern=None,
+                      check_md5=False, delete_destination=False, max_connections=8,
+                      dryrun=False, use_inventory=False):
+    """
+    Upload the files of a local directory which are new or have changed to a blob container
+
+    :param str source:
+        The directory where the files to be synchronized are.
+
+    :param str destination:
+        The string represents the destination of this operation. The destination can be the
+        container URL or the container name. When the destination is the container URL, the
+        storage account name will parsed from the URL.
+
+    :param str pattern:
+        The pattern is used for files globbing. The supported patterns are '*', '?', '[seq]',
+        and '[!seq]'. Blobs which don't match the pattern are left alone.
+
+    :param bool check_md5:
+        Compare the MD5 of files with the Content-MD5 of blobs of the same size instead of their
+        modification times. The MD5 of uploaded blobs is recorded, and the MD5 of local files is
+        cached so unchanged files are not hashed again.
 
+    :param bool delete_destination:
+        Delete the blobs matching the pattern which have no corresponding local file.
 
-def _download_blob(blob_service, container, destination_folder, blob_name):
+    :param int max_connections:
+        Maximum number of files to upload at once. Each blob is uploaded over a single connection.
+
+    :param bool dryrun:
+        Show the summary of the operations to be taken instead of actually synchronizing.
+
+    :param bool use_inventory:
+        Compare the files with the blobs of the local inventory of the container instead of
+        listing the container. See az storage blob inventory.
+    """
+    from azure.storage.blob.models import ContentSettings, DeleteSnapshot
+    from .inventory import BLOB_TYPES, get_inventory_blobs, updating_inventory
+    from .sync import RemoteItem, get_file_manifest, get_timestamp, plan_sync
+    from .transfer import run_transfers
+
+    source_files = list(glob_files_locally(source, pattern))
+    remote_items = {}
+    # only the blobs under the literal prefix of the pattern are listed
+    listed = get_inventory_blobs(client, destination_container_name, pattern=pattern) \
+        if use_inventory else collect_blob_objects(client, destination_container_name, pattern)
+    for blob in listed:
+        remote_items[blob.name] = RemoteItem(blob.properties.content_length,
+                                             get_timestamp(blob.properties.last_modified),
+                                             blob.properties.content_settings.content_md5)
+
+    manifest = get_file_manifest() if check_md5 else None
+    uploads, extraneous = plan_sync(source_files, remote_items, manifest)
+    deletes = extraneous if delete_destination else []
+
+    if dryrun:
+        logger = get_az_logger(__name__)
+        logger.warning('sync action: from %s to %s', source, destination)
+        logger.warning('    pattern %s', pattern)
+        logger.warning('  container %s', destination_container_name)
+        logger.warning('  unchanged %d', len(source_files) - len(uploads))
+        logger.warning(' operations')
+        for f in uploads:
+            logger.warning('  - upload %s => %s', *f)
+        for name in deletes:
+            logger.warning('  - delete %s', name)
+        return {'uploaded': [], 'deleted': [], 'unchanged': len(source_files) - len(uploads)}
+
+    if manifest:
+        # the new and changed files are hashed in parallel before the uploads start
+        manifest.hash_files([f[0] for f in uploads])
+
+    with updating_inventory(client, destination_container_name) as inventory:
+        def _upload_blob(file_path, blob_name, connections, progress_callback):
+            content_md5 = manifest.get_md5(file_path) if manifest else None
+            result = client.create_blob_from_path(
+                container_name=destination_container_name,
+                blob_name=blob_name,
+                file_path=file_path,
+                content_settings=ContentSettings(content_md5=content_md5) if manifest else None,
+                progress_callback=progress_callback,
+                max_connections=connections)
+            if inventory:
+                inventory.record_upload(blob_name, os.path.getsize(file_path), result,
+                                        BLOB_TYPES['block'], content_md5)
+            return result
+
+        try:
+            _upload_files_concurrently(client, uploads, _upload_blob, max_connections)
+        finally:
+            if manifest:
+                manifest.prune(source, [f[0] for f in source_files])
+                manifest.save()
+
+        def _delete(name):
+            def _action(_):
+                client.delete_blob(destination_container_name, name,
+                                   delete_snapshots=DeleteSnapshot.Include)
+                if inventory:
+                    inventory.record_delete(name)
+            return 0, 1, _action
+
+        run_transfers((_delete(name) for name in deletes), max_connections)
+    return {'uploaded': [f[1] for f in uploads], 'deleted': deletes,
+            'unchanged': len(source_files) - len(uploads)}
+
+
+def _upload_files_concurrently(client, source_files, upload_action, max_connections):
+    from .transfer import upload_files
+
+    # TODO: Remove workaround when Python storage SDK issue #190 is fixed. Each blob goes up over a
+    # single connection, appending has to happen in order anyway, so the connections are only
+    # spent on uploading several files at once.
+    connections_for = lambda size: 1  # noqa: E731 lambda vs def
+    upload_files(client, source_files, upload_action, max_connections, connections_for)
+
+
+def _is_downloaded(journal, container, destination_folder, blob):
+    destination_path = os.path.join(destination_folder, blob.name)
+    return journal.is_completed(container, blob.name, blob.properties.etag,
+                                blob.properties.content_length) and \
+        os.path.isfile(destination_path) and \
+        os.path.getsize(destination_path) == blob.properties.content_length
+
+
+def _download_blob(blob_service, container, destination_folder, blob, journal,
+                   progress_callback=None):
+    """
+    Download a blob through a partial file which is only moved to the destination once complete.
+    The blob is downloaded over a single connection so the partial file always holds a prefix of
+    it, and a download interrupted earlier resumes where it stopped if the blob hasn't changed.
+    """
     # TODO: try catch IO exception
-    destination_path = os.path.join(destination_folder, blob_name)
+    destination_path = os.path.join(destination_folder, blob.name)
     destination_folder = os.path.dirname(destination_path)
     if not os.path.exists(destination_folder):
         mkdir_p(destination_folder)
 
-    blob = blob_service.get_blob_to_path(container, blob_name, destination_path)
+    etag = blob.properties.etag
+    length = blob.properties.content_length
+    partial_path = destination_path + DOWNLOAD_PARTIAL_SUFFIX
+    record = journal.get(container, blob.name)
+    downloaded = None
+    if record and not record.get('completed') and record.get('etag') == etag and \
+            os.path.isfile(partial_path) and 0 < os.path.getsize(partial_path) <= length:
+        offset = os.path.getsize(partial_path)
+        try:
+            if offset < length:
+                blob_service.get_blob_to_path(container, blob.name, partial_path, open_mode='ab',
+                                              start_range=offset, end_range=length - 1,
+                                              if_match=etag, max_connections=1,
+                                              progress_callback=_offset_callback(
+                                                  progress_callback, offset))
+            downloaded = (etag, length)
+        except AzureHttpError as ex:
+            if ex.status_code != 412:
+                raise
+            # the blob changed since the partial file was written, start over
+
+    if downloaded is None:
+        journal.record(container, blob.name, etag, length, completed=False)
+        result = blob_service.get_blob_to_path(container, blob.name, partial_path,
+                                               max_connections=1,
+                                               progress_callback=progress_callback)
+        # the blob may have changed since it was listed
+        downloaded = (result.properties.etag, result.properties.content_length)
+
+    if os.path.exists(destination_path):
+        os.remove(destination_path)
+    os.rename(partial_path, destination_path)
+    journal.record(container, blob.name, downloaded[0], downloaded[1], completed=True)
     return blob.name
 
 
+def _offset_callback(progress_callback, offset):
+    # a resumed download reports the bytes of the range, which starts after those already there
+    if progress_callback is None:
+        return None
+    return lambda current, total: progress_callback(offset + current, offset + total)
+
+
 def _copy_blob_to_blob_container(blob_service, source_blob_service, destination_container,
                                  source_container, source_sas, source_blob_name):
     source_blob_url = source_blob_service.make_blob_url(source_container, source_blob_name,
                                                         sas_token=source_sas)
 
     try:
-        blob_service.copy_blob(destination_container, source_blob_name, source_blob_url)
-        return blob_service.make_blob_url(destination_container, source_blob_name)
+        copy = blob_service.copy_blob(destination_container, source_blob_name, source_blob_url)
+        return CopyResult(source_blob_name, copy)
     except AzureException:
         error_template = 'Failed to copy blob {} to container {}.'
         raise CLIError(error_template.format(source_blob_name, destination_container))
@@ -253,8 +604,9 @@ def _copy_file_to_blob_container(blob_service, source_file_service, destination_
         if source_file_dir else source_file_name
 
     try:
-        blob_service.copy_blob(destination_container, blob_name=blob_name, copy_source=file_url)
-        return blob_service.make_blob_url(destination_container, blob_name)
+        copy = blob_service.copy_blob(destination_container, blob_name=blob_name,
+                                      copy_source=file_url)
+        return CopyResult(blob_name, copy)
     except AzureException as ex:
         error_template = 'Failed to copy file {} to container {}. {}'
         raise CLIError(error_template.format(source_file_name, destination_container, ex))
@@ -47,13 +47,13 @@ def _dont_fail_not_exist(ex):
 # storage account commands
 factory = lambda kwargs: storage_client_factory().storage_accounts  # noqa: E731 lambda vs def
 cli_command(__name__, 'storage account check-name', mgmt_path + 'check_name_availability', factory)
-cli_command(__name__, 'storage account delete', mgmt_path + 'delete', factory, confirmation=True)
+cli_command(__name__, 'storage account delete', custom_path + 'delete_storage_account', confirmation=True)
 cli_command(__name__, 'storage account show', mgmt_path + 'get_properties', factory, exception_handler=empty_on_404)
 cli_command(__name__, 'storage account create', custom_path + 'create_storage_account')
 cli_command(__name__, 'storage account list', custom_path + 'list_storage_accounts')
 cli_command(__name__, 'storage account show-usage', custom_path + 'show_storage_account_usage')
 cli_command(__name__, 'storage account show-connection-string', custom_path + 'show_storage_account_connection_string')
-cli_command(__name__, 'storage account keys renew', mgmt_path + 'regenerate_key', factory, transform=lambda x: x.keys)
+cli_command(__name__, 'storage account keys renew', custom_path + 'renew_storage_account_keys', transform=lambda x: x.keys)
 cli_command(__name__, 'storage account keys list', mgmt_path + 'list_keys', factory, transform=lambda x: x.keys)
 cli_generic_update_command(__name__, 'storage account update',
                            mgmt_path + 'get_properties',
@@ -88,12 +88,13 @@ cli_storage_data_plane_command('storage container policy update', custom_path +
 cli_storage_data_plane_command('storage blob list', block_blob_path + 'list_blobs', factory, transform=transform_storage_list_output, table_transformer=transform_blob_output)
 cli_storage_data_plane_command('storage blob delete', block_blob_path + 'delete_blob', factory, transform=create_boolean_result_output_transformer('deleted'), table_transformer=transform_boolean_for_table)
 cli_storage_data_plane_command('storage blob generate-sas', block_blob_path + 'generate_blob_shared_access_signature', factory)
+cli_storage_data_plane_command('storage blob generate-sas-batch', 'azure.cli.command_modules.storage.sas#storage_blob_generate_sas_batch', factory)
 cli_storage_data_plane_command('storage blob url', block_blob_path + 'make_blob_url', factory, transform=transform_url)
 cli_storage_data_plane_command('storage blob snapshot', block_blob_path + 'snapshot_blob', factory)
 cli_storage_data_plane_command('storage blob show', block_blob_path + 'get_blob_properties', factory, table_transformer=transform_blob_output, exception_handler=_dont_fail_not_exist)
 cli_storage_data_plane_command('storage blob update', block_blob_path + 'set_blob_properties', factory)
 cli_storage_data_plane_command('storage blob exists', base_blob_path + 'exists', factory, transform=create_boolean_result_output_transformer('exists'))
-cli_storage_data_plane_command('storage blob download', base_blob_path + 'get_blob_to_path', factory)
+cli_storage_data_plane_command('storage blob download', custom_path + 'download_blob', factory)
 cli_storage_data_plane_command('storage blob upload', custom_path + 'upload_blob', factory)
 cli_storage_data_plane_command('storage blob metadata show', block_blob_path + 'get_blob_metadata', factory, exception_handler=_dont_fail_not_exist)
 cli_storage_data_plane_command('storage blob metadata update', block_blob_path + 'set_blob_metadata', factory)
@@ -108,6 +109,12 @@ cli_storage_data_plane_command('storage blob copy start-batch', 'azure.cli.comma
 cli_storage_data_plane_command('storage blob copy cancel', block_blob_path + 'abort_copy_blob', factory)
 cli_storage_data_plane_command('storage blob upload-batch', 'azure.cli.command_modules.storage.blob#storage_blob_upload_batch', factory)
 cli_storage_data_plane_command('storage blob download-batch', 'azure.cli.command_modules.storage.blob#storage_blob_download_batch', factory)
+cli_storage_data_plane_command('storage blob delete-batch', 'azure.cli.command_modules.storage.blob#storage_blob_delete_batch', factory)
+cli_storage_data_plane_command('storage blob sync', 'azure.cli.command_modules.storage.blob#storage_blob_sync', factory)
+cli_storage_data_plane_command('storage blob inventory update', 'azure.cli.command_modules.storage.inventory#storage_blob_inventory_update', factory)
+cli_storage_data_plane_command('storage blob inventory show', 'azure.cli.command_modules.storage.inventory#storage_blob_inventory_show', factory)
+cli_storage_data_plane_command('storage blob inventory list', 'azure.cli.command_modules.storage.inventory#storage_blob_inventory_list', factory, table_transformer=transform_blob_output)
+cli_storage_data_plane_command('storage blob inventory delete', 'azure.cli.command_modules.storage.inventory#storage_blob_inventory_delete', factory)
 
 # share commands
 factory = file_data_service_factory
@@ -142,6 +149,7 @@ cli_storage_data_plane_command('storage file delete', file_service_path + 'delet
 cli_storage_data_plane_command('storage file resize', file_service_path + 'resize_file', factory)
 cli_storage_data_plane_command('storage file url', file_service_path + 'make_file_url', factory, transform=transform_url)
 cli_storage_data_plane_command('storage file generate-sas', file_service_path + 'generate_file_shared_access_signature', factory)
+cli_storage_data_plane_command('storage file generate-sas-batch', 'azure.cli.command_modules.storage.sas#storage_file_generate_sas_batch', factory)
 cli_storage_data_plane_command('storage file show', file_service_path + 'get_file_properties', factory, table_transformer=transform_file_output, exception_handler=_dont_fail_not_exist)
 cli_storage_data_plane_command('storage file update', file_service_path + 'set_file_properties', factory)
 cli_storage_data_plane_command('storage file exists', file_service_path + 'exists', factory, transform=create_boolean_result_output_transformer('exists'))
@@ -153,6 +161,8 @@ cli_storage_data_plane_command('storage file copy start', file_service_path + 'c
 cli_storage_data_plane_command('storage file copy cancel', file_service_path + 'abort_copy_file', factory)
 cli_storage_data_plane_command('storage file upload-batch', 'azure.cli.command_modules.storage.file#storage_file_upload_batch', factory)
 cli_storage_data_plane_command('storage file download-batch', 'azure.cli.command_modules.storage.file#storage_file_download_batch', factory)
+cli_storage_data_plane_command('storage file delete-batch', 'azure.cli.command_modules.storage.file#storage_file_delete_batch', factory)
+cli_storage_data_plane_command('storage file sync', 'azure.cli.command_modules.storage.file#storage_file_sync', factory)
 cli_storage_data_plane_command('storage file copy start-batch', 'azure.cli.command_modules.storage.file#storage_file_copy_batch', factory)
 
 # table commands
@@ -170,9 +180,10 @@ cli_storage_data_plane_command('storage table policy list', custom_path + 'list_
 cli_storage_data_plane_command('storage table policy update', custom_path + 'set_acl_policy', factory)
 
 # table entity commands
-cli_storage_data_plane_command('storage entity query', table_path + 'query_entities', factory, table_transformer=transform_entity_query_output)
+cli_storage_data_plane_command('storage entity query', 'azure.cli.command_modules.storage.entity#storage_entity_query', factory, table_transformer=transform_entity_query_output)
 cli_storage_data_plane_command('storage entity show', table_path + 'get_entity', factory, table_transformer=transform_entity_show, exception_handler=_dont_fail_not_exist)
 cli_storage_data_plane_command('storage entity insert', custom_path + 'insert_table_entity', factory)
+cli_storage_data_plane_command('storage entity insert-batch', 'azure.cli.command_modules.storage.entity#storage_entity_insert_batch', factory)
 cli_storage_data_plane_command('storage entity replace', table_path + 'update_entity', factory)
 cli_storage_data_plane_command('storage entity merge', table_path + 'merge_entity', factory)
 cli_storage_data_plane_command('storage entity delete', table_path + 'delete_entity', factory, transform=create_boolean_result_output_transformer('deleted'), table_transformer=transform_boolean_for_table)
@@ -197,6 +208,8 @@ cli_storage_data_plane_command('storage queue policy update', custom_path + 'set
 cli_storage_data_plane_command('storage message put', queue_path + 'put_message', factory)
 cli_storage_data_plane_command('storage message get', queue_path + 'get_messages', factory, table_transformer=transform_message_show)
 cli_storage_data_plane_command('storage message peek', queue_path + 'peek_messages', factory, table_transformer=transform_message_show)
+cli_storage_data_plane_command('storage message put-batch', 'azure.cli.command_modules.storage.message#storage_message_put_batch', factory)
+cli_storage_data_plane_command('storage message drain', 'azure.cli.command_modules.storage.message#storage_message_drain', factory)
 cli_storage_data_plane_command('storage message delete', queue_path + 'delete_message', factory, transform=create_boolean_result_output_transformer('deleted'), table_transformer=transform_boolean_for_table)
 cli_storage_data_plane_command('storage message clear', queue_path + 'clear_messages', factory)
 cli_storage_data_plane_command('storage message update', queue_path + 'update_message', factory)
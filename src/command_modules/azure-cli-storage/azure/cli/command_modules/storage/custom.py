@@ -6,7 +6,8 @@
 # pylint: disable=no-self-use,too-many-arguments,line-too-long
 
 from __future__ import print_function
-from sys import stderr
+import os.path
+from collections import OrderedDict
 
 from azure.mgmt.storage.models import Kind
 from azure.storage.models import Logging, Metrics, CorsRule, RetentionPolicy
@@ -22,37 +23,50 @@ from azure.cli.core._util import CLIError
 
 from azure.cli.command_modules.storage._factory import \
     (storage_client_factory, generic_data_service_factory)
+from azure.cli.command_modules.storage._validators import transform_storage_list_output
 
 
-def _update_progress(current, total):
-    if total:
-        message = 'Percent complete: %'
-        percent_done = current * 100 / total
-        message += '{: >5.1f}'.format(percent_done)
-        print('\b' * len(message) + message, end='', file=stderr)
-        stderr.flush()
-        if current == total:
-            print('', file=stderr)
+def _run_with_progress(client, operation, size, transfer):
+    """ Call transfer with an SDK progress callback reporting the progress of a single file,
+    whose size may be unknown. """
+    from .progress import TransferProgress
+    progress = TransferProgress(operation, 1, size)
+    progress.watch_retries(client)
+    file_progress = progress.track_file(size)
+    try:
+        result = transfer(file_progress.callback)
+        file_progress.done()
+        return result
+    except BaseException:
+        progress.update(files_failed=1)
+        raise
+    finally:
+        progress.done()
 
 
 # CUSTOM METHODS
 
 @transfer_doc(FileService.list_directories_and_files)
-def list_share_files(client, share_name, directory_name=None, timeout=None,
-                     exclude_dir=False):
+def list_share_files(client, share_name, directory_name=None, prefix=None, num_results=None,
+                     marker=None, timeout=None, exclude_dir=False):
     generator = client.list_directories_and_files(share_name, directory_name,
-                                                  timeout=timeout)
+                                                  num_results=num_results, marker=marker,
+                                                  timeout=timeout, prefix=prefix)
     if exclude_dir:
-        return list(f for f in generator if isinstance(f.properties, FileProperties))
+        return (f for f in transform_storage_list_output(generator)
+                if isinstance(f.properties, FileProperties))
     else:
         return generator
 
 
 @transfer_doc(FileService.list_directories_and_files)
-def list_share_directories(client, share_name, directory_name=None, timeout=None):
+def list_share_directories(client, share_name, directory_name=None, prefix=None,
+                           num_results=None, marker=None, timeout=None):
     generator = client.list_directories_and_files(share_name, directory_name,
-                                                  timeout=timeout)
-    return list(f for f in generator if isinstance(f.properties, DirectoryProperties))
+                                                  num_results=num_results, marker=marker,
+                                                  timeout=timeout, prefix=prefix)
+    return (f for f in transform_storage_list_output(generator)
+            if isinstance(f.properties, DirectoryProperties))
 
 
 def list_storage_accounts(resource_group_name=None):
@@ -109,6 +123,23 @@ def create_storage_account(resource_group_name, account_name, sku, location,
     return scf.storage_accounts.create(resource_group_name, account_name, params)
 
 
+def delete_storage_account(resource_group_name, account_name):
+    """ Delete a storage account. """
+    from azure.cli.core.commands.storage_account_cache import invalidate_storage_account_cache
+    scf = storage_client_factory()
+    scf.storage_accounts.delete(resource_group_name, account_name)
+    invalidate_storage_account_cache(account_name)
+
+
+def renew_storage_account_keys(resource_group_name, account_name, key_name):
+    """ Regenerate one of the access keys of a storage account. """
+    from azure.cli.core.commands.storage_account_cache import invalidate_storage_account_cache
+    scf = storage_client_factory()
+    keys = scf.storage_accounts.regenerate_key(resource_group_name, account_name, key_name)
+    invalidate_storage_account_cache(account_name)
+    return keys
+
+
 def update_storage_account(instance, sku=None, tags=None, custom_domain=None,
                            use_subdomain=None, encryption=None, access_tier=None):
     from azure.mgmt.storage.models import \
@@ -134,9 +165,12 @@ def upload_blob(  # pylint: disable=too-many-locals
         client, container_name, blob_name, file_path, blob_type=None,
         content_settings=None, metadata=None, validate_content=False, maxsize_condition=None,
         max_connections=2, lease_id=None, if_modified_since=None,
-        if_unmodified_since=None, if_match=None, if_none_match=None, timeout=None):
+        if_unmodified_since=None, if_match=None, if_none_match=None, timeout=None,
+        stream_window=64):
     '''Upload a blob to a container.'''
-    def upload_append_blob():
+    from .stream import get_stdin, is_stream_path, upload_block_blob_from_stream
+
+    def upload_append_blob(progress_callback):
         if not client.exists(container_name, blob_name):
             client.create_blob(
                 container_name=container_name,
@@ -148,22 +182,72 @@ def upload_blob(  # pylint: disable=too-many-locals
                 if_match=if_match,
                 if_none_match=if_none_match,
                 timeout=timeout)
+        if is_stream_path(file_path):
+            return client.append_blob_from_stream(
+                container_name=container_name,
+                blob_name=blob_name,
+                stream=get_stdin(),
+                validate_content=validate_content,
+                maxsize_condition=maxsize_condition,
+                lease_id=lease_id,
+                progress_callback=progress_callback,
+                timeout=timeout)
         return client.append_blob_from_path(
             container_name=container_name,
             blob_name=blob_name,
             file_path=file_path,
-            progress_callback=_update_progress,
+            progress_callback=progress_callback,
             validate_content=validate_content,
             maxsize_condition=maxsize_condition,
             lease_id=lease_id,
             timeout=timeout)
 
-    def upload_block_blob():
+    def upload_block_blob(progress_callback):
+        if is_stream_path(file_path):
+            if blob_type == 'page':
+                raise CLIError('usage error: a page blob can not be uploaded from stdin, its size '
+                               'must be known up front')
+            return upload_block_blob_from_stream(
+                client, container_name, blob_name, get_stdin(),
+                max_connections=max_connections,
+                window=stream_window * 1024 * 1024,
+                validate_content=validate_content,
+                lease_id=lease_id,
+                progress_callback=progress_callback,
+                content_settings=content_settings,
+                metadata=metadata,
+                if_modified_since=if_modified_since,
+                if_unmodified_since=if_unmodified_since,
+                if_match=if_match,
+                if_none_match=if_none_match,
+                timeout=timeout)
+        if blob_type == 'block' and \
+                os.path.getsize(file_path) > getattr(client, 'MAX_SINGLE_PUT_SIZE', 0):
+            # large block blobs go up in blocks sent straight from a map of the file
+            from .mmap_upload import FileNotMappedError, upload_block_blob_from_mmap
+            try:
+                return upload_block_blob_from_mmap(
+                    client, container_name, blob_name, file_path,
+                    max_connections=max_connections,
+                    validate_content=validate_content,
+                    lease_id=lease_id,
+                    progress_callback=progress_callback,
+                    content_settings=content_settings,
+                    metadata=metadata,
+                    if_modified_since=if_modified_since,
+                    if_unmodified_since=if_unmodified_since,
+                    if_match=if_match,
+                    if_none_match=if_none_match,
+                    timeout=timeout)
+            except FileNotMappedError as ex:
+                from azure.cli.core.azlogging import get_az_logger
+                get_az_logger(__name__).debug("Unable to map '%s', uploading it through the "
+                                              "SDK: %s", file_path, ex)
         return client.create_blob_from_path(
             container_name=container_name,
             blob_name=blob_name,
             file_path=file_path,
-            progress_callback=_update_progress,
+            progress_callback=progress_callback,
             content_settings=content_settings,
             metadata=metadata,
             validate_content=validate_content,
@@ -181,7 +265,34 @@ def upload_blob(  # pylint: disable=too-many-locals
         'block': upload_block_blob,
         'page': upload_block_blob  # same implementation
     }
-    return type_func[blob_type]()
+    size = None if is_stream_path(file_path) else os.path.getsize(file_path)
+    return _run_with_progress(client, 'upload', size, type_func[blob_type])
+
+
+@transfer_doc(BaseBlobService.get_blob_to_path)
+def download_blob(client, container_name, blob_name, file_path, open_mode='wb', snapshot=None,
+                  start_range=None, end_range=None, validate_content=False,
+                  max_connections=2, lease_id=None, if_modified_since=None,
+                  if_unmodified_since=None, if_match=None, if_none_match=None, timeout=None,
+                  stream_window=64):
+    from .stream import download_blob_to_stream, get_stdout, is_stream_path
+
+    if is_stream_path(file_path):
+        _run_with_progress(client, 'download', None, lambda callback: download_blob_to_stream(
+            client, container_name, blob_name, get_stdout(), max_connections=max_connections,
+            window=stream_window * 1024 * 1024, snapshot=snapshot, start_range=start_range,
+            end_range=end_range, validate_content=validate_content, lease_id=lease_id,
+            progress_callback=callback, if_modified_since=if_modified_since,
+            if_unmodified_since=if_unmodified_since, if_match=if_match,
+            if_none_match=if_none_match, timeout=timeout))
+        # stdout carries the content of the blob
+        return None
+    return _run_with_progress(client, 'download', None, lambda callback: client.get_blob_to_path(
+        container_name, blob_name, file_path, open_mode=open_mode, snapshot=snapshot,
+        start_range=start_range, end_range=end_range, validate_content=validate_content,
+        progress_callback=callback, max_connections=max_connections, lease_id=lease_id,
+        if_modified_since=if_modified_since, if_unmodified_since=if_unmodified_since,
+        if_match=if_match, if_none_match=if_none_match, timeout=timeout))
 
 
 def _get_service_container_type(client):
@@ -365,78 +476,171 @@ class ServiceProperties(object):
 
 
 SERVICES = {
-    'b': ServiceProperties('blob', BaseBlobService),
-    'f': ServiceProperties('file', FileService),
-    'q': ServiceProperties('queue', QueueService),
-    't': ServiceProperties('table', TableService)
+    'b': ('blob', BaseBlobService),
+    'f': ('file', FileService),
+    'q': ('queue', QueueService),
+    't': ('table', TableService)
 }
 
 
-def list_cors(services='bfqt', account_name=None, account_key=None, connection_string=None,
-              sas_token=None, timeout=None):
-    results = {}
-    for character in services:
-        properties = SERVICES[character]
-        results[properties.name] = properties.get_cors(
-            account_name, account_key, connection_string, sas_token, timeout)
+def _get_storage_account_resource_groups(account_names=None, resource_group_name=None):
+    """ The resource groups of the storage accounts named, or of those of a resource group, by
+    account name. """
+    from azure.cli.core.commands.arm import parse_resource_id
+    scf = storage_client_factory()
+    if resource_group_name:
+        accounts = scf.storage_accounts.list_by_resource_group(resource_group_name)
+    else:
+        accounts = scf.storage_accounts.list()
+    result = {a.name: parse_resource_id(a.id)['resource_group'] for a in accounts
+              if not account_names or a.name in account_names}
+    missing = sorted(set(account_names or []) - set(result))
+    if missing:
+        raise CLIError('Storage accounts not found: {}'.format(', '.join(missing)))
+    return result
+
+
+def _add_service_error(entry, service_name, ex):
+    from azure.cli.core.azlogging import get_az_logger
+    message = str(getattr(ex, 'message', None) or ex)
+    get_az_logger(__name__).error('%s %s: %s', entry['account'], service_name, message)
+    entry.setdefault('errors', OrderedDict())[service_name] = message
+
+
+# pylint: disable=too-many-locals
+def _for_each_service(services, operation, account_name=None, account_key=None,
+                      connection_string=None, sas_token=None, account_names=None,
+                      resource_group_name=None, max_connections=16):
+    """
+    Call operation with the ServiceProperties of each of the services and the credentials of the
+    account, for all the services at once, and return the results by service name.
+
+    Given account names or a resource group, the services of all those accounts are called at
+    once, up to max_connections calls at a time, with the keys of the accounts looked up. The
+    result is then a list, ordered by account name, of the account name, its results by service
+    name, and its errors by service name if any. An account failing doesn't stop the others.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from azure.cli.core.commands.storage_account_cache import get_storage_account_key
+
+    if not account_names and not resource_group_name:
+        credentials = {'account_name': account_name, 'account_key': account_key,
+                       'connection_string': connection_string, 'sas_token': sas_token}
+        with ThreadPoolExecutor(max_workers=max(len(services), 1)) as executor:
+            calls = [(SERVICES[c][0], executor.submit(operation, ServiceProperties(*SERVICES[c]),
+                                                      credentials)) for c in services]
+            return {name: call.result() for name, call in calls}
+
+    resource_groups = _get_storage_account_resource_groups(account_names, resource_group_name)
+
+    def _get_key(name):
+        # the keys are shared with the commands given a single account, through the cache
+        return get_storage_account_key(name, resource_group_name=resource_groups[name])
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max_connections) as executor:
+        keys = [(name, executor.submit(_get_key, name)) for name in sorted(resource_groups)]
+        calls = []
+        for name, key in keys:
+            entry = OrderedDict([('account', name), ('services', OrderedDict())])
+            results.append(entry)
+            try:
+                credentials = {'account_name': name, 'account_key': key.result()}
+            except Exception as ex:  # pylint: disable=broad-except
+                _add_service_error(entry, 'account', ex)
+                continue
+            for c in services:
+                calls.append((entry, SERVICES[c][0],
+                              executor.submit(operation, ServiceProperties(*SERVICES[c]),
+                                              credentials)))
+        for entry, service_name, call in calls:
+            try:
+                entry['services'][service_name] = call.result()
+            except Exception as ex:  # pylint: disable=broad-except
+                _add_service_error(entry, service_name, ex)
     return results
 
 
+def _update_each_service(services, operation, **kwargs):
+    results = _for_each_service(services, operation, **kwargs)
+    if isinstance(results, list):
+        failed = [entry['account'] for entry in results if entry.get('errors')]
+        if failed:
+            raise CLIError('Failed to update {} of {} storage accounts: {}'.format(
+                len(failed), len(results), ', '.join(failed)))
+    return None
+
+
+def list_cors(services='bfqt', account_name=None, account_key=None, connection_string=None,
+              sas_token=None, timeout=None, account_names=None, resource_group_name=None,
+              max_connections=16):
+    return _for_each_service(
+        services, lambda properties, credentials: properties.get_cors(timeout=timeout,
+                                                                      **credentials),
+        account_name, account_key, connection_string, sas_token, account_names,
+        resource_group_name, max_connections)
+
+
 def add_cors(services, origins, methods, max_age=0, exposed_headers=None, allowed_headers=None,
              account_name=None, account_key=None, connection_string=None, sas_token=None,
-             timeout=None):
-    for character in services:
-        properties = SERVICES[character]
-        properties.add_cors(
-            origins, methods, max_age, exposed_headers, allowed_headers, account_name, account_key,
-            connection_string, sas_token, timeout)
-    return None
+             timeout=None, account_names=None, resource_group_name=None, max_connections=16):
+    return _update_each_service(
+        services, lambda properties, credentials: properties.add_cors(
+            origins, methods, max_age, exposed_headers, allowed_headers, timeout=timeout,
+            **credentials),
+        account_name=account_name, account_key=account_key, connection_string=connection_string,
+        sas_token=sas_token, account_names=account_names, resource_group_name=resource_group_name,
+        max_connections=max_connections)
 
 
 def clear_cors(services, account_name=None, account_key=None, connection_string=None,
-               sas_token=None, timeout=None):
-    for character in services:
-        properties = SERVICES[character]
-        properties.clear_cors(
-            account_name, account_key, connection_string, sas_token, timeout)
-    return None
+               sas_token=None, timeout=None, account_names=None, resource_group_name=None,
+               max_connections=16):
+    return _update_each_service(
+        services, lambda properties, credentials: properties.clear_cors(timeout=timeout,
+                                                                        **credentials),
+        account_name=account_name, account_key=account_key, connection_string=connection_string,
+        sas_token=sas_token, account_names=account_names, resource_group_name=resource_group_name,
+        max_connections=max_connections)
 
 
 def set_logging(services, log, retention, account_name=None, account_key=None,
-                connection_string=None, sas_token=None, timeout=None):
-    for character in services:
-        properties = SERVICES[character]
-        properties.set_logging(
-            'r' in log, 'w' in log, 'd' in log, retention, account_name, account_key,
-            connection_string, sas_token, timeout)
-    return None
+                connection_string=None, sas_token=None, timeout=None, account_names=None,
+                resource_group_name=None, max_connections=16):
+    return _update_each_service(
+        services, lambda properties, credentials: properties.set_logging(
+            'r' in log, 'w' in log, 'd' in log, retention, timeout=timeout, **credentials),
+        account_name=account_name, account_key=account_key, connection_string=connection_string,
+        sas_token=sas_token, account_names=account_names, resource_group_name=resource_group_name,
+        max_connections=max_connections)
 
 
 def set_metrics(services, retention, hour=None, minute=None, api=None, account_name=None,
-                account_key=None, connection_string=None, sas_token=None, timeout=None):
-    for character in services:
-        properties = SERVICES[character]
-        properties.set_metrics(
-            retention, hour, minute, api, account_name, account_key, connection_string,
-            sas_token, timeout)
-    return None
+                account_key=None, connection_string=None, sas_token=None, timeout=None,
+                account_names=None, resource_group_name=None, max_connections=16):
+    return _update_each_service(
+        services, lambda properties, credentials: properties.set_metrics(
+            retention, hour, minute, api, timeout=timeout, **credentials),
+        account_name=account_name, account_key=account_key, connection_string=connection_string,
+        sas_token=sas_token, account_names=account_names, resource_group_name=resource_group_name,
+        max_connections=max_connections)
 
 
 def get_logging(services='bqt', account_name=None, account_key=None, connection_string=None,
-                sas_token=None, timeout=None):
-    results = {}
-    for character in services:
-        properties = SERVICES[character]
-        results[properties.name] = properties.get_logging(
-            account_name, account_key, connection_string, sas_token, timeout)
-    return results
+                sas_token=None, timeout=None, account_names=None, resource_group_name=None,
+                max_connections=16):
+    return _for_each_service(
+        services, lambda properties, credentials: properties.get_logging(timeout=timeout,
+                                                                         **credentials),
+        account_name, account_key, connection_string, sas_token, account_names,
+        resource_group_name, max_connections)
 
 
 def get_metrics(services='bfqt', interval='both', account_name=None, account_key=None,
-                connection_string=None, sas_token=None, timeout=None):
-    results = {}
-    for character in services:
-        properties = SERVICES[character]
-        results[properties.name] = properties.get_metrics(
-            interval, account_name, account_key, connection_string, sas_token, timeout)
-    return results
+                connection_string=None, sas_token=None, timeout=None, account_names=None,
+                resource_group_name=None, max_connections=16):
+    return _for_each_service(
+        services, lambda properties, credentials: properties.get_metrics(
+            interval, timeout=timeout, **credentials),
+        account_name, account_key, connection_string, sas_token, account_names,
+        resource_group_name, max_connections)
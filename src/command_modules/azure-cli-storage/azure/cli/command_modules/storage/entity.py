@@ -0,0 +1,262 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+Commands for storage table entity batch operations
+"""
+
+import os.path
+from collections import OrderedDict, namedtuple
+
+from azure.cli.core._util import CLIError
+from azure.cli.core.azlogging import get_az_logger
+
+# the service accepts up to 100 operations on entities of a single partition in one transaction
+MAX_BATCH_SIZE = 100
+
+# the partitions with a batch being filled at once, per connection inserting batches
+PENDING_BATCHES_PER_CONNECTION = 4
+
+# the entities of a batch and the lines of the input they were read from
+EntityBatch = namedtuple('EntityBatch', ['partition_key', 'entities', 'lines'])
+
+
+# pylint: disable=too-many-arguments
+def storage_entity_insert_batch(client, table_name, file_path, if_exists='fail',
+                                max_connections=8, timeout=None):
+    """
+    Insert the entities of a file into a table in batches
+
+    :param str file_path:
+        The file to read the entities from. A file with the .csv extension has a header line
+        naming the properties and an entity per line, any other file has a JSON object per line.
+        Every entity must have a PartitionKey and a RowKey.
+
+    :param str if_exists:
+        What should happen if an entity already exists for the specified PartitionKey and
+        RowKey.
+
+    :param int max_connections:
+        The maximum number of batches to insert in parallel.
+    """
+    import timeit
+    from azure.storage.table import TableBatch
+    from .transfer import run_streamed, widen_connection_pool
+
+    logger = get_az_logger(__name__)
+    operation = {'fail': 'insert_entity', 'merge': 'insert_or_merge_entity',
+                 'replace': 'insert_or_replace_entity'}.get(if_exists)
+    if not operation:
+        raise CLIError("Unrecognized value '{}' for --if-exists".format(if_exists))
+
+    failures = []
+
+    def _entities():
+        for line, entity, error in read_entities(file_path):
+            if error:
+                logger.warning('line %d: %s', line, error)
+                failures.append({'lines': [line], 'error': error})
+            else:
+                yield line, entity
+
+    def _commit(entity_batch):
+        batch = TableBatch()
+        for entity in entity_batch.entities:
+            getattr(batch, operation)(entity)
+        client.commit_batch(table_name, batch, timeout=timeout)
+
+    widen_connection_pool(client, max_connections)
+    start = timeit.default_timer()
+    inserted = batches = 0
+    batches_to_commit = group_entities(_entities(),
+                                       max_connections * PENDING_BATCHES_PER_CONNECTION)
+    for entity_batch, _, ex in run_streamed(_commit, batches_to_commit, max_connections):
+        if ex:
+            error = getattr(ex, 'message', None) or str(ex)
+            logger.warning("batch of %d entities of partition '%s' from line %d failed: %s",
+                           len(entity_batch.entities), entity_batch.partition_key,
+                           entity_batch.lines[0], error)
+            failures.append({'partitionKey': entity_batch.partition_key,
+                             'lines': entity_batch.lines, 'error': error})
+        else:
+            inserted += len(entity_batch.entities)
+            batches += 1
+
+    elapsed = max(timeit.default_timer() - start, 1e-6)
+    logger.warning('inserted %d entities in %d batches in %.1fs: %.1f entities/s', inserted,
+                   batches, elapsed, inserted / elapsed)
+    return {'inserted': inserted, 'batches': batches, 'failures': failures}
+
+
+# pylint: disable=too-many-arguments,too-many-locals,redefined-builtin
+def storage_entity_query(client, table_name, filter=None, select=None, num_results=None,
+                         marker=None, accept=None, property_resolver=None, timeout=None,
+                         all_pages=False, partition_bounds=None, export_file=None,
+                         max_connections=8):
+    """
+    List entities which satisfy a query
+
+    :param bool all_pages:
+        Follow the continuation markers and return every entity matching the query rather than
+        only the first page.
+
+    :param list partition_bounds:
+        PartitionKey values splitting the scan into ranges which are queried in parallel. Implies
+        --all.
+
+    :param str export_file:
+        Write every entity matching the query to a file as it arrives, as a JSON object per line
+        which `storage entity insert-batch` reads back. Use - for stdout. Implies --all.
+
+    :param int max_connections:
+        The maximum number of PartitionKey ranges to query in parallel.
+    """
+    kwargs = {'select': select, 'num_results': num_results,
+              'property_resolver': property_resolver, 'timeout': timeout}
+    if accept:
+        kwargs['accept'] = accept
+    if not (all_pages or partition_bounds or export_file):
+        return client.query_entities(table_name, filter=filter, marker=marker, **kwargs)
+    if marker and partition_bounds:
+        raise CLIError('usage error: --marker can only be used without --partition-bounds')
+
+    from itertools import islice
+    from .transfer import scan_concurrently, widen_connection_pool
+
+    def _scan(range_filter):
+        return lambda: client.query_entities(table_name, filter=range_filter, marker=marker,
+                                             **kwargs)
+
+    filters = partition_range_filters(partition_bounds or [], filter)
+    if len(filters) == 1:
+        entities = _scan(filters[0])()
+    else:
+        widen_connection_pool(client, max_connections)
+        entities = scan_concurrently([_scan(f) for f in filters], max_connections)
+    if num_results is not None:
+        # every range stops at num_results, the scan as a whole too
+        entities = islice(entities, num_results)
+
+    if export_file:
+        _export_entities(entities, export_file)
+        return None
+    return {'items': list(entities), 'nextMarker': None}
+
+
+def partition_range_filters(bounds, query_filter=None):
+    """ Returns the filters of a query split on the PartitionKey values in bounds: one range below
+    the first bound, one from each bound up to the next and one from the last bound on. """
+    def _quote(value):
+        return "'{}'".format(value.replace("'", "''"))
+
+    def _combine(*conditions):
+        conditions = [c for c in conditions if c]
+        if len(conditions) == 1:
+            return conditions[0]
+        return ' and '.join('({})'.format(c) for c in conditions) if conditions else None
+
+    bounds = sorted(set(bounds))
+    if not bounds:
+        return [query_filter]
+    ranges = [(None, bounds[0])] + list(zip(bounds, bounds[1:])) + [(bounds[-1], None)]
+    return [_combine(query_filter,
+                     'PartitionKey ge {}'.format(_quote(low)) if low is not None else None,
+                     'PartitionKey lt {}'.format(_quote(high)) if high is not None else None)
+            for low, high in ranges]
+
+
+def _export_entities(entities, export_file):
+    import timeit
+    from .util import open_stream
+    logger = get_az_logger(__name__)
+
+    start = timeit.default_timer()
+    count = 0
+    with open_stream(export_file, 'w') as f:
+        for entity in entities:
+            f.write(entity_to_json(entity) + '\n')
+            count += 1
+    elapsed = max(timeit.default_timer() - start, 1e-6)
+    logger.warning('exported %d entities in %.1fs: %.1f entities/s', count, elapsed,
+                   count / elapsed)
+
+
+def entity_to_json(entity):
+    """ Serialize an entity as a single line of JSON, without its etag. Typed properties are
+    written as their value. """
+    import json
+    from azure.storage.table import EntityProperty
+    from azure.cli.core._output import ComplexEncoder
+    from azure.cli.core._util import todict
+
+    values = {k: v.value if isinstance(v, EntityProperty) else v
+              for k, v in entity.items() if k != 'etag'}
+    return json.dumps(todict(values), sort_keys=True, cls=ComplexEncoder)
+
+
+def read_entities(file_path):
+    """ Yields the line number, the entity and an error message for each entity of a CSV or JSON
+    lines file. Either the entity or the error is None. The file is read as it is consumed. """
+    import json
+    from ._validators import cast_entity_values, normalize_entity_keys
+
+    def _check(line, values):
+        values, missing_keys = normalize_entity_keys(values)
+        if missing_keys:
+            return line, None, 'entity requires: {}'.format(missing_keys)
+        return line, values, None
+
+    if os.path.splitext(file_path)[1].lower() == '.csv':
+        import csv
+        with open(file_path) as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                # the values of a CSV are strings, an empty one is taken as a missing property
+                values = {k: v for k, v in row.items() if k and v != ''}
+                line, entity, error = _check(reader.line_num, values)
+                yield line, cast_entity_values(entity) if entity else None, error
+    else:
+        with open(file_path) as f:
+            for line, text in enumerate(f, 1):
+                if not text.strip():
+                    continue
+                try:
+                    values = json.loads(text)
+                except ValueError as ex:
+                    yield line, None, 'invalid JSON: {}'.format(ex)
+                    continue
+                if not isinstance(values, dict):
+                    yield line, None, 'an entity must be a JSON object'
+                    continue
+                yield _check(line, values)
+
+
+def group_entities(entities, max_pending=32):
+    """
+    Group (line, entity) tuples into batches of entities of the same partition.
+
+    Every partition has one batch being filled at a time, which is yielded when it is full or
+    when an entity with the same RowKey comes in, as an entity can only appear once in a batch.
+    At most max_pending batches are filled at once, the oldest is yielded as it is when an entity
+    of yet another partition comes in, so that an input of many partitions is streamed rather
+    than held until its end. The batches left are yielded once the entities run out.
+    """
+    pending = OrderedDict()
+    for line, entity in entities:
+        partition_key = entity['PartitionKey']
+        batch = pending.get(partition_key)
+        if batch and any(e['RowKey'] == entity['RowKey'] for e in batch.entities):
+            yield pending.pop(partition_key)
+            batch = None
+        if batch is None:
+            if len(pending) >= max_pending:
+                yield pending.popitem(last=False)[1]
+            batch = pending[partition_key] = EntityBatch(partition_key, [], [])
+        batch.entities.append(entity)
+        batch.lines.append(line)
+        if len(batch.entities) == MAX_BATCH_SIZE:
+            yield pending.pop(partition_key)
+    for partition_key in list(pending):
+        yield pending.pop(partition_key)
@@ -13,6 +13,7 @@ import os.path
 from azure.cli.core.azlogging import get_az_logger
 from azure.cli.core._util import CLIError
 from azure.common import AzureException, AzureHttpError
+from azure.cli.command_modules.storage.transfer import CopyResult
 from azure.cli.command_modules.storage.util import (filter_none, collect_blobs, collect_files,
                                                     create_blob_service_from_storage_client,
                                                     create_short_lived_container_sas,
@@ -20,15 +21,21 @@ from azure.cli.command_modules.storage.util import (filter_none, collect_blobs,
 
 
 def storage_file_upload_batch(client, destination, source, pattern=None, dryrun=False,
-                              validate_content=False, content_settings=None, max_connections=1,
-                              metadata=None):
+                              validate_content=False, content_settings=None, max_connections=8,
+                              metadata=None, put_md5=False):
     """
     Upload local files to Azure Storage File Share in batch
     """
 
+    from azure.storage.file.models import ContentSettings
+    from .sync import get_file_manifest, with_content_md5
+    from .transfer import plan_connections, upload_files
     from .util import glob_files_locally
     source_files = [c for c in glob_files_locally(source, pattern)]
 
+    if put_md5 and content_settings and content_settings.content_md5:
+        raise CLIError('usage error: --content-md5 | --put-md5')
+
     if dryrun:
         logger = get_az_logger(__name__)
         logger.warning('upload files to file share')
@@ -41,25 +48,38 @@ def storage_file_upload_batch(client, destination, source, pattern=None, dryrun=
 
         return []
 
-    # TODO: Performance improvement
-    # 1. Upload files in parallel
-    def _upload_action(source_pair):
-        dir_name = os.path.dirname(source_pair[1])
-        file_name = os.path.basename(source_pair[1])
+    _make_directories_in_files_share(client, destination,
+                                     (os.path.dirname(f[1]) for f in source_files), max_connections)
+
+    md5s = {}
+    if put_md5 and source_files:
+        manifest = get_file_manifest()
+        md5s = manifest.hash_files([f[0] for f in source_files])
+        manifest.save()
+
+    def _upload_action(file_path, name, connections, progress_callback):
+        dir_name = os.path.dirname(name)
+        file_name = os.path.basename(name)
 
-        _make_directory_in_files_share(client, destination, dir_name)
         client.create_file_from_path(share_name=destination,
                                      directory_name=dir_name,
                                      file_name=file_name,
-                                     local_file_path=source_pair[0],
-                                     content_settings=content_settings,
+                                     local_file_path=file_path,
+                                     content_settings=with_content_md5(
+                                         content_settings, md5s[file_path], ContentSettings)
+                                     if file_path in md5s else content_settings,
                                      metadata=metadata,
-                                     max_connections=max_connections,
+                                     max_connections=connections,
+                                     progress_callback=progress_callback,
                                      validate_content=validate_content)
 
         return client.make_file_url(destination, dir_name, file_name)
 
-    return list(_upload_action(f) for f in source_files)
+    # files are always uploaded in ranges of up to 4MB
+    range_size = getattr(client, 'MAX_RANGE_SIZE', 4 * 1024 * 1024)
+    connections_for = plan_connections([os.path.getsize(f[0]) for f in source_files],
+                                       max_connections, range_size, range_size)
+    return upload_files(client, source_files, _upload_action, max_connections, connections_for)
 
 
 def storage_file_download_batch(client, source, destination, pattern=None, dryrun=False,
@@ -102,10 +122,134 @@ def storage_file_download_batch(client, source, destination, pattern=None, dryru
     return list(_download_action(f) for f in source_files)
 
 
+def storage_file_delete_batch(client, source, pattern=None, dryrun=False, max_connections=8,
+                              timeout=None):
+    """
+    Delete files from an Azure Storage File Share in batch
+    """
+    from .transfer import run_deletes, widen_connection_pool
+    from .util import glob_files_remotely
+
+    source_files = (os.path.join(*f) for f in glob_files_remotely(client, source, pattern,
+                                                                  max_workers=max_connections))
+
+    if dryrun:
+        source_files_list = list(source_files)
+
+        logger = get_az_logger(__name__)
+        logger.warning('delete files from file share')
+        logger.warning('    account %s', client.account_name)
+        logger.warning('      share %s', source)
+        logger.warning('    pattern %s', pattern)
+        logger.warning('      total %d', len(source_files_list))
+        logger.warning(' operations')
+        for f in source_files_list:
+            logger.warning('  - %s', f)
+
+        return {'deleted': 0, 'skipped': 0, 'failed': []}
+
+    def _delete(name):
+        client.delete_file(source, os.path.dirname(name) or None, os.path.basename(name),
+                           timeout=timeout)
+
+    # the crawl of the share shares the connections with the deletes
+    widen_connection_pool(client, max_connections * 2)
+    return run_deletes(_delete, source_files, max_connections)
+
+
+def storage_file_sync(client, source, destination, pattern=None, check_md5=False,
+                      delete_destination=False, max_connections=8, dryrun=False):
+    """
+    Upload the files of a local directory which are new or have changed to a file share
+    """
+    from azure.storage.file.models import ContentSettings
+    from .sync import RemoteItem, get_file_manifest, get_timestamp, plan_sync
+    from .transfer import plan_connections, run_transfers, upload_files
+    from .util import glob_files_locally, glob_file_objects_remotely
+
+    source_files = list(glob_files_locally(source, pattern))
+    remote_items = {}
+    for dir_name, f in glob_file_objects_remotely(client, destination, pattern):
+        remote_items[os.path.join(dir_name, f.name)] = RemoteItem(f.properties.content_length,
+                                                                  None, None)
+
+    # listing a share only returns the size of the files, look up the rest for the files that
+    # could be unchanged
+    def _get_properties(name):
+        def _action(_):
+            properties = client.get_file_properties(destination, os.path.dirname(name) or None,
+                                                    os.path.basename(name)).properties
+            remote_items[name] = RemoteItem(properties.content_length,
+                                            get_timestamp(properties.last_modified),
+                                            properties.content_settings.content_md5)
+        return 0, 1, _action
+
+    run_transfers((_get_properties(name) for path, name in source_files
+                   if name in remote_items and
+                   remote_items[name].size == os.path.getsize(path)), max_connections)
+
+    manifest = get_file_manifest() if check_md5 else None
+    uploads, extraneous = plan_sync(source_files, remote_items, manifest)
+    deletes = extraneous if delete_destination else []
+
+    if dryrun:
+        logger = get_az_logger(__name__)
+        logger.warning('sync files to file share')
+        logger.warning('    account %s', client.account_name)
+        logger.warning('      share %s', destination)
+        logger.warning('  unchanged %d', len(source_files) - len(uploads))
+        logger.warning(' operations')
+        for f in uploads:
+            logger.warning('  - upload %s => %s', *f)
+        for name in deletes:
+            logger.warning('  - delete %s', name)
+        return {'uploaded': [], 'deleted': [], 'unchanged': len(source_files) - len(uploads)}
+
+    if manifest:
+        # the new and changed files are hashed in parallel before the uploads start
+        manifest.hash_files([f[0] for f in uploads])
+
+    _make_directories_in_files_share(client, destination,
+                                     (os.path.dirname(f[1]) for f in uploads), max_connections)
+
+    def _upload_file(file_path, name, connections, progress_callback):
+        dir_name = os.path.dirname(name)
+        content_settings = ContentSettings(content_md5=manifest.get_md5(file_path)) \
+            if manifest else None
+        client.create_file_from_path(share_name=destination,
+                                     directory_name=dir_name,
+                                     file_name=os.path.basename(name),
+                                     local_file_path=file_path,
+                                     content_settings=content_settings,
+                                     progress_callback=progress_callback,
+                                     max_connections=connections)
+
+    # files are always uploaded in ranges of up to 4MB
+    range_size = getattr(client, 'MAX_RANGE_SIZE', 4 * 1024 * 1024)
+    connections_for = plan_connections([os.path.getsize(f[0]) for f in uploads], max_connections,
+                                       range_size, range_size)
+    try:
+        upload_files(client, uploads, _upload_file, max_connections, connections_for)
+    finally:
+        if manifest:
+            manifest.prune(source, [f[0] for f in source_files])
+            manifest.save()
+
+    def _delete(name):
+        def _action(_):
+            client.delete_file(destination, os.path.dirname(name) or None, os.path.basename(name))
+        return 0, 1, _action
+
+    run_transfers((_delete(name) for name in deletes), max_connections)
+    return {'uploaded': [f[1] for f in uploads], 'deleted': deletes,
+            'unchanged': len(source_files) - len(uploads)}
+
+
 def storage_file_copy_batch(client, source_client,
                             destination_share=None, destination_path=None,
                             source_container=None, source_share=None, source_sas=None,
-                            pattern=None, dryrun=False, metadata=None, timeout=None):
+                            pattern=None, dryrun=False, metadata=None, timeout=None, wait=False,
+                            max_connections=8):
     """
     Copy a group of files asynchronously
     """
@@ -142,13 +286,13 @@ def storage_file_copy_batch(client, source_client,
             if dryrun:
                 logger.warning('  - copy blob %s', blob_name)
             else:
-                return _create_file_and_directory_from_blob(
+                return lambda: _create_file_and_directory_from_blob(
                     client, source_client, destination_share, source_container, source_sas,
                     blob_name, destination_dir=destination_path, metadata=metadata, timeout=timeout,
                     existing_dirs=existing_dirs)
 
-        return list(filter_none(action_blob_copy(blob) for blob in
-                                collect_blobs(source_client, source_container, pattern)))
+        actions = filter_none(action_blob_copy(blob) for blob in
+                              collect_blobs(source_client, source_container, pattern))
 
     elif source_share:
         # copy files from share to share
@@ -173,17 +317,30 @@ def storage_file_copy_batch(client, source_client,
             if dryrun:
                 logger.warning('  - copy file %s', os.path.join(dir_name, file_name))
             else:
-                return _create_file_and_directory_from_file(
+                return lambda: _create_file_and_directory_from_file(
                     client, source_client, destination_share, source_share, source_sas, dir_name,
                     file_name, destination_dir=destination_path, metadata=metadata,
                     timeout=timeout, existing_dirs=existing_dirs)
 
-        return list(filter_none(action_file_copy(file) for file in
-                                collect_files(source_client, source_share, pattern)))
+        actions = filter_none(action_file_copy(file) for file in
+                              collect_files(source_client, source_share, pattern))
     else:
         # won't happen, the validator should ensure either source_container or source_share is set
         raise ValueError('Fail to find source. Neither blob container or file share is specified.')
 
+    from .transfer import start_copies, wait_for_copies, widen_connection_pool
+
+    widen_connection_pool(client, max_connections)
+    copies = start_copies(actions, max_connections)
+    if wait and copies:
+        def _get_copy(path):
+            return client.get_file_properties(destination_share, os.path.dirname(path) or None,
+                                              os.path.basename(path)).properties.copy
+
+        wait_for_copies(copies, _get_copy, max_connections)
+    return [client.make_file_url(destination_share, os.path.dirname(c.name) or None,
+                                 os.path.basename(c.name)) for c in copies]
+
 
 def _create_file_and_directory_from_blob(file_service, blob_service, share, container, sas,
                                          blob_name,
@@ -199,8 +356,8 @@ def _create_file_and_directory_from_blob(file_service, blob_service, share, cont
     _make_directory_in_files_share(file_service, share, dir_name, existing_dirs)
 
     try:
-        file_service.copy_file(share, dir_name, file_name, blob_url, metadata, timeout)
-        return file_service.make_file_url(share, dir_name, file_name)
+        copy = file_service.copy_file(share, dir_name, file_name, blob_url, metadata, timeout)
+        return CopyResult(full_path, copy)
     except AzureException:
         error_template = 'Failed to copy blob {} to file share {}. Please check if you have ' + \
                          'permission to read source or set a correct sas token.'
@@ -223,8 +380,8 @@ def _create_file_and_directory_from_file(file_service, source_file_service, shar
     _make_directory_in_files_share(file_service, share, dir_name, existing_dirs)
 
     try:
-        file_service.copy_file(share, dir_name, file_name, file_url, metadata, timeout)
-        return file_service.make_file_url(share, dir_name or None, file_name)
+        copy = file_service.copy_file(share, dir_name, file_name, file_url, metadata, timeout)
+        return CopyResult(full_path, copy)
     except AzureException:
         error_template = 'Failed to copy file {} from share {} to file share {}. Please check if ' \
                          'you have right permission to read source or set a correct sas token.'
@@ -250,15 +407,44 @@ def _make_directory_in_files_share(file_service, file_share, directory_path, exi
         p = os.path.dirname(p)
 
     for dir_name in reversed(parents):
-        if existing_dirs and (dir_name in existing_dirs):
+        if existing_dirs is not None and (dir_name in existing_dirs):
             continue
 
-        try:
-            file_service.create_directory(share_name=file_share,
-                                          directory_name=dir_name,
-                                          fail_on_exist=False)
-        except AzureHttpError:
-            raise CLIError('Failed to create directory {}'.format(dir_name))
+        _create_directory(file_service, file_share, dir_name)
+
+        if existing_dirs is not None:
+            existing_dirs.add(dir_name)
+
 
-        if existing_dirs:
-            existing_dirs.add(directory_path)
+def _make_directories_in_files_share(file_service, file_share, directory_paths, max_connections):
+    """
+    Create the given directories and their parents once each, before any file is uploaded to them.
+
+    The directories are created one level at a time so that the parents of a directory always
+    exist by the time it is created, and the directories of a level are created concurrently.
+    """
+    from .transfer import run_transfers
+
+    levels = {}
+    for directory_path in set(directory_paths):
+        parents = []
+        while directory_path:
+            parents.append(directory_path)
+            directory_path = os.path.dirname(directory_path)
+        for depth, dir_name in enumerate(reversed(parents)):
+            levels.setdefault(depth, set()).add(dir_name)
+
+    def _create(dir_name):
+        return 0, 1, lambda _: _create_directory(file_service, file_share, dir_name)
+
+    for depth in sorted(levels):
+        run_transfers((_create(dir_name) for dir_name in sorted(levels[depth])), max_connections)
+
+
+def _create_directory(file_service, file_share, dir_name):
+    try:
+        file_service.create_directory(share_name=file_share,
+                                      directory_name=dir_name,
+                                      fail_on_exist=False)
+    except AzureHttpError:
+        raise CLIError('Failed to create directory {}'.format(dir_name))
@@ -0,0 +1,366 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+A local inventory of the blobs of a container.
+
+Listing a container of millions of blobs takes thousands of requests, and the batch commands used
+to list the container again on every run. An inventory is a SQLite database under the config
+directory with the name, size, type, tier, last modified time, ETag and Content-MD5 of every blob
+of a container. It is filled by listing the virtual directories of the container in parallel,
+download-batch and sync read it instead of listing the container when given --inventory, and the
+commands writing or deleting blobs keep an existing inventory current with what they changed. A
+refresh can be limited to some prefixes, the blobs outside of them are kept as they are.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from dateutil.tz import tzutc
+from six import unichr
+
+from azure.cli.core._util import CLIError
+
+from .sync import get_timestamp
+
+INVENTORY_DIR_NAME = 'storageInventory'
+
+# the prefixes of a listing are split into those of their virtual directories until there are
+# enough of them to keep max_connections listings busy, or this many levels down
+MAX_SPLIT_DEPTH = 3
+
+# a virtual directory with more blobs of its own than this is listed flat rather than split
+MAX_SPLIT_BLOBS = 1000
+
+# the blobs written to the database at a time
+INSERT_BATCH_SIZE = 1000
+
+_SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS blobs (name TEXT PRIMARY KEY, size INTEGER, blob_type TEXT, '
+    'tier TEXT, last_modified REAL, etag TEXT, content_md5 TEXT) WITHOUT ROWID',
+    'CREATE TABLE IF NOT EXISTS properties (name TEXT PRIMARY KEY, value TEXT)'
+]
+
+_COLUMNS = 'name, size, blob_type, tier, last_modified, etag, content_md5'
+
+# the types of blobs as listed, by the type of upload
+BLOB_TYPES = {'block': 'BlockBlob', 'page': 'PageBlob', 'append': 'AppendBlob'}
+
+
+def get_inventory_path(account_name, container_name):
+    from azure.cli.core._environment import get_config_dir
+    return os.path.join(get_config_dir(), INVENTORY_DIR_NAME, account_name,
+                        container_name + '.sqlite')
+
+
+def _get_prefix_range(prefix):
+    # the names starting with prefix sort from prefix up to, and not including, prefix with its
+    # last character incremented
+    return prefix, prefix[:-1] + unichr(ord(prefix[-1]) + 1)
+
+
+def _to_row(blob):
+    properties = blob.properties
+    content_settings = getattr(properties, 'content_settings', None)
+    return (blob.name, properties.content_length, properties.blob_type,
+            getattr(properties, 'blob_tier', None), get_timestamp(properties.last_modified),
+            properties.etag, content_settings.content_md5 if content_settings else None)
+
+
+def _to_blob(row):
+    from azure.storage.blob.models import Blob
+    blob = Blob(row[0])
+    properties = blob.properties
+    properties.content_length, properties.blob_type = row[1], row[2]
+    properties.blob_tier = row[3]
+    properties.last_modified = _to_datetime(row[4])
+    properties.etag = row[5]
+    properties.content_settings.content_md5 = row[6]
+    return blob
+
+
+def _to_datetime(timestamp):
+    return None if timestamp is None else datetime.fromtimestamp(timestamp, tzutc())
+
+
+def _split_prefix(client, container_name, prefix):
+    """
+    List the blobs and the virtual directories right under prefix. Returns None once more than
+    MAX_SPLIT_BLOBS blobs come up, the prefix is then better listed flat than split.
+    """
+    from azure.storage.blob.models import BlobPrefix
+    blobs = []
+    prefixes = []
+    for item in client.list_blobs(container_name, prefix=prefix or None, delimiter='/'):
+        if isinstance(item, BlobPrefix):
+            prefixes.append(item.name)
+        elif len(blobs) < MAX_SPLIT_BLOBS:
+            blobs.append(item)
+        else:
+            return None
+    return blobs, prefixes
+
+
+def _split_prefixes(client, container_name, prefixes, max_connections, add_blob):
+    """
+    Split the prefixes of a listing into those of their virtual directories, one level at a time,
+    until there are enough of them to keep max_connections listings busy. The prefixes of a level
+    are split concurrently, and those holding many blobs of their own are kept whole. The blobs
+    met on the way are passed to add_blob. Returns the prefixes left to list.
+    """
+    from .transfer import scan_concurrently
+    whole = []
+    for _ in range(MAX_SPLIT_DEPTH):
+        if not prefixes or len(whole) + len(prefixes) >= max_connections:
+            break
+        splits = [lambda p=p: [(p, _split_prefix(client, container_name, p))] for p in prefixes]
+        prefixes = []
+        for prefix, split in scan_concurrently(splits, max_connections):
+            if split is None:
+                whole.append(prefix)
+                continue
+            blobs, sub_prefixes = split
+            for blob in blobs:
+                add_blob(blob)
+            prefixes.extend(sub_prefixes)
+        prefixes.sort()
+    return whole + prefixes
+
+
+class BlobInventory(object):
+    """
+    The inventory of the blobs of a container in a SQLite database. Only the thread which opened
+    the inventory uses the database, the blobs changed by transfers running on other threads are
+    recorded with record_upload and record_delete and written by save.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._connection = sqlite3.connect(path)
+        for statement in _SCHEMA:
+            self._connection.execute(statement)
+        self._connection.commit()
+        self._lock = threading.Lock()
+        self._uploaded = []
+        self._deleted = []
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _get_property(self, name):
+        row = self._connection.execute('SELECT value FROM properties WHERE name = ?',
+                                       (name,)).fetchone()
+        return row[0] if row else None
+
+    def _set_property(self, name, value):
+        self._connection.execute('INSERT OR REPLACE INTO properties (name, value) VALUES (?, ?)',
+                                 (name, value))
+
+    def refresh(self, client, container_name, prefixes=None, max_connections=8):
+        """
+        List the blobs of the container, or only those starting with one of the prefixes, and
+        replace what the inventory knew of them. Returns the number of blobs listed. The inventory
+        is left as it was if the listing fails.
+        """
+        from .transfer import scan_concurrently
+
+        prefixes = sorted(set(prefixes or ['']))
+        if '' in prefixes:
+            prefixes = ['']
+        listed = [0]
+        batch = []
+
+        def _add(blob):
+            batch.append(_to_row(blob))
+            if len(batch) >= INSERT_BATCH_SIZE:
+                _flush()
+
+        def _flush():
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO blobs ({}) VALUES (?, ?, ?, ?, ?, ?, ?)'.format(_COLUMNS),
+                batch)
+            listed[0] += len(batch)
+            del batch[:]
+
+        started = time.time()
+        try:
+            for prefix in prefixes:
+                if prefix:
+                    self._connection.execute('DELETE FROM blobs WHERE name >= ? AND name < ?',
+                                             _get_prefix_range(prefix))
+                else:
+                    self._connection.execute('DELETE FROM blobs')
+            leaves = _split_prefixes(client, container_name, prefixes, max_connections, _add)
+            scans = [lambda p=p: client.list_blobs(container_name, prefix=p or None)
+                     for p in leaves]
+            for blob in scan_concurrently(scans, max_connections):
+                _add(blob)
+            _flush()
+            if prefixes == ['']:
+                self._set_property('refreshed', str(started))
+            self._connection.commit()
+        except BaseException:
+            self._connection.rollback()
+            raise
+        return listed[0]
+
+    def blobs(self, prefix=None, pattern=None):
+        """ Yield the blobs starting with prefix and matching pattern, by name, as the models
+        returned by a listing. """
+        from .util import _get_literal_prefix, _match_path
+        if pattern:
+            # the literal part of the pattern is looked up in the index, like a prefix
+            pattern_prefix = _get_literal_prefix(pattern)
+            if pattern_prefix.startswith(prefix or ''):
+                prefix = pattern_prefix
+        query = 'SELECT {} FROM blobs'.format(_COLUMNS)
+        args = ()
+        if prefix:
+            query += ' WHERE name >= ? AND name < ?'
+            args = _get_prefix_range(prefix)
+        for row in self._connection.execute(query + ' ORDER BY name', args):
+            if not pattern or _match_path(pattern, row[0]):
+                yield _to_blob(row)
+
+    def show(self):
+        count, size = self._connection.execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs').fetchone()
+        refreshed = self._get_property('refreshed')
+        return {'path': self.path, 'blobs': count, 'size': size,
+                'refreshed': _to_datetime(float(refreshed)) if refreshed else None}
+
+    def record_upload(self, blob_name, size, result=None, blob_type=None, content_md5=None):
+        """ Record a blob uploaded by a transfer, with the properties returned by the upload. """
+        row = (blob_name, size, blob_type, None,
+               get_timestamp(getattr(result, 'last_modified', None)),
+               getattr(result, 'etag', None), content_md5)
+        with self._lock:
+            self._uploaded.append(row)
+
+    def record_delete(self, blob_name):
+        with self._lock:
+            self._deleted.append((blob_name,))
+
+    def save(self):
+        """ Write the blobs recorded by the transfers. """
+        with self._lock:
+            uploaded, self._uploaded = self._uploaded, []
+            deleted, self._deleted = self._deleted, []
+        self._connection.executemany('DELETE FROM blobs WHERE name = ?', deleted)
+        self._connection.executemany(
+            'INSERT OR REPLACE INTO blobs ({}) VALUES (?, ?, ?, ?, ?, ?, ?)'.format(_COLUMNS),
+            uploaded)
+        self._connection.commit()
+
+
+def open_inventory(client, container_name, create=False):
+    """ The inventory of a container of the account of client, None if it has none and create is
+    False. """
+    path = get_inventory_path(client.account_name, container_name)
+    if not create and not os.path.isfile(path):
+        return None
+    return BlobInventory(path)
+
+
+def _open_existing_inventory(client, container_name):
+    inventory = open_inventory(client, container_name)
+    if inventory is None:
+        raise CLIError("The container '{}' has no inventory, create it with 'az storage blob "
+                       "inventory update'".format(container_name))
+    return inventory
+
+
+def get_inventory_blobs(client, container_name, prefix=None, pattern=None):
+    """ Yield the blobs of the inventory of a container, see BlobInventory.blobs. Raises a
+    CLIError right away if the container has no inventory. """
+    inventory = _open_existing_inventory(client, container_name)
+
+    def _blobs():
+        # the inventory is closed once all the blobs are read
+        with inventory:
+            for blob in inventory.blobs(prefix, pattern):
+                yield blob
+
+    return _blobs()
+
+
+@contextmanager
+def updating_inventory(client, container_name):
+    """ The inventory of the container if it has one, or None, which records the blobs written
+    and deleted by a batch. They are saved on the way out, whether all the transfers succeeded or
+    not. """
+    inventory = open_inventory(client, container_name)
+    if inventory is None:
+        yield None
+        return
+    try:
+        yield inventory
+    finally:
+        try:
+            inventory.save()
+        finally:
+            inventory.close()
+
+
+def storage_blob_inventory_update(client, container_name, prefixes=None, max_connections=8):
+    """
+    List the blobs of a container into its local inventory
+
+    :param list prefixes:
+        Only list the blobs starting with these prefixes again, the other blobs of the inventory
+        are kept as they are.
+
+    :param int max_connections:
+        The maximum number of listings in parallel.
+    """
+    from azure.cli.core.azlogging import get_az_logger
+    with open_inventory(client, container_name, create=True) as inventory:
+        started = time.time()
+        listed = inventory.refresh(client, container_name, prefixes, max_connections)
+        get_az_logger(__name__).info('listed %d blobs in %.1fs', listed,
+                                     time.time() - started)
+        result = inventory.show()
+    result['listed'] = listed
+    return result
+
+
+def storage_blob_inventory_show(client, container_name):
+    """ Show the size and age of the local inventory of a container """
+    with _open_existing_inventory(client, container_name) as inventory:
+        return inventory.show()
+
+
+def storage_blob_inventory_list(client, container_name, prefix=None, pattern=None):
+    """
+    List the blobs of the local inventory of a container, rather than those of the container
+
+    :param str prefix:
+        List only the blobs whose names start with the prefix.
+
+    :param str pattern:
+        List only the blobs whose names match the pattern. The supported patterns are '*', '?',
+        '[seq]', and '[!seq]'.
+    """
+    return get_inventory_blobs(client, container_name, prefix, pattern)
+
+
+def storage_blob_inventory_delete(client, container_name):
+    """ Delete the local inventory of a container """
+    path = get_inventory_path(client.account_name, container_name)
+    if os.path.isfile(path):
+        os.remove(path)
@@ -0,0 +1,242 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+Commands for storage queue message batch operations
+"""
+
+import timeit
+
+from azure.cli.core._util import CLIError
+from azure.cli.core.azlogging import get_az_logger
+
+# the service returns up to 32 messages per request
+MAX_MESSAGES_PER_GET = 32
+
+# how often the rate of a long running drain is reported, in seconds
+PROGRESS_INTERVAL = 10
+
+# the properties of a received message which only mean something to the receiver
+_TRANSIENT_PROPERTIES = ('popReceipt', 'timeNextVisible')
+
+
+# pylint: disable=too-many-arguments
+def storage_message_put_batch(client, queue_name, file_path=None, input_format='text',
+                              visibility_timeout=None, time_to_live=None, max_connections=16,
+                              timeout=None):
+    """
+    Put the messages of a file or of stdin onto a queue
+
+    :param str file_path:
+        The file to read the messages from, stdin if omitted or -.
+
+    :param str input_format:
+        With text, every line is the content of a message. With jsonl, every line is a JSON
+        object whose content property is the content of a message, as written by
+        `storage message drain`.
+
+    :param int max_connections:
+        The maximum number of messages to put in parallel.
+    """
+    from .transfer import run_streamed, widen_connection_pool
+    from .util import open_stream
+
+    logger = get_az_logger(__name__)
+    if input_format not in ('text', 'jsonl'):
+        raise CLIError("Unrecognized value '{}' for --input-format".format(input_format))
+
+    failures = []
+
+    def _messages(stream):
+        for line, text in enumerate(stream, 1):
+            text = text.rstrip('\r\n')
+            if not text.strip():
+                continue
+            content, error = read_message_content(text, input_format)
+            if error:
+                logger.warning('line %d: %s', line, error)
+                failures.append({'line': line, 'error': error})
+            else:
+                yield line, content
+
+    def _put(message):
+        client.put_message(queue_name, message[1], visibility_timeout=visibility_timeout,
+                           time_to_live=time_to_live, timeout=timeout)
+
+    widen_connection_pool(client, max_connections)
+    rate = RateReporter('sent', 'messages')
+    with open_stream(file_path) as stream:
+        for (line, _), _, ex in run_streamed(_put, _messages(stream), max_connections):
+            if ex:
+                error = getattr(ex, 'message', None) or str(ex)
+                logger.warning('line %d: %s', line, error)
+                failures.append({'line': line, 'error': error})
+            else:
+                rate.add(1)
+    rate.done()
+    return {'sent': rate.count, 'failed': sorted(failures, key=lambda f: f['line'])}
+
+
+def storage_message_drain(client, queue_name, file_path=None, max_messages=None,
+                          visibility_timeout=None, max_connections=16, timeout=None):
+    """
+    Receive the messages of a queue, write them to a file and delete them
+
+    The messages are received in batches of 32 by several requests at once until the queue comes
+    back empty. A batch is written to the file, one JSON object per line, before its messages are
+    deleted in parallel. A message whose delete fails, e.g. because it became visible again before
+    it was deleted, may be received again by this or another receiver. The counts of messages
+    received and deleted are returned when the messages are written to a file.
+
+    :param str file_path:
+        The file the messages are appended to, stdout if omitted or -.
+
+    :param int max_messages:
+        Stop after receiving this many messages.
+
+    :param int visibility_timeout:
+        How long the received messages stay invisible to other receivers, in seconds. It must be
+        long enough for them to be written and deleted.
+
+    :param int max_connections:
+        The maximum number of requests to have in flight, receiving or deleting messages.
+    """
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+    from .transfer import widen_connection_pool
+    from .util import open_stream
+
+    logger = get_az_logger(__name__)
+    max_connections = max(1, max_connections)
+    receivers = max(1, max_connections // 4)
+    # don't let the deletes fall too far behind the receivers
+    max_pending_deletes = max_connections * 4
+
+    def _receive(count):
+        return client.get_messages(queue_name, num_messages=count,
+                                   visibility_timeout=visibility_timeout, timeout=timeout)
+
+    def _delete(message):
+        client.delete_message(queue_name, message.id, message.pop_receipt, timeout=timeout)
+        return message
+
+    widen_connection_pool(client, max_connections)
+    rate = RateReporter('drained', 'messages')
+    received = 0
+    reserved = {}
+    failures = []
+    receiving = set()
+    deleting = set()
+
+    def _reap(futures):
+        for future in futures:
+            try:
+                future.result()
+                rate.add(1)
+            except Exception as ex:  # pylint: disable=broad-except
+                error = getattr(ex, 'message', None) or str(ex)
+                logger.warning('failed to delete a message: %s', error)
+                failures.append(error)
+
+    with open_stream(file_path, 'a') as sink, ThreadPoolExecutor(max_connections) as executor:
+        def _receive_more():
+            count = MAX_MESSAGES_PER_GET
+            if max_messages is not None:
+                count = min(count, max_messages - received - sum(reserved.values()))
+            if count > 0:
+                future = executor.submit(_receive, count)
+                reserved[future] = count
+                receiving.add(future)
+
+        for _ in range(receivers):
+            _receive_more()
+        empty = False
+        while receiving:
+            done, receiving = wait(receiving, return_when=FIRST_COMPLETED)
+            for future in done:
+                del reserved[future]
+                messages = future.result()
+                received += len(messages)
+                for message in messages:
+                    sink.write(message_to_json(message) + '\n')
+                sink.flush()
+                deleting.update(executor.submit(_delete, m) for m in messages)
+                # an empty batch means the queue is drained as far as this run is concerned
+                empty = empty or not messages
+
+            finished = set(f for f in deleting if f.done())
+            _reap(finished)
+            deleting -= finished
+            while len(deleting) > max_pending_deletes:
+                finished, deleting = wait(deleting, return_when=FIRST_COMPLETED)
+                _reap(finished)
+
+            while not empty and len(receiving) < receivers and \
+                    (max_messages is None or received + sum(reserved.values()) < max_messages):
+                _receive_more()
+
+        finished, _ = wait(deleting)
+        _reap(finished)
+
+    rate.done()
+    if failures:
+        logger.warning('%d messages were written but could not be deleted', len(failures))
+    if file_path in (None, '-'):
+        # stdout is the sink, keep it to the messages
+        return None
+    return {'received': received, 'deleted': rate.count, 'failed': len(failures)}
+
+
+def read_message_content(text, input_format):
+    """ Returns the content of a message read from a line of input and an error message, either
+    of which is None. """
+    if input_format == 'text':
+        return text, None
+
+    import json
+    try:
+        values = json.loads(text)
+    except ValueError as ex:
+        return None, 'invalid JSON: {}'.format(ex)
+    if not isinstance(values, dict) or 'content' not in values:
+        return None, 'a message must be a JSON object with a content property'
+    return values['content'], None
+
+
+def message_to_json(message):
+    """ Serialize a received message as a single line of JSON, without the properties only the
+    receiver can use. """
+    import json
+    from azure.cli.core._output import ComplexEncoder
+    from azure.cli.core._util import todict
+
+    values = {k: v for k, v in todict(message).items() if k not in _TRANSIENT_PROPERTIES}
+    return json.dumps(values, sort_keys=True, cls=ComplexEncoder)
+
+
+class RateReporter(object):
+    """ Counts the items processed by a long running command, logging the rate at which they go
+    every PROGRESS_INTERVAL seconds and once it is done. """
+
+    def __init__(self, verb, noun):
+        self.verb = verb
+        self.noun = noun
+        self.count = 0
+        self._start = self._last_report = timeit.default_timer()
+        self._logger = get_az_logger(__name__)
+
+    def add(self, count):
+        self.count += count
+        now = timeit.default_timer()
+        if now - self._last_report >= PROGRESS_INTERVAL:
+            self._last_report = now
+            self._report(now)
+
+    def done(self):
+        self._report(timeit.default_timer())
+
+    def _report(self, now):
+        elapsed = max(now - self._start, 1e-6)
+        self._logger.warning('%s %d %s in %.1fs: %.1f %s/s', self.verb, self.count, self.noun,
+                             elapsed, self.count / elapsed, self.noun)
@@ -0,0 +1,164 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+Block blob uploads from memory-mapped files.
+
+When the SDK uploads a large file in blocks, every worker reads its block into a new bytes
+object, and with validate_content the MD5 of the block is computed over that copy. Here the file
+is mapped once and each block is sent as a read-only view into the map: the HTTP layer and the
+MD5 read slices of that view, so no block is copied and the memory held is the page cache of the
+file rather than max_connections blocks.
+
+Page blobs still go through the SDK, its update_page only takes bytes. So do the files which
+can't be mapped, like those larger than the address space of a 32-bit Python.
+"""
+
+import mmap
+import os
+import sys
+import threading
+
+from azure.cli.core._util import CLIError
+
+
+class FileNotMappedError(Exception):
+    """ The file to upload couldn't be mapped, nothing was uploaded. """
+    pass
+
+
+class MemoryViewReader(object):
+    """ A file-like object over a memoryview whose reads return slices of the view rather than
+    copies. Once a read hits the end, the next one starts over, and the SDK is made to rewind the
+    body before every attempt of a request by rewind_request_bodies, so a retried request sends
+    the whole block again. """
+
+    def __init__(self, view):
+        self._view = view
+        self._position = 0
+
+    def __len__(self):
+        return len(self._view)
+
+    def read(self, size=-1):
+        if self._position >= len(self._view):
+            self._position = 0
+            return b''
+        end = len(self._view) if size is None or size < 0 else self._position + size
+        chunk = self._view[self._position:end]
+        self._position += len(chunk)
+        return chunk
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self._position
+        elif whence == os.SEEK_END:
+            offset += len(self._view)
+        self._position = max(0, min(offset, len(self._view)))
+        return self._position
+
+    def tell(self):
+        return self._position
+
+    def close(self):
+        _release(self._view)
+
+
+def rewind_request_bodies(client):
+    """ Have the client rewind seekable request bodies before every attempt of a request, so that
+    retries resend what a failed attempt consumed. """
+    callback = client.request_callback
+    if getattr(callback, 'rewinds_request_bodies', False):
+        return
+
+    def _rewind(request):
+        if isinstance(request.body, MemoryViewReader):
+            request.body.seek(0)
+        if callback:
+            callback(request)
+
+    _rewind.rewinds_request_bodies = True
+    client.request_callback = _rewind
+
+
+def _map_file(f, size):
+    if size > sys.maxsize:
+        raise FileNotMappedError('the file is larger than the address space')
+    try:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OverflowError, EnvironmentError, ValueError) as ex:
+        raise FileNotMappedError(str(ex))
+
+
+def _release(view):
+    """ Release a view, or a map, right away if nothing uses it anymore. Otherwise, e.g. when the
+    traceback of a failed request still holds a slice, it goes with its last reference. """
+    # memoryview.release only exists on Python 3
+    release = getattr(view, 'release', None) or getattr(view, 'close', None)
+    try:
+        release()
+    except BufferError:
+        pass
+
+
+# pylint: disable=too-many-arguments,too-many-locals
+def upload_block_blob_from_mmap(client, container_name, blob_name, file_path, max_connections=2,
+                                validate_content=False, lease_id=None, progress_callback=None,
+                                timeout=None, **commit_kwargs):
+    """
+    Upload a file as a block blob, staging its blocks in parallel from a read-only map of the
+    file, then commit the block list with commit_kwargs passed on to put_block_list. Returns the
+    properties of the committed blob. Raises FileNotMappedError if the file can't be mapped.
+    """
+    from azure.storage.blob.models import BlobBlock
+    from .stream import get_block_id
+    from .transfer import run_streamed
+
+    size = os.path.getsize(file_path)
+    if not size:
+        raise CLIError("Unable to map the empty file '{}'".format(file_path))
+    block_size = getattr(client, 'MAX_BLOCK_SIZE', 4 * 1024 * 1024)
+    count = (size + block_size - 1) // block_size
+
+    lock = threading.Lock()
+    uploaded = [0]
+
+    with open(file_path, 'rb') as f:
+        mapped = _map_file(f, size)
+        rewind_request_bodies(client)
+        try:
+            view = memoryview(mapped)
+            try:
+                def _put_block(index):
+                    reader = MemoryViewReader(view[index * block_size:(index + 1) * block_size])
+                    try:
+                        client.put_block(container_name, blob_name, reader, get_block_id(index),
+                                         validate_content=validate_content, lease_id=lease_id,
+                                         timeout=timeout)
+                    finally:
+                        reader.close()
+                    if progress_callback:
+                        with lock:
+                            uploaded[0] += min(block_size, size - index * block_size)
+                            progress_callback(uploaded[0], size)
+
+                results = run_streamed(_put_block, range(count), max_connections)
+                try:
+                    for index, _, ex in results:
+                        if ex:
+                            raise CLIError('Failed to upload block {} of {}: {}'.format(
+                                index, blob_name, getattr(ex, 'message', None) or ex))
+                finally:
+                    # wait for the blocks in flight before unmapping the file
+                    results.close()
+            finally:
+                _release(view)
+        finally:
+            _release(mapped)
+
+    return client.put_block_list(container_name, blob_name,
+                                 [BlobBlock(id=get_block_id(i)) for i in range(count)],
+                                 validate_content=validate_content, lease_id=lease_id,
+                                 timeout=timeout, **commit_kwargs)
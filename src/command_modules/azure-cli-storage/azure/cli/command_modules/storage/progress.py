@@ -0,0 +1,240 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+Progress of uploads, downloads and copies.
+
+A transfer reports the files and bytes it moves, and the retries of its requests, to a
+TransferProgress. How the progress is shown is picked with the progress setting of the storage
+section of the configuration, or the AZURE_STORAGE_PROGRESS environment variable:
+
+    auto    a status line on stderr when it is a terminal, a log line every 10s otherwise
+    tty     a status line on stderr, rewritten in place
+    json    a JSON progress event per line on stderr, for tools sizing bandwidth or connections
+    log     a log line every 10s
+    off     nothing but the summary logged at the end, visible with --verbose
+
+stdout is left alone, it holds the output of the command or the content of a streamed blob.
+"""
+
+from __future__ import print_function
+
+import json
+import sys
+import threading
+import timeit
+from collections import deque
+
+from azure.cli.core.azlogging import get_az_logger
+
+logger = get_az_logger(__name__)
+
+MB = 1024 * 1024
+
+PROGRESS_MODES = ('auto', 'tty', 'json', 'log', 'off')
+
+# the seconds between two renderings of the status line, two JSON events and two log lines
+RENDER_INTERVALS = {'tty': 0.5, 'json': 1, 'log': 10}
+
+# the instantaneous rate is the rate over the last few seconds
+RATE_WINDOW = 5
+
+
+def get_progress_mode():
+    from azure.cli.core._config import az_config
+    mode = (az_config.get('storage', 'progress', None) or 'auto').lower()
+    if mode not in PROGRESS_MODES:
+        logger.warning("Ignoring the unknown storage progress setting '%s', expected one of %s",
+                       mode, ', '.join(PROGRESS_MODES))
+        mode = 'auto'
+    if mode == 'auto':
+        isatty = getattr(sys.stderr, 'isatty', None)
+        mode = 'tty' if isatty and isatty() else 'log'
+    return mode
+
+
+def format_duration(seconds):
+    seconds = int(round(seconds))
+    return '{:d}:{:02d}:{:02d}'.format(seconds // 3600, seconds // 60 % 60, seconds % 60)
+
+
+class FileProgress(object):
+    """ The progress of one file of a transfer. callback has the signature of the progress
+    callbacks of the SDK, which report the bytes transferred so far and the size of the file, if
+    known. A file whose size wasn't known up front adds it to the total once it is reported. """
+
+    def __init__(self, progress, size):
+        self._progress = progress
+        self._size = size
+        self._reported = 0
+        self._lock = threading.Lock()
+
+    def callback(self, current, total):
+        with self._lock:
+            delta = current - self._reported
+            self._reported = max(self._reported, current)
+            learned_size = total if self._size is None and total else None
+            if learned_size:
+                self._size = total
+        if learned_size:
+            self._progress.expect(learned_size)
+        if delta > 0:
+            self._progress.update(bytes_done=delta)
+
+    def done(self):
+        """ Count the file, and the bytes the callback didn't report. """
+        with self._lock:
+            delta = max(0, (self._size or 0) - self._reported)
+            self._reported += delta
+        self._progress.update(files_done=1, bytes_done=delta)
+
+
+class TransferProgress(object):
+    """
+    The files done, bytes transferred and retries of a transfer, from which the average rate, the
+    rate over the last seconds and the time left are worked out.
+
+    The counters are updated from any thread. The progress is rendered as the counters change, at
+    most once per interval of the mode, and done renders the final state.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+    def __init__(self, operation, files_total=None, bytes_total=None, mode=None, stream=None):
+        self.operation = operation
+        self.files_total = files_total
+        self.bytes_total = bytes_total
+        self.files_done = 0
+        self.files_failed = 0
+        self.bytes_done = 0
+        self.retries = 0
+        self.mode = mode or get_progress_mode()
+        self._stream = stream or sys.stderr
+        self._lock = threading.Lock()
+        self._start = timeit.default_timer()
+        self._samples = deque([(self._start, 0)])
+        self._last_render = self._start
+        self._line_length = 0
+
+    def track_file(self, size):
+        return FileProgress(self, size)
+
+    def update(self, files_done=0, bytes_done=0, files_failed=0, retries=0):
+        with self._lock:
+            self.files_done += files_done
+            self.bytes_done += bytes_done
+            self.files_failed += files_failed
+            self.retries += retries
+            self._tick(timeit.default_timer())
+
+    def expect(self, bytes_total):
+        """ Add bytes to transfer to the total. """
+        with self._lock:
+            self.bytes_total = (self.bytes_total or 0) + bytes_total
+
+    def report(self, files_done, bytes_done, files_failed=0, bytes_total=None):
+        """ Set the counters to what a transfer tracked by polling its status reports. """
+        with self._lock:
+            self.files_done = files_done
+            self.bytes_done = bytes_done
+            self.files_failed = files_failed
+            if bytes_total is not None:
+                self.bytes_total = bytes_total
+            self._tick(timeit.default_timer())
+
+    def watch_retries(self, client):
+        """ Count the retries of the requests of client. Clients of SDKs older than the retry
+        callback don't report retries. """
+        if not hasattr(client, 'retry_callback'):
+            return
+        callback = client.retry_callback
+        # a client used by an earlier transfer still has its callback
+        callback = getattr(callback, 'retry_callback', callback)
+
+        def _retried(retry_context):
+            self.update(retries=1)
+            if callback:
+                callback(retry_context)
+
+        _retried.retry_callback = callback
+        client.retry_callback = _retried
+
+    def snapshot(self, now=None):
+        """ The state of the transfer, as written in JSON progress events. """
+        now = now or timeit.default_timer()
+        elapsed = max(now - self._start, 1e-6)
+        average = self.bytes_done / elapsed
+        oldest_time, oldest_bytes = self._samples[0]
+        rate = (self.bytes_done - oldest_bytes) / (now - oldest_time) \
+            if now - oldest_time >= 1 else average
+        eta = None
+        if self.bytes_total is not None and rate > 0:
+            eta = max(0, self.bytes_total - self.bytes_done) / rate
+        return {'operation': self.operation,
+                'filesDone': self.files_done,
+                'filesFailed': self.files_failed,
+                'filesTotal': self.files_total,
+                'bytesDone': self.bytes_done,
+                'bytesTotal': self.bytes_total,
+                'rateMBps': round(float(rate) / MB, 3),
+                'averageMBps': round(float(average) / MB, 3),
+                'retries': self.retries,
+                'elapsedSeconds': round(elapsed, 1),
+                'etaSeconds': None if eta is None else round(eta, 1)}
+
+    def summary(self, state=None):
+        state = state or self.snapshot()
+        files = '{}/{}'.format(state['filesDone'], state['filesTotal']) \
+            if state['filesTotal'] is not None else str(state['filesDone'])
+        size = '{:.1f}/{:.1f}'.format(float(state['bytesDone']) / MB,
+                                      float(state['bytesTotal']) / MB) \
+            if state['bytesTotal'] is not None else '{:.1f}'.format(float(state['bytesDone']) / MB)
+        parts = ['{}: {} files'.format(state['operation'], files),
+                 '{} MiB'.format(size),
+                 '{:.2f} MiB/s (average {:.2f} MiB/s)'.format(state['rateMBps'],
+                                                              state['averageMBps'])]
+        if state['filesFailed']:
+            parts.append('{} failed'.format(state['filesFailed']))
+        if state['retries']:
+            parts.append('{} retries'.format(state['retries']))
+        if state['etaSeconds'] is not None:
+            parts.append('ETA {}'.format(format_duration(state['etaSeconds'])))
+        else:
+            parts.append('elapsed {}'.format(format_duration(state['elapsedSeconds'])))
+        return ', '.join(parts)
+
+    def done(self):
+        with self._lock:
+            state = self.snapshot()
+            self._render(state, final=True)
+        if self.mode != 'log':
+            logger.info(self.summary(state))
+        return state
+
+    def _tick(self, now):
+        # keep a sample per second over the window of the instantaneous rate
+        if now - self._samples[-1][0] >= 1:
+            self._samples.append((now, self.bytes_done))
+            while len(self._samples) > 1 and now - self._samples[0][0] > RATE_WINDOW:
+                self._samples.popleft()
+        interval = RENDER_INTERVALS.get(self.mode)
+        if interval and now - self._last_render >= interval:
+            self._last_render = now
+            self._render(self.snapshot(now))
+
+    def _render(self, state, final=False):
+        if self.mode == 'tty':
+            line = self.summary(state)
+            # pad over the end of a longer line rendered before
+            padding = ' ' * max(0, self._line_length - len(line))
+            self._line_length = len(line)
+            self._stream.write('\r' + line + padding + ('\n' if final else ''))
+        elif self.mode == 'json':
+            event = dict(state, event='done' if final else 'progress')
+            self._stream.write(json.dumps(event, sort_keys=True) + '\n')
+        else:
+            if self.mode == 'log':
+                logger.warning(self.summary(state))
+            return
+        self._stream.flush()
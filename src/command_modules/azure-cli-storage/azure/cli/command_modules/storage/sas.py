@@ -0,0 +1,171 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+Shared access signatures for many blobs or files at once.
+
+Signing a SAS is an HMAC of a few fields computed locally with the account key, so signing one
+name per invocation of generate-sas is dominated by starting the CLI. The batch commands sign
+every name in one loop, optionally spread over several processes, and write a line with the name
+and its URL as soon as it is signed. Nothing goes over the network but the listing of the names
+when they are given as a pattern.
+"""
+
+import os.path
+from collections import deque
+from itertools import islice
+
+from azure.cli.core._util import CLIError
+
+# the names signed by a worker process at a time
+SIGN_CHUNK_SIZE = 1000
+
+
+def _sign_chunk(account_name, account_key, service, container, names, sas_kwargs):
+    # runs in a worker process, so it has to be a module level function
+    from azure.storage.sharedaccesssignature import SharedAccessSignature
+    sas = SharedAccessSignature(account_name, account_key)
+    if service == 'blob':
+        return [sas.generate_blob(container, name, **sas_kwargs) for name in names]
+    tokens = []
+    for name in names:
+        tokens.append(sas.generate_file(container, os.path.dirname(name) or None,
+                                        os.path.basename(name), **sas_kwargs))
+    return tokens
+
+
+def _read_names(names_file):
+    from .util import open_stream
+    with open_stream(names_file) as stream:
+        for line in stream:
+            name = line.strip()
+            if name:
+                yield name
+
+
+def _get_names(pattern, names_file, list_names):
+    if pattern and names_file:
+        raise CLIError('usage error: --pattern | --names-file')
+    if names_file:
+        return _read_names(names_file)
+    if pattern:
+        return list_names()
+    raise CLIError('usage error: --pattern | --names-file')
+
+
+def generate_sas_tokens(account_name, account_key, service, container, names, processes=1,
+                        **sas_kwargs):
+    """
+    Yield the names of the blobs or files of a container or share with a SAS token for each of
+    them, in the order of names. With more than one process, chunks of names are signed by a pool
+    of processes and only a few chunks per process are signed ahead of what has been yielded.
+    """
+    names = iter(names)
+
+    def _chunks():
+        while True:
+            chunk = list(islice(names, SIGN_CHUNK_SIZE))
+            if not chunk:
+                return
+            yield chunk
+
+    if processes <= 1:
+        for chunk in _chunks():
+            for item in zip(chunk, _sign_chunk(account_name, account_key, service, container,
+                                               chunk, sas_kwargs)):
+                yield item
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        signing = deque()
+        chunks = _chunks()
+        for chunk in chunks:
+            signing.append((chunk, executor.submit(_sign_chunk, account_name, account_key,
+                                                   service, container, chunk, sas_kwargs)))
+            if len(signing) >= processes * 2:
+                chunk, future = signing.popleft()
+                for item in zip(chunk, future.result()):
+                    yield item
+        while signing:
+            chunk, future = signing.popleft()
+            for item in zip(chunk, future.result()):
+                yield item
+
+
+def _write_sas_urls(client, service, container, names, make_url, processes, sas_kwargs):
+    from .util import open_stream
+
+    if not client.account_key:
+        raise CLIError('usage error: signing a SAS needs the account key, use --account-key or '
+                       '--connection-string')
+    with open_stream(None, 'w') as stream:
+        for name, token in generate_sas_tokens(client.account_name, client.account_key, service,
+                                               container, names, processes, **sas_kwargs):
+            stream.write('{}\t{}\n'.format(name, make_url(name, token)))
+
+
+# pylint: disable=too-many-arguments,redefined-builtin
+def storage_blob_generate_sas_batch(client, container_name, pattern=None, names_file=None,
+                                    permission=None, expiry=None, start=None, id=None, ip=None,
+                                    protocol=None, processes=1):
+    """
+    Generate a SAS URL for each of many blobs, written to stdout as tab separated name and URL
+    lines
+
+    :param str pattern:
+        Sign the blobs of the container matching the pattern. The supported patterns are '*', '?',
+        '[seq]', and '[!seq]'.
+
+    :param str names_file:
+        Sign the blobs named in the file, one per line, or in stdin if -. The blobs don't have to
+        exist.
+
+    :param int processes:
+        The number of processes signing at once.
+    """
+    from .util import collect_blobs
+    names = _get_names(pattern, names_file,
+                       lambda: collect_blobs(client, container_name, pattern))
+    _write_sas_urls(client, 'blob', container_name, names,
+                    lambda name, token: client.make_blob_url(container_name, name,
+                                                             sas_token=token),
+                    processes, dict(permission=permission, expiry=expiry, start=start, id=id,
+                                    ip=ip, protocol=protocol))
+
+
+# pylint: disable=too-many-arguments,redefined-builtin
+def storage_file_generate_sas_batch(client, share_name, pattern=None, names_file=None,
+                                    permission=None, expiry=None, start=None, id=None, ip=None,
+                                    protocol=None, processes=1):
+    """
+    Generate a SAS URL for each of many files, written to stdout as tab separated path and URL
+    lines
+
+    :param str pattern:
+        Sign the files of the share whose path matches the pattern. The supported patterns are
+        '*', '?', '[seq]', and '[!seq]'.
+
+    :param str names_file:
+        Sign the files whose paths are in the file, one per line, or in stdin if -. The files
+        don't have to exist.
+
+    :param int processes:
+        The number of processes signing at once.
+    """
+    from .util import glob_files_remotely
+
+    def _list_names():
+        for directory, name in glob_files_remotely(client, share_name, pattern):
+            yield os.path.join(directory, name)
+
+    def _make_url(name, token):
+        return client.make_file_url(share_name, os.path.dirname(name) or None,
+                                    os.path.basename(name), sas_token=token)
+
+    names = _get_names(pattern, names_file, _list_names)
+    _write_sas_urls(client, 'file', share_name, names, _make_url, processes,
+                    dict(permission=permission, expiry=expiry, start=start, id=id, ip=ip,
+                         protocol=protocol))
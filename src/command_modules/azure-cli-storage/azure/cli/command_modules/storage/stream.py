@@ -0,0 +1,166 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+Streaming of blobs from stdin and to stdout.
+
+The SDK uploads and downloads blobs in parallel only from and to seekable files, so piping data
+through used to need a temporary file as large as the blob. Here the blocks of an upload are read
+from the stream in turn and staged by a pool of workers, and the ranges of a download are fetched
+by a pool of workers and written out in order. Either way, only a window of blocks or ranges is
+held in memory at a time.
+"""
+
+import sys
+from collections import deque
+
+from azure.cli.core._util import CLIError
+
+STREAM_PATH = '-'
+
+DEFAULT_STREAM_WINDOW = 64 * 1024 * 1024
+
+
+def is_stream_path(path):
+    return path == STREAM_PATH
+
+
+def get_stdin():
+    """ The binary stdin, Python 3's sys.stdin being text. """
+    return getattr(sys.stdin, 'buffer', sys.stdin)
+
+
+def get_stdout():
+    """ The binary stdout, Python 3's sys.stdout being text. """
+    return getattr(sys.stdout, 'buffer', sys.stdout)
+
+
+def get_window_slots(window, chunk_size, max_connections):
+    """ The number of blocks or ranges which fit in the window, at least one. Workers beyond
+    that would only wait for room. """
+    return max(1, min(window // chunk_size, max(1, max_connections)))
+
+
+def read_chunks(stream, chunk_size):
+    """ Yield the content of a stream in chunks of chunk_size bytes, the last one being shorter.
+    A chunk is only read when the next one is asked for. """
+    while True:
+        chunk = _read_fully(stream, chunk_size)
+        if not chunk:
+            return
+        yield chunk
+        if len(chunk) < chunk_size:
+            return
+
+
+def _read_fully(stream, size):
+    # a pipe may return less than asked for before the end of the stream
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = stream.read(remaining)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
+
+
+# pylint: disable=too-many-arguments,too-many-locals
+def upload_block_blob_from_stream(client, container_name, blob_name, stream, block_size=None,
+                                  max_connections=2, window=DEFAULT_STREAM_WINDOW,
+                                  validate_content=False, lease_id=None, progress_callback=None,
+                                  timeout=None, **commit_kwargs):
+    """
+    Upload a block blob from a stream of unknown length.
+
+    Blocks of block_size bytes are read as workers free up and staged in parallel, so at most one
+    block per worker is held in memory. The block list is committed once the stream ends, with
+    commit_kwargs passed on to put_block_list. progress_callback is called with the bytes staged
+    so far and None as the size of the blob. Returns the properties of the committed blob.
+    """
+    from azure.storage.blob.models import BlobBlock
+    from .transfer import run_streamed
+
+    block_size = block_size or getattr(client, 'MAX_BLOCK_SIZE', 4 * 1024 * 1024)
+    workers = get_window_slots(window, block_size, max_connections)
+
+    def _put_block(item):
+        index, block = item
+        client.put_block(container_name, blob_name, block, get_block_id(index),
+                         validate_content=validate_content, lease_id=lease_id, timeout=timeout)
+
+    count = uploaded = 0
+    for (index, block), _, ex in run_streamed(_put_block,
+                                              enumerate(read_chunks(stream, block_size)), workers):
+        if ex:
+            raise CLIError('Failed to upload block {} of {}: {}'.format(
+                index, blob_name, getattr(ex, 'message', None) or ex))
+        count += 1
+        uploaded += len(block)
+        if progress_callback:
+            progress_callback(uploaded, None)
+
+    return client.put_block_list(container_name, blob_name,
+                                 [BlobBlock(id=get_block_id(i)) for i in range(count)],
+                                 validate_content=validate_content, lease_id=lease_id,
+                                 timeout=timeout, **commit_kwargs)
+
+
+def get_block_id(index):
+    # the ids of the blocks of a blob must all have the same length
+    return '{:032d}'.format(index)
+
+
+def download_blob_to_stream(client, container_name, blob_name, stream, range_size=None,
+                            max_connections=2, window=DEFAULT_STREAM_WINDOW, snapshot=None,
+                            start_range=None, end_range=None, validate_content=False,
+                            lease_id=None, progress_callback=None, timeout=None, **conditions):
+    """
+    Download a blob, or a range of it, to a stream which can only be written in order.
+
+    Ranges of range_size bytes are fetched in parallel and written as soon as the ranges before
+    them are. No more than the window is fetched ahead of what has been written. The ranges are
+    fetched from the version of the blob found first, a blob changing in the meantime fails the
+    download. progress_callback is called with the bytes written so far and the size of the
+    download. Returns the properties of the blob.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    range_size = range_size or getattr(client, 'MAX_CHUNK_GET_SIZE', 4 * 1024 * 1024)
+    blob = client.get_blob_properties(container_name, blob_name, snapshot=snapshot,
+                                      lease_id=lease_id, timeout=timeout, **conditions)
+    size = blob.properties.content_length
+    start = start_range or 0
+    end = size - 1 if end_range is None else min(end_range, size - 1)
+    ranges = deque((offset, min(offset + range_size, end + 1) - 1)
+                   for offset in range(start, end + 1, range_size))
+
+    def _get_range(item):
+        return client.get_blob_to_bytes(container_name, blob_name, snapshot=snapshot,
+                                        start_range=item[0], end_range=item[1],
+                                        validate_content=validate_content, max_connections=1,
+                                        lease_id=lease_id, if_match=blob.properties.etag,
+                                        timeout=timeout).content
+
+    slots = get_window_slots(window, range_size, max_connections)
+    executor = ThreadPoolExecutor(max_workers=slots)
+    fetching = deque()
+    written = 0
+    try:
+        while ranges or fetching:
+            while ranges and len(fetching) < slots:
+                fetching.append(executor.submit(_get_range, ranges.popleft()))
+            content = fetching.popleft().result()
+            stream.write(content)
+            written += len(content)
+            if progress_callback:
+                progress_callback(written, max(0, end + 1 - start))
+        stream.flush()
+    finally:
+        for future in fetching:
+            future.cancel()
+        executor.shutdown(wait=False)
+    return blob
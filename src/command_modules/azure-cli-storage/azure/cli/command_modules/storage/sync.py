@@ -0,0 +1,219 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+Comparison of a local directory with the blobs or files already in the destination, so that a
+sync only uploads what is new or has changed.
+
+Hashing a large tree is CPU bound, so the files the manifest doesn't know are hashed on a pool of
+processes rather than on the upload thread.
+"""
+
+import base64
+import calendar
+import copy
+import hashlib
+import os
+from collections import namedtuple
+
+from azure.cli.core.azlogging import get_az_logger
+
+logger = get_az_logger(__name__)
+
+MANIFEST_FILE_NAME = 'storageSyncManifest.json'
+
+# what the comparison needs to know about a blob or file in the destination. last_modified is a
+# POSIX timestamp and content_md5 the base64 encoded MD5, either may be None if unknown.
+RemoteItem = namedtuple('RemoteItem', ['size', 'last_modified', 'content_md5'])
+
+# below this many bytes to hash, starting worker processes costs more than it saves
+PARALLEL_HASH_THRESHOLD = 32 * 1024 * 1024
+
+# small files are sent to the workers in groups of about this many bytes
+HASH_GROUP_SIZE = 8 * 1024 * 1024
+
+
+def get_timestamp(last_modified):
+    """ Convert the timezone aware last modified time returned by the service to a timestamp. """
+    return calendar.timegm(last_modified.utctimetuple()) if last_modified else None
+
+
+def get_file_md5(path):
+    """ Returns the MD5 of a file encoded the way the service reports Content-MD5. """
+    md5 = hashlib.md5()
+    with open(path, 'rb') as stream:
+        for chunk in iter(lambda: stream.read(4 * 1024 * 1024), b''):
+            md5.update(chunk)
+    return base64.b64encode(md5.digest()).decode('utf-8')
+
+
+def _get_files_md5(paths):
+    # runs in a worker process, so it has to be a module level function
+    return [get_file_md5(path) for path in paths]
+
+
+def _group_by_size(paths, sizes):
+    group, group_size = [], 0
+    for path, size in zip(paths, sizes):
+        if group and group_size + size > HASH_GROUP_SIZE:
+            yield group
+            group, group_size = [], 0
+        group.append(path)
+        group_size += size
+    if group:
+        yield group
+
+
+def get_files_md5(paths, sizes=None, max_workers=None):
+    """
+    Returns the MD5 of the files in paths by path, in the format of get_file_md5. When there is
+    enough to hash, the files are hashed on a pool of up to max_workers processes, one per CPU by
+    default. Small files are hashed in groups to limit the round trips to the workers.
+    """
+    sizes = sizes or [os.path.getsize(path) for path in paths]
+    if len(paths) < 2 or sum(sizes) < PARALLEL_HASH_THRESHOLD or max_workers == 1:
+        return dict((path, get_file_md5(path)) for path in paths)
+
+    from concurrent.futures import ProcessPoolExecutor
+    try:
+        executor = ProcessPoolExecutor(max_workers=max_workers)
+    except (ImportError, NotImplementedError, OSError) as ex:
+        # e.g. platforms without working semaphores
+        logger.debug('Hashing files serially, unable to start worker processes: %s', ex)
+        return dict((path, get_file_md5(path)) for path in paths)
+
+    result = {}
+    with executor:
+        groups = list(_group_by_size(paths, sizes))
+        futures = [executor.submit(_get_files_md5, group) for group in groups]
+        for group, future in zip(groups, futures):
+            result.update(zip(group, future.result()))
+    return result
+
+
+def with_content_md5(content_settings, content_md5, settings_type):
+    """ A copy of the content settings shared by a batch with the Content-MD5 of one file. """
+    settings = copy.copy(content_settings) if content_settings else settings_type()
+    settings.content_md5 = content_md5
+    return settings
+
+
+class FileManifest(object):
+    """
+    The MD5 of local files by absolute path, kept with the size, modification time and inode of
+    the file when it was hashed. A file whose size, modification time and inode haven't changed
+    since is not hashed again. The manifest is persisted in a JSON file under the config
+    directory.
+    """
+
+    def __init__(self, filename):
+        from azure.cli.core._session import Session
+        self._session = Session()
+        try:
+            self._session.load(filename)
+        except ValueError:
+            logger.debug("Discarding unreadable sync manifest '%s'", filename)
+            self._session.data = {}
+        self._changed = False
+
+    @staticmethod
+    def _get_key(stat):
+        # a file replaced by another one, e.g. by a rename, gets another inode even if its size
+        # and modification time match. The inode is 0 where the platform doesn't have any.
+        return [stat.st_size, stat.st_mtime, stat.st_ino]
+
+    def _lookup(self, path, stat):
+        entry = self._session.get(path)
+        # entries written without an inode have 3 items and are hashed again
+        if entry and len(entry) == 4 and entry[:3] == self._get_key(stat):
+            return entry[3]
+        return None
+
+    def _add(self, path, stat, md5):
+        self._session.data[path] = self._get_key(stat) + [md5]
+        self._changed = True
+
+    def get_md5(self, path, stat=None):
+        stat = stat or os.stat(path)
+        md5 = self._lookup(path, stat)
+        if md5 is None:
+            md5 = get_file_md5(path)
+            self._add(path, stat, md5)
+        return md5
+
+    def hash_files(self, paths, max_workers=None):
+        """ Returns the MD5 of the files in paths by path. The files the manifest doesn't know
+        yet are hashed in parallel, see get_files_md5. """
+        result = {}
+        missing = []
+        for path in set(paths):
+            stat = os.stat(path)
+            md5 = self._lookup(path, stat)
+            if md5 is None:
+                missing.append((path, stat))
+            else:
+                result[path] = md5
+        if missing:
+            logger.debug('Hashing %d files', len(missing))
+            hashed = get_files_md5([p for p, _ in missing], [s.st_size for _, s in missing],
+                                   max_workers)
+            for path, stat in missing:
+                self._add(path, stat, hashed[path])
+            result.update(hashed)
+        return result
+
+    def prune(self, folder, paths):
+        """ Forget the files under folder which aren't in paths any more. """
+        prefix = os.path.join(folder, '')
+        paths = set(paths)
+        for path in [p for p in self._session.data if p.startswith(prefix) and p not in paths]:
+            del self._session.data[path]
+            self._changed = True
+
+    def save(self):
+        if self._changed:
+            try:
+                self._session.save_with_retry()
+            except (OSError, IOError) as ex:
+                logger.debug('Unable to save the sync manifest: %s', ex)
+            self._changed = False
+
+
+def get_file_manifest():
+    from azure.cli.core._environment import get_config_dir
+    return FileManifest(os.path.join(get_config_dir(), MANIFEST_FILE_NAME))
+
+
+def plan_sync(local_files, remote_items, manifest=None):
+    """
+    Decide which local files to upload and which remote items to delete.
+
+    local_files is a list of (path, name) tuples and remote_items maps names to RemoteItem. A file
+    is uploaded if there is no item with its name or the sizes differ. Otherwise, if a manifest is
+    given and the item has a Content-MD5, the file is uploaded if the hashes differ. Failing that,
+    the file is uploaded if it was modified after the item. Returns the (path, name) tuples to
+    upload and the names of the remote items without a local file.
+    """
+    if manifest is not None:
+        # hash every file which has to be compared up front, in parallel
+        manifest.hash_files([path for path, name in local_files
+                             if name in remote_items and remote_items[name].content_md5 and
+                             remote_items[name].size == os.path.getsize(path)])
+
+    uploads = []
+    for path, name in local_files:
+        remote = remote_items.get(name)
+        stat = os.stat(path)
+        if remote is None or remote.size != stat.st_size:
+            uploads.append((path, name))
+        elif manifest is not None and remote.content_md5:
+            if manifest.get_md5(path, stat) != remote.content_md5:
+                uploads.append((path, name))
+        elif remote.last_modified is None or stat.st_mtime > remote.last_modified:
+            uploads.append((path, name))
+
+    local_names = set(name for _, name in local_files)
+    extraneous = sorted(name for name in remote_items if name not in local_names)
+    return uploads, extraneous
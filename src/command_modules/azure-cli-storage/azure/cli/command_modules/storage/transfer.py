@@ -0,0 +1,431 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+Scheduling and bookkeeping of batch transfers.
+
+The storage SDK only parallelizes the blocks of a single blob or file, so a batch of small files
+used to be transferred one request at a time. The scheduler below runs many transfers at once
+while keeping the total number of connections within one budget shared by all of them.
+"""
+
+import json
+import math
+import os
+import threading
+import timeit
+from collections import namedtuple
+
+from azure.cli.core._util import CLIError
+from azure.cli.core.azlogging import get_az_logger
+
+logger = get_az_logger(__name__)
+
+MB = 1024 * 1024
+
+# a server-side copy scheduled by a batch, name is the destination blob or file path and copy the
+# copy properties returned by the service
+CopyResult = namedtuple('CopyResult', ['name', 'copy'])
+
+
+class ConnectionBudget(object):
+    """ A counting semaphore whose holders take as many connections as they are going to open. """
+
+    def __init__(self, size):
+        self.size = size
+        self._available = size
+        self._condition = threading.Condition()
+
+    def acquire(self, count):
+        count = min(count, self.size)
+        with self._condition:
+            while self._available < count:
+                self._condition.wait()
+            self._available -= count
+        return count
+
+    def release(self, count):
+        with self._condition:
+            self._available += count
+            self._condition.notify_all()
+
+
+def plan_connections(sizes, max_connections, single_put_size, block_size):
+    """
+    Split the connection budget between concurrent transfers and the blocks of large files.
+
+    A file no larger than single_put_size goes up in one request and gets a single connection.
+    The large files get the share of the budget that matches their share of the bytes, divided
+    evenly between those which can run at the same time. Returns a function mapping the size of a
+    file to the number of connections to transfer it with.
+    """
+    large_sizes = [s for s in sizes if s > single_put_size]
+    total_size = sum(sizes)
+    if not large_sizes or not total_size:
+        return lambda size: 1
+
+    large_share = max_connections * float(sum(large_sizes)) / total_size
+    per_file = max(1, int(large_share / min(len(large_sizes), max_connections)))
+
+    def _connections(size):
+        if size <= single_put_size:
+            return 1
+        blocks = int(math.ceil(float(size) / block_size))
+        return max(1, min(per_file, max_connections, blocks))
+
+    return _connections
+
+
+def run_transfers(transfers, max_connections):
+    """
+    Run transfers concurrently without using more than max_connections connections in total.
+
+    Each transfer is a tuple (size, connections, action) where action is called with the number of
+    connections it may open. Larger transfers start first so that they don't end up waiting for
+    the budget to drain behind a long tail of small ones. Returns the results of the actions in the
+    order of the transfers. The first failure cancels the transfers which haven't started and is
+    raised once the running ones finish.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    transfers = list(transfers)
+    if not transfers:
+        return []
+
+    budget = ConnectionBudget(max(1, max_connections))
+    failed = threading.Event()
+
+    def _run(connections, action):
+        if failed.is_set():
+            # a worker may pick up the next transfer before the others are cancelled
+            return None
+        connections = budget.acquire(connections)
+        try:
+            return action(connections)
+        except BaseException:
+            failed.set()
+            raise
+        finally:
+            budget.release(connections)
+
+    order = sorted(range(len(transfers)), key=lambda i: transfers[i][0], reverse=True)
+    futures = [None] * len(transfers)
+    with ThreadPoolExecutor(max_workers=min(budget.size, len(transfers))) as executor:
+        for index in order:
+            _, connections, action = transfers[index]
+            futures[index] = executor.submit(_run, connections, action)
+        try:
+            return [f.result() for f in futures]
+        except BaseException:
+            for f in futures:
+                f.cancel()
+            raise
+
+
+def run_streamed(function, items, max_workers):
+    """
+    Call function on the items of an iterable with up to max_workers threads, yielding a tuple
+    (item, result, error) for each of them as they complete.
+
+    Unlike run_transfers, the items are only taken from the iterable as workers free up, so that a
+    long stream is processed without reading it all first. A failure doesn't stop the others, the
+    exception is yielded as the error of its item.
+    """
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+    def _call(item):
+        try:
+            return item, function(item), None
+        except Exception as ex:  # pylint: disable=broad-except
+            return item, None, ex
+
+    max_workers = max(1, max_workers)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        running = set()
+        for item in items:
+            if len(running) >= max_workers:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            running.add(executor.submit(_call, item))
+        while running:
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def run_deletes(delete, names, max_connections):
+    """
+    Call delete on the names of an iterable with up to max_connections requests in flight and
+    return a summary of the batch. Names which are already gone or whose pre-conditions don't hold
+    are counted as skipped, any other failure is reported without stopping the batch.
+    """
+    from azure.common import AzureHttpError
+
+    start = timeit.default_timer()
+    deleted = skipped = 0
+    failures = []
+    for name, _, ex in run_streamed(delete, names, max_connections):
+        if ex is None:
+            deleted += 1
+        elif isinstance(ex, AzureHttpError) and ex.status_code in (404, 412):
+            skipped += 1
+        else:
+            error = getattr(ex, 'message', None) or str(ex)
+            logger.warning("failed to delete '%s': %s", name, error)
+            failures.append({'name': name, 'error': error})
+
+    elapsed = max(timeit.default_timer() - start, 1e-6)
+    logger.warning('deleted %d, skipped %d, failed %d in %.1fs: %.1f deletes/s', deleted, skipped,
+                   len(failures), elapsed, deleted / elapsed)
+    return {'deleted': deleted, 'skipped': skipped, 'failed': failures}
+
+
+def scan_concurrently(scans, max_workers, buffer_size=1000):
+    """
+    Iterate the iterables returned by the functions in scans with up to max_workers threads,
+    yielding their items as they arrive.
+
+    The items of different scans are interleaved in no particular order. At most buffer_size items
+    are held waiting for the consumer, which blocks the scans until it catches up. The first
+    failure of a scan is raised once the items received before it have been yielded, and stopping
+    the iteration stops the scans still running.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from six.moves import queue
+
+    results = queue.Queue(maxsize=buffer_size)
+    stopped = threading.Event()
+    item_kind, error_kind, done_kind = range(3)
+
+    def _put(entry):
+        while not stopped.is_set():
+            try:
+                results.put(entry, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def _scan(scan):
+        try:
+            for item in scan():
+                if stopped.is_set():
+                    return
+                _put((item_kind, item))
+        except Exception as ex:  # pylint: disable=broad-except
+            _put((error_kind, ex))
+        finally:
+            _put((done_kind, None))
+
+    scans = list(scans)
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(scans) or 1)))
+    try:
+        for scan in scans:
+            executor.submit(_scan, scan)
+        remaining = len(scans)
+        while remaining:
+            kind, value = results.get()
+            if kind == item_kind:
+                yield value
+            elif kind == error_kind:
+                raise value
+            else:
+                remaining -= 1
+    finally:
+        stopped.set()
+        executor.shutdown(wait=False)
+
+
+def upload_files(client, source_files, upload_action, max_connections, connections_for):
+    """
+    Upload the (path, name) tuples in source_files on the scheduler and report the progress.
+    upload_action is called with the path, the name, the number of connections to use and a
+    progress callback for the SDK, and connections_for maps the size of a file to that number of
+    connections. Returns the results of upload_action in the order of source_files.
+    """
+    from .progress import TransferProgress
+
+    sizes = [os.path.getsize(f[0]) for f in source_files]
+    widen_connection_pool(client, max_connections)
+    progress = TransferProgress('upload', len(source_files), sum(sizes))
+    progress.watch_retries(client)
+
+    def _transfer(path, name, size):
+        def _action(connections):
+            logger.info('uploading %s', path)
+            file_progress = progress.track_file(size)
+            try:
+                result = upload_action(path, name, connections, file_progress.callback)
+            except BaseException:
+                progress.update(files_failed=1)
+                raise
+            file_progress.done()
+            return result
+        return size, connections_for(size), _action
+
+    try:
+        return run_transfers((_transfer(f[0], f[1], size)
+                              for f, size in zip(source_files, sizes)), max_connections)
+    finally:
+        progress.done()
+
+
+def widen_connection_pool(client, max_connections):
+    """ Let the client keep as many connections alive as the batch is going to use. The default
+    pool of the requests session only keeps 10 per host. """
+    from requests.adapters import HTTPAdapter
+    if max_connections > 10:
+        adapter = HTTPAdapter(pool_connections=max_connections, pool_maxsize=max_connections)
+        client.request_session.mount('https://', adapter)
+        client.request_session.mount('http://', adapter)
+
+
+class TransferJournal(object):
+    """
+    A log of the transfers of a batch kept next to the transferred files, so that a batch which
+    is run again can tell which items it already transferred.
+
+    Every record is a JSON line with the source, name, ETag and length of an item and whether its
+    transfer has completed. Lines are appended and flushed as the transfers start and finish, and
+    the last line of an item wins when the journal is loaded. A line cut short by an interruption
+    is ignored.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._records = {}
+        self._lock = threading.Lock()
+        if os.path.isfile(path):
+            line = ''
+            with open(path) as journal:
+                for line in journal:
+                    try:
+                        record = json.loads(line)
+                        self._records[(record['source'], record['name'])] = record
+                    except (ValueError, KeyError, TypeError):
+                        continue
+            if line and not line.endswith('\n'):
+                # terminate the interrupted line so it doesn't swallow the next record
+                with open(path, 'a') as journal:
+                    journal.write('\n')
+
+    def get(self, source, name):
+        return self._records.get((source, name))
+
+    def is_completed(self, source, name, etag, length):
+        record = self.get(source, name)
+        return bool(record and record.get('completed') and record.get('etag') == etag and
+                    record.get('length') == length)
+
+    def record(self, source, name, etag, length, completed):
+        record = {'source': source, 'name': name, 'etag': etag, 'length': length,
+                  'completed': completed}
+        line = json.dumps(record) + '\n'
+        with self._lock:
+            self._records[(source, name)] = record
+            with open(self.path, 'a') as journal:
+                journal.write(line)
+
+
+class CopyProgress(object):
+    """ The last known status of the server-side copies of a batch. """
+
+    def __init__(self, copies):
+        self.copies = dict(copies)
+
+    def pending(self):
+        return [key for key, copy in self.copies.items() if copy.status == 'pending']
+
+    def failed(self):
+        return [(key, copy) for key, copy in self.copies.items()
+                if copy.status not in ('pending', 'success')]
+
+    def counts(self):
+        """ The numbers of copies pending, succeeded and failed, and of bytes copied and to copy
+        as far as the service reported. """
+        counts = {'pending': 0, 'success': 0, 'failed': 0}
+        copied = total = 0
+        for copy in self.copies.values():
+            counts[copy.status if copy.status in counts else 'failed'] += 1
+            done, size = _parse_copy_progress(copy.progress)
+            copied += done
+            total += size
+        return counts['pending'], counts['success'], counts['failed'], copied, total
+
+    def summary(self):
+        pending, succeeded, failed, copied, total = self.counts()
+        return '{} pending, {} succeeded, {} failed, {:.1f} of {:.1f} MiB copied'.format(
+            pending, succeeded, failed, float(copied) / MB, float(total) / MB)
+
+    def report_to(self, transfer_progress):
+        _, succeeded, failed, copied, total = self.counts()
+        transfer_progress.report(succeeded + failed, copied, files_failed=failed,
+                                 bytes_total=total)
+
+
+def _parse_copy_progress(progress):
+    """ The service reports the progress of a copy as 'bytes copied/total bytes'. """
+    try:
+        copied, total = progress.split('/')
+        return int(copied), int(total)
+    except (AttributeError, ValueError):
+        return 0, 0
+
+
+def start_copies(copy_actions, max_connections):
+    """ Call the actions scheduling server-side copies concurrently and return their results in
+    order. Scheduling a copy takes one request, so each action holds a single connection. """
+    return run_transfers(((0, 1, lambda _, action=action: action()) for action in copy_actions),
+                         max_connections)
+
+
+def poll_copies(copies, get_copy, max_connections, report, initial_interval=1, max_interval=30,
+                transfer_progress=None):
+    """
+    Poll the status of server-side copies until none of them is pending.
+
+    copies is a list of CopyResult as returned when the copies were scheduled and get_copy maps a
+    name to the current copy properties. Every round polls all the pending
+    copies concurrently and passes the summary of the batch to report, and to transfer_progress
+    if given. The interval between rounds doubles up to max_interval. Returns the CopyProgress of
+    the batch.
+    """
+    import time
+
+    progress = CopyProgress((c.name, c.copy) for c in copies)
+    if transfer_progress:
+        progress.report_to(transfer_progress)
+    interval = initial_interval
+    pending = progress.pending()
+    while pending:
+        time.sleep(interval)
+        interval = min(interval * 2, max_interval)
+        statuses = run_transfers(((0, 1, lambda _, key=key: get_copy(key)) for key in pending),
+                                 max_connections)
+        progress.copies.update(zip(pending, statuses))
+        report(progress.summary())
+        if transfer_progress:
+            progress.report_to(transfer_progress)
+        pending = progress.pending()
+    return progress
+
+
+def wait_for_copies(copies, get_copy, max_connections):
+    """ Report the progress of the copies of a batch until they complete. Fails if any of them
+    didn't succeed. """
+    from .progress import TransferProgress
+
+    transfer_progress = TransferProgress('copy', len(copies))
+    try:
+        progress = poll_copies(copies, get_copy, max_connections,
+                               lambda summary: logger.info('copying: %s', summary),
+                               transfer_progress=transfer_progress)
+    finally:
+        transfer_progress.done()
+    failed = progress.failed()
+    if failed:
+        raise CLIError('{} of {} copies did not complete:\n{}'.format(
+            len(failed), len(copies), '\n'.join('{} ({}) {}'.format(
+                name, copy.status, copy.status_description or '') for name, copy in failed)))
@@ -5,6 +5,7 @@
 
 import os
 import os.path
+from contextlib import contextmanager
 from fnmatch import fnmatch
 
 
@@ -13,9 +14,6 @@ def collect_blobs(blob_service, container, pattern=None):
     List the blobs in the given blob container, filter the blob by comparing their path to the given
     pattern.
     """
-    # TODO: deal with container which contains more that 5000 files.
-    #       In that case, the listing operation will page the results.
-
     if not blob_service:
         raise ValueError('missing parameter blob_service')
 
@@ -25,8 +23,64 @@ def collect_blobs(blob_service, container, pattern=None):
     if not _pattern_has_wildcards(pattern):
         return [pattern]
     else:
-        return (blob.name for blob in blob_service.list_blobs(container)
-                if _match_path(pattern, blob.name))
+        return (blob.name for blob in _list_matching_blobs(blob_service, container, pattern))
+
+
+def collect_blob_objects(blob_service, container, pattern=None):
+    """
+    Like collect_blobs, but returns the blobs themselves so that their properties are available.
+    A pattern without wildcards naming a blob which doesn't exist selects nothing, like a pattern
+    matching no blob.
+    """
+    if not _pattern_has_wildcards(pattern):
+        from azure.common import AzureMissingResourceHttpError
+        try:
+            return [blob_service.get_blob_properties(container, pattern)]
+        except AzureMissingResourceHttpError:
+            return []
+    else:
+        return _list_matching_blobs(blob_service, container, pattern)
+
+
+def _list_matching_blobs(blob_service, container, pattern):
+    """
+    Lazily list the blobs matching the pattern, following the continuation markers of the service.
+
+    Only the blobs starting with the literal part at the beginning of the pattern are listed. When
+    the pattern goes on to constrain deeper levels of the virtual directory hierarchy, the
+    container is walked one level at a time and the virtual directories the pattern can't match
+    are skipped. A walk lists every virtual directory on its own, so it is only worth it while the
+    pattern can rule some of them out, below that a directory is listed flat.
+    """
+    # no pattern lists every blob
+    pattern = pattern or '*'
+    prefix = _get_literal_prefix(pattern)
+
+    from azure.storage.blob.models import BlobPrefix
+
+    def _list_flat(current):
+        for blob in blob_service.list_blobs(container, prefix=current or None):
+            if _match_path(pattern, blob.name):
+                yield blob
+
+    def _walk(current):
+        for item in blob_service.list_blobs(container, prefix=current or None, delimiter='/'):
+            if isinstance(item, BlobPrefix):
+                if not _can_match_prefix(pattern, item.name):
+                    continue
+                list_directory = _walk if _can_prune_directories(pattern, item.name) \
+                    else _list_flat
+                for blob in list_directory(item.name):
+                    yield blob
+            elif _match_path(pattern, item.name):
+                yield item
+
+    if '/' in pattern[len(prefix):] and _can_prune_directories(pattern, prefix):
+        blobs = _walk(prefix)
+    else:
+        blobs = _list_flat(prefix)
+    for blob in blobs:
+        yield blob
 
 
 def collect_files(file_service, share, pattern=None):
@@ -79,21 +133,46 @@ def glob_files_locally(folder_path, pattern):
                 yield (full_path, full_path[len_folder_path:])
 
 
-def glob_files_remotely(client, share_name, pattern):
+def glob_files_remotely(client, share_name, pattern, max_workers=8):
     """glob the files in remote file share based on the given pattern"""
-    from collections import deque
+    for current_dir, f in glob_file_objects_remotely(client, share_name, pattern, max_workers):
+        yield current_dir, f.name
+
+
+def glob_file_objects_remotely(client, share_name, pattern, max_workers=8):
+    """glob the files in remote file share based on the given pattern, yields the directory and
+    the file object with its listed properties
+
+    The directories are listed by a pool of max_workers threads and the files are yielded as soon
+    as the listing of their directory comes back, while the crawl goes on in the background.
+    Directories whose paths the pattern can't match are not listed."""
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
     from azure.storage.file.models import Directory, File
 
-    queue = deque([""])
-    while len(queue) > 0:
-        current_dir = queue.pop()
-        for f in client.list_directories_and_files(share_name, current_dir):
-            if isinstance(f, File):
-                if (pattern and fnmatch(os.path.join(current_dir, f.name), pattern)) or \
-                   (not pattern):
-                    yield current_dir, f.name
-            elif isinstance(f, Directory):
-                queue.appendleft(os.path.join(current_dir, f.name))
+    def _list(directory):
+        return directory, list(client.list_directories_and_files(share_name, directory))
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    running = set([executor.submit(_list, "")])
+    try:
+        while running:
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                current_dir, items = future.result()
+                for f in items:
+                    path = os.path.join(current_dir, f.name)
+                    if isinstance(f, Directory) and \
+                            (not pattern or _can_match_prefix(pattern, os.path.join(path, ''))):
+                        running.add(executor.submit(_list, path))
+                for f in items:
+                    if isinstance(f, File) and \
+                            (not pattern or fnmatch(os.path.join(current_dir, f.name), pattern)):
+                        yield current_dir, f
+    finally:
+        # the consumer may stop early, don't list what is left
+        for future in running:
+            future.cancel()
+        executor.shutdown(wait=False)
 
 
 def create_short_lived_container_sas(account_name, account_key, container):
@@ -118,6 +197,23 @@ def create_short_lived_share_sas(account_name, account_key, share):
                               protocol='https')
 
 
+@contextmanager
+def open_stream(path, mode='r'):
+    """ Open a file, or stdin or stdout, depending on the mode, when the path is - or None. The
+    standard streams are left open. """
+    import sys
+    if path and path != '-':
+        with open(path, mode) as f:
+            yield f
+    else:
+        stream = sys.stdout if 'w' in mode or 'a' in mode else sys.stdin
+        try:
+            yield stream
+        finally:
+            if stream is sys.stdout:
+                stream.flush()
+
+
 def mkdir_p(path):
     import errno
     try:
@@ -129,6 +225,93 @@ def mkdir_p(path):
             raise
 
 
+def _tokenize_pattern(pattern):
+    """ Split a pattern into literal characters, '*', '?' and character sets like '[a-z]'. """
+    tokens = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '[':
+            end = i + 1
+            if end < len(pattern) and pattern[end] == '!':
+                end += 1
+            if end < len(pattern) and pattern[end] == ']':
+                end += 1
+            end = pattern.find(']', end)
+            if end != -1:
+                tokens.append(pattern[i:end + 1])
+                i = end + 1
+                continue
+        tokens.append(c)
+        i += 1
+    return tokens
+
+
+def _get_literal_prefix(pattern):
+    """ The part of the pattern before its first wildcard. """
+    prefix = []
+    for token in _tokenize_pattern(pattern or ''):
+        if token in ('*', '?') or len(token) > 1:
+            break
+        prefix.append(token)
+    return ''.join(prefix)
+
+
+def _get_match_states(tokens, prefix):
+    """ The positions in the tokens of a pattern reached by matching prefix against it. The
+    pattern is matched like fnmatch does, so the wildcards match '/' as well. """
+
+    def _closure(states):
+        # '*' may match nothing
+        result = set()
+        for i in states:
+            while i < len(tokens) and tokens[i] == '*':
+                result.add(i)
+                i += 1
+            result.add(i)
+        return result
+
+    states = _closure([0])
+    for c in prefix:
+        next_states = []
+        for i in states:
+            if i == len(tokens):
+                continue
+            token = tokens[i]
+            if token == '*':
+                next_states.append(i)
+            elif token == '?' or (len(token) > 1 and fnmatch(c, token)) or token == c:
+                next_states.append(i + 1)
+        states = _closure(next_states)
+        if not states:
+            break
+    return states
+
+
+def _can_match_prefix(pattern, prefix):
+    """ Whether any path starting with prefix can match the pattern. The pattern is matched like
+    fnmatch does, so the wildcards match '/' as well. """
+    return bool(_get_match_states(_tokenize_pattern(pattern), prefix))
+
+
+def _can_prune_directories(pattern, prefix):
+    """ Whether the pattern can rule out virtual directories under prefix. The wildcards match '/'
+    as well, so once a '*' is reached any directory can match, and a '?' matches any character.
+    Only a character set or a literal character met before the next '*' can rule a directory out,
+    wherever matching the prefix left off. """
+    tokens = _tokenize_pattern(pattern)
+
+    def _constrained(state):
+        for token in tokens[state:]:
+            if token == '*':
+                return False
+            if token != '?':
+                return True
+        return False
+
+    return all(_constrained(i) for i in _get_match_states(tokens, prefix))
+
+
 def _pattern_has_wildcards(p):
     return not p or p.find('*') != -1 or p.find('?') != -1 or p.find('[') != -1
 
@@ -0,0 +1,191 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from azure.cli.core._util import CLIError
+from azure.cli.command_modules.storage.entity import (group_entities, partition_range_filters,
+                                                      read_entities, storage_entity_insert_batch,
+                                                      storage_entity_query)
+from azure.cli.command_modules.storage.transfer import scan_concurrently
+
+
+class Test_storage_entity_insert_batch(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _write(self, name, lines):
+        path = os.path.join(self.folder, name)
+        with open(path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        return path
+
+    def test_read_entities_csv(self):
+        path = self._write('entities.csv', ['partitionkey,RowKey,count,name',
+                                            'p,1,5,a', 'p,2,,b', ',3,1,c'])
+        entities = list(read_entities(path))
+        self.assertEqual(entities[0], (2, {'PartitionKey': 'p', 'RowKey': '1', 'count': 5,
+                                           'name': 'a'}, None))
+        self.assertEqual(entities[1][1], {'PartitionKey': 'p', 'RowKey': '2', 'name': 'b'})
+        self.assertEqual(entities[2], (4, None, 'entity requires: PartitionKey'))
+
+    def test_read_entities_json_lines(self):
+        path = self._write('entities.jsonl', [json.dumps({'PartitionKey': 'p', 'RowKey': '1',
+                                                          'count': '5'}),
+                                              '', '{not json', '[1, 2]'])
+        entities = list(read_entities(path))
+        # JSON values keep their type
+        self.assertEqual(entities[0], (1, {'PartitionKey': 'p', 'RowKey': '1', 'count': '5'},
+                                       None))
+        self.assertEqual([e[0] for e in entities], [1, 3, 4])
+        self.assertTrue(entities[1][2].startswith('invalid JSON'))
+        self.assertEqual(entities[2][2], 'an entity must be a JSON object')
+
+    def test_group_entities(self):
+        entities = [(i, {'PartitionKey': 'p{}'.format(i % 2), 'RowKey': str(i)})
+                    for i in range(250)]
+        entities.append((250, {'PartitionKey': 'p0', 'RowKey': '248'}))
+        batches = list(group_entities(entities))
+
+        self.assertEqual([(b.partition_key, len(b.entities)) for b in batches],
+                         [('p0', 100), ('p1', 100), ('p0', 25), ('p1', 25), ('p0', 1)])
+        self.assertEqual(batches[0].lines[:2], [0, 2])
+        # an entity can't appear twice in a batch
+        self.assertEqual(batches[4].lines, [250])
+
+    def test_group_entities_many_partitions(self):
+        read = []
+
+        def _entities():
+            for i in range(1000):
+                read.append(i)
+                yield i, {'PartitionKey': 'p{}'.format(i), 'RowKey': '1'}
+
+        batches = group_entities(_entities(), max_pending=8)
+        first = next(batches)
+        # the oldest batch is yielded once too many partitions are being filled
+        self.assertEqual(first.lines, [0])
+        self.assertEqual(len(read), 9)
+        self.assertEqual(len(list(batches)), 999)
+
+    def test_insert_batch(self):
+        path = self._write('entities.jsonl', [json.dumps({'PartitionKey': 'p{}'.format(i % 3),
+                                                          'RowKey': str(i)})
+                                              for i in range(30)] + ['{}'])
+        client = mock.MagicMock()
+
+        def _commit_batch(table_name, batch, timeout=None):
+            if batch._partition_key == 'p1':  # pylint: disable=protected-access
+                raise ValueError('failed')
+
+        client.commit_batch.side_effect = _commit_batch
+        result = storage_entity_insert_batch(client, 'table', path, if_exists='merge',
+                                             max_connections=2)
+
+        self.assertEqual(result['inserted'], 20)
+        self.assertEqual(result['batches'], 2)
+        failures = sorted(result['failures'], key=lambda f: f['lines'][0])
+        self.assertEqual(failures[0]['lines'], list(range(2, 30, 3)))
+        self.assertEqual(failures[0]['partitionKey'], 'p1')
+        self.assertEqual(failures[1], {'lines': [31],
+                                       'error': 'entity requires: RowKey PartitionKey'})
+        self.assertEqual(client.commit_batch.call_count, 3)
+
+
+class Test_storage_entity_query(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.entities = [{'PartitionKey': key, 'RowKey': str(i), 'etag': 'W/"1"'}
+                         for i, key in enumerate(['a', 'b', 'c', 'k', 'm', 'x', "o'k"])]
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _client(self):
+        def _query_entities(table_name, filter=None, **_):  # pylint: disable=redefined-builtin
+            low = high = None
+            for condition in (filter or '').split(' and '):
+                if 'PartitionKey ge' in condition:
+                    low = condition.split("'", 1)[1].rstrip("')").replace("''", "'")
+                elif 'PartitionKey lt' in condition:
+                    high = condition.split("'", 1)[1].rstrip("')").replace("''", "'")
+            return iter([e for e in self.entities
+                         if (low is None or e['PartitionKey'] >= low) and
+                         (high is None or e['PartitionKey'] < high)])
+
+        client = mock.MagicMock()
+        client.query_entities.side_effect = _query_entities
+        return client
+
+    def test_partition_range_filters(self):
+        self.assertEqual(partition_range_filters([]), [None])
+        self.assertEqual(partition_range_filters([], 'n eq 1'), ['n eq 1'])
+        self.assertEqual(partition_range_filters(['m', 'f', 'm']),
+                         ["PartitionKey lt 'f'",
+                          "(PartitionKey ge 'f') and (PartitionKey lt 'm')",
+                          "PartitionKey ge 'm'"])
+        self.assertEqual(partition_range_filters(["o'k"], 'n eq 1'),
+                         ["(n eq 1) and (PartitionKey lt 'o''k')",
+                          "(n eq 1) and (PartitionKey ge 'o''k')"])
+
+    def test_query_single_page(self):
+        client = self._client()
+        storage_entity_query(client, 'table', num_results=5, marker={'nextpartitionkey': 'a'})
+        client.query_entities.assert_called_once_with('table', filter=None,
+                                                      marker={'nextpartitionkey': 'a'},
+                                                      select=None, num_results=5,
+                                                      property_resolver=None, timeout=None)
+
+    def test_query_partition_ranges(self):
+        client = self._client()
+        result = storage_entity_query(client, 'table', partition_bounds=['c', 'm'],
+                                      max_connections=2)
+        self.assertEqual(client.query_entities.call_count, 3)
+        self.assertIsNone(result['nextMarker'])
+        self.assertEqual(sorted(e['RowKey'] for e in result['items']),
+                         sorted(e['RowKey'] for e in self.entities))
+
+        result = storage_entity_query(client, 'table', partition_bounds=['c', 'm'],
+                                      num_results=2)
+        self.assertEqual(len(result['items']), 2)
+
+        with self.assertRaises(CLIError):
+            storage_entity_query(client, 'table', partition_bounds=['c'], marker='m')
+
+    def test_query_export(self):
+        path = os.path.join(self.folder, 'entities.jsonl')
+        storage_entity_query(self._client(), 'table', partition_bounds=['m'], export_file=path)
+
+        entities = list(read_entities(path))
+        self.assertEqual(sorted(e['PartitionKey'] for _, e, _ in entities),
+                         sorted(e['PartitionKey'] for e in self.entities))
+        self.assertNotIn('etag', entities[0][1])
+
+    def test_scan_concurrently_failure(self):
+        def _failing():
+            yield 1
+            raise ValueError('failed')
+
+        with self.assertRaises(ValueError):
+            list(scan_concurrently([lambda: iter(range(3)), _failing], 2))
+        # the consumer holds the scans back when it doesn't keep up
+        scan = scan_concurrently([lambda: iter(range(100))], 1, buffer_size=2)
+        self.assertEqual(next(scan), 0)
+        scan.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
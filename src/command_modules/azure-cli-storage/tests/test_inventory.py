@@ -0,0 +1,149 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from datetime import datetime
+
+import mock
+from dateutil.tz import tzutc
+from azure.storage.blob.models import Blob, BlobPrefix
+
+from azure.cli.core._util import CLIError
+from azure.cli.command_modules.storage.inventory import \
+    (BlobInventory, get_inventory_blobs, storage_blob_inventory_list,
+     storage_blob_inventory_show, storage_blob_inventory_update, updating_inventory)
+
+
+class _BlobService(object):
+    """ A container listed the way the service lists it, with or without a delimiter. """
+
+    def __init__(self, sizes):
+        self.account_name = 'account'
+        self.sizes = sizes
+        self.listings = []
+        self.lock = threading.Lock()
+
+    def list_blobs(self, container_name, prefix=None, delimiter=None):
+        with self.lock:
+            self.listings.append((prefix, delimiter))
+        prefix = prefix or ''
+        items = []
+        for name in sorted(self.sizes):
+            if not name.startswith(prefix):
+                continue
+            rest = name[len(prefix):]
+            if delimiter and delimiter in rest:
+                directory = BlobPrefix()
+                directory.name = prefix + rest[:rest.index(delimiter) + 1]
+                if not items or items[-1].name != directory.name:
+                    items.append(directory)
+                continue
+            blob = Blob(name)
+            blob.properties.content_length = self.sizes[name]
+            blob.properties.blob_type = 'BlockBlob'
+            blob.properties.last_modified = datetime(2017, 1, 2, tzinfo=tzutc())
+            blob.properties.etag = '"{}"'.format(name)
+            items.append(blob)
+        return items
+
+
+class Test_storage_blob_inventory(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        patcher = mock.patch('azure.cli.command_modules.storage.inventory.get_inventory_path',
+                             lambda account, container: os.path.join(self.directory, account,
+                                                                     container + '.sqlite'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(shutil.rmtree, self.directory)
+
+        self.client = _BlobService({'a.txt': 1, 'logs/1/a.log': 2, 'logs/1/b.log': 3,
+                                    'logs/2/a.log': 4, 'images/a.png': 5})
+
+    def _names(self, **kwargs):
+        return [b.name for b in storage_blob_inventory_list(self.client, 'container', **kwargs)]
+
+    def test_update(self):
+        result = storage_blob_inventory_update(self.client, 'container', max_connections=2)
+        self.assertEqual(result['listed'], 5)
+        self.assertEqual(result['blobs'], 5)
+        self.assertEqual(result['size'], 15)
+        self.assertIsNotNone(result['refreshed'])
+        # the virtual directories were listed on their own
+        self.assertIn(('logs/', None), self.client.listings)
+
+        blob = next(storage_blob_inventory_list(self.client, 'container', prefix='logs/1/'))
+        self.assertEqual(blob.name, 'logs/1/a.log')
+        self.assertEqual(blob.properties.content_length, 2)
+        self.assertEqual(blob.properties.etag, '"logs/1/a.log"')
+        self.assertEqual(blob.properties.last_modified, datetime(2017, 1, 2, tzinfo=tzutc()))
+
+    @mock.patch('azure.cli.command_modules.storage.inventory.MAX_SPLIT_BLOBS', 5)
+    def test_update_directories_of_blobs(self):
+        self.client.sizes = {'logs/{}/{:02d}.log'.format(d, i): 1
+                             for d in 'abcde' for i in range(20)}
+        self.client.sizes['logs/a/x/1.log'] = 1
+        result = storage_blob_inventory_update(self.client, 'container', max_connections=8)
+        self.assertEqual(result['listed'], 101)
+        self.assertEqual(result['blobs'], 101)
+        # the directories holding blobs aren't split further, they are each listed flat
+        self.assertEqual(sorted(c for c in self.client.listings if c[1] is None),
+                         [('logs/{}/'.format(d), None) for d in 'abcde'])
+        self.assertNotIn(('logs/a/x/', '/'), self.client.listings)
+
+    def test_update_prefixes(self):
+        storage_blob_inventory_update(self.client, 'container')
+        del self.client.sizes['logs/1/a.log']
+        del self.client.sizes['a.txt']
+        self.client.sizes['logs/1/c.log'] = 6
+
+        result = storage_blob_inventory_update(self.client, 'container', prefixes=['logs/1/'])
+        self.assertEqual(result['listed'], 2)
+        # the blobs outside of the prefix are kept as they were
+        self.assertEqual(self._names(), ['a.txt', 'images/a.png', 'logs/1/b.log',
+                                         'logs/1/c.log', 'logs/2/a.log'])
+
+    def test_list_pattern(self):
+        storage_blob_inventory_update(self.client, 'container')
+        self.assertEqual(self._names(pattern='logs/*/a.log'), ['logs/1/a.log', 'logs/2/a.log'])
+        self.assertEqual(self._names(pattern='*.png'), ['images/a.png'])
+        self.assertEqual(self._names(prefix='images/', pattern='*.log'), [])
+        self.assertEqual(self._names(prefix='logs/', pattern='*/b.log'), ['logs/1/b.log'])
+
+    def test_refresh_failure_keeps_inventory(self):
+        storage_blob_inventory_update(self.client, 'container')
+        with mock.patch.object(self.client, 'list_blobs', side_effect=ValueError('Server busy')):
+            with self.assertRaises(ValueError):
+                storage_blob_inventory_update(self.client, 'container')
+        self.assertEqual(storage_blob_inventory_show(self.client, 'container')['blobs'], 5)
+
+    def test_no_inventory(self):
+        with self.assertRaises(CLIError):
+            get_inventory_blobs(self.client, 'container')
+        with updating_inventory(self.client, 'container') as inventory:
+            self.assertIsNone(inventory)
+
+    def test_record_changes(self):
+        storage_blob_inventory_update(self.client, 'container')
+        result = mock.MagicMock(etag='"new"', last_modified=datetime(2017, 2, 1, tzinfo=tzutc()))
+        with updating_inventory(self.client, 'container') as inventory:
+            self.assertIsInstance(inventory, BlobInventory)
+            inventory.record_upload('new.txt', 7, result, 'BlockBlob', 'md5==')
+            inventory.record_delete('a.txt')
+
+        blobs = list(get_inventory_blobs(self.client, 'container', prefix='new'))
+        self.assertEqual(len(blobs), 1)
+        self.assertEqual(blobs[0].properties.etag, '"new"')
+        self.assertEqual(blobs[0].properties.content_settings.content_md5, 'md5==')
+        self.assertNotIn('a.txt', self._names())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import unittest
+
+import mock
+from azure.common import AzureHttpError
+from azure.storage.file.models import Directory, File
+
+from azure.cli.core._util import CLIError
+from azure.cli.command_modules.storage._format import transform_file_directory_result
+from azure.cli.command_modules.storage._validators import transform_storage_list_output
+from azure.cli.command_modules.storage.custom import list_share_files
+
+
+class _Listing(object):
+    """ Pages of items listed one at a time, like the list generators of the SDK. """
+
+    def __init__(self, pages, next_marker=None, fail=False):
+        self.pages = pages
+        self.listed = 0
+        self.next_marker = next_marker
+        self.fail = fail
+
+    def __iter__(self):
+        for page in self.pages:
+            self.listed += 1
+            for item in page:
+                yield item
+        if self.fail:
+            raise AzureHttpError('Server busy', 503)
+
+
+class Test_storage_list(unittest.TestCase):
+
+    def test_list_output_is_streamed(self):
+        listing = _Listing([['a', 'b'], ['c']])
+        items = transform_storage_list_output(listing)
+        self.assertEqual(listing.listed, 0)
+        self.assertEqual(next(items), 'a')
+        self.assertEqual(listing.listed, 1)
+        self.assertEqual(list(items), ['b', 'c'])
+
+    @mock.patch('azure.cli.core.azlogging.get_az_logger')
+    def test_list_output_logs_next_marker(self, get_logger):
+        self.assertEqual(list(transform_storage_list_output(_Listing([['a']]))), ['a'])
+        self.assertFalse(get_logger.return_value.warning.called)
+
+        items = list(transform_storage_list_output(_Listing([['a']], next_marker='2!abc')))
+        self.assertEqual(items, ['a'])
+        get_logger.return_value.warning.assert_called_once_with('Next marker: %s', '2!abc')
+
+    def test_list_output_error_of_later_page(self):
+        items = transform_storage_list_output(_Listing([['a']], fail=True))
+        self.assertEqual(next(items), 'a')
+        with self.assertRaises(CLIError):
+            next(items)
+
+    def test_list_share_files(self):
+        directory = Directory('dir')
+        files = [File('a'), File('b')]
+        listing = _Listing([[directory, files[0]], [files[1]]])
+        client = mock.MagicMock()
+        client.list_directories_and_files.return_value = listing
+
+        result = list_share_files(client, 'share', 'path', prefix='p', num_results=10,
+                                  marker='m', exclude_dir=True)
+        client.list_directories_and_files.assert_called_once_with(
+            'share', 'path', num_results=10, marker='m', timeout=None, prefix='p')
+        result = transform_file_directory_result(result)
+        self.assertEqual(next(result), files[0])
+        # the second page isn't listed until it is needed
+        self.assertEqual(listing.listed, 1)
+        self.assertEqual(list(result), [files[1]])
+        self.assertEqual(files[0].type, 'file')
+
+        other_file = File('c')
+        client.list_directories_and_files.return_value = _Listing([[directory, other_file]])
+        result = list(transform_file_directory_result(list_share_files(client, 'share')))
+        self.assertEqual(result, [directory, other_file])
+        self.assertEqual(directory.type, 'dir')
+
+
+if __name__ == '__main__':
+    unittest.main()
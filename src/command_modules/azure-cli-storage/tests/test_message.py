@@ -0,0 +1,120 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import mock
+
+from azure.cli.command_modules.storage.message import (read_message_content,
+                                                       storage_message_drain,
+                                                       storage_message_put_batch)
+
+
+class _QueueService(object):
+    """ A queue holding the messages put on it in memory. """
+
+    def __init__(self, contents=None):
+        self.lock = threading.Lock()
+        self.messages = list(contents or [])
+        self.deleted = []
+        self.fail_content = None
+        self.get_counts = []
+        self.request_session = mock.MagicMock()
+
+    def put_message(self, queue_name, content, **kwargs):
+        if content == self.fail_content:
+            raise ValueError('failed')
+        with self.lock:
+            self.messages.append(content)
+
+    def get_messages(self, queue_name, num_messages=None, **kwargs):
+        from azure.storage.queue.models import QueueMessage
+        with self.lock:
+            self.get_counts.append(num_messages)
+            batch, self.messages = self.messages[:num_messages], self.messages[num_messages:]
+        result = []
+        for content in batch:
+            message = QueueMessage()
+            message.id = 'id-{}'.format(content)
+            message.pop_receipt = 'receipt'
+            message.dequeue_count = 1
+            message.content = content
+            result.append(message)
+        return result
+
+    def delete_message(self, queue_name, message_id, pop_receipt, **kwargs):
+        with self.lock:
+            self.deleted.append(message_id)
+
+
+class Test_storage_message_batch(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _read_json_lines(self, path):
+        with open(path) as f:
+            return [json.loads(line) for line in f]
+
+    def test_read_message_content(self):
+        self.assertEqual(read_message_content('{"a": 1}', 'text'), ('{"a": 1}', None))
+        self.assertEqual(read_message_content('{"content": "x", "id": "1"}', 'jsonl'),
+                         ('x', None))
+        self.assertIsNotNone(read_message_content('{"id": "1"}', 'jsonl')[1])
+        self.assertIsNotNone(read_message_content('{not json', 'jsonl')[1])
+
+    def test_put_batch(self):
+        path = os.path.join(self.folder, 'messages.txt')
+        with open(path, 'w') as f:
+            f.write('\n'.join('message {}'.format(i) for i in range(50)) + '\n\n')
+        client = _QueueService()
+        client.fail_content = 'message 7'
+
+        result = storage_message_put_batch(client, 'queue', path, max_connections=4)
+
+        self.assertEqual(result['sent'], 49)
+        self.assertEqual([f['line'] for f in result['failed']], [8])
+        self.assertEqual(len(client.messages), 49)
+
+    def test_drain_then_replay(self):
+        path = os.path.join(self.folder, 'drained.jsonl')
+        client = _QueueService(['message {}'.format(i) for i in range(100)])
+
+        result = storage_message_drain(client, 'queue', path, max_connections=8)
+
+        self.assertEqual(result, {'received': 100, 'deleted': 100, 'failed': 0})
+        self.assertEqual(client.messages, [])
+        self.assertEqual(len(client.deleted), 100)
+        drained = self._read_json_lines(path)
+        self.assertEqual(sorted(m['content'] for m in drained),
+                         sorted('message {}'.format(i) for i in range(100)))
+        self.assertNotIn('popReceipt', drained[0])
+
+        result = storage_message_put_batch(client, 'queue', path, input_format='jsonl')
+        self.assertEqual(result['sent'], 100)
+        self.assertEqual(len(client.messages), 100)
+
+    def test_drain_max_messages(self):
+        path = os.path.join(self.folder, 'drained.jsonl')
+        client = _QueueService(['message {}'.format(i) for i in range(100)])
+
+        result = storage_message_drain(client, 'queue', path, max_messages=40, max_connections=8)
+
+        self.assertEqual(result['received'], 40)
+        self.assertEqual(len(client.messages), 60)
+        self.assertEqual(len(self._read_json_lines(path)), 40)
+        self.assertTrue(all(0 < count <= 32 for count in client.get_counts))
+
+
+if __name__ == '__main__':
+    unittest.main()
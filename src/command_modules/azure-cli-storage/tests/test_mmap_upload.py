@@ -0,0 +1,127 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import tempfile
+import threading
+import unittest
+
+import mock
+
+from azure.cli.core._util import CLIError
+from azure.cli.command_modules.storage.mmap_upload import (FileNotMappedError, MemoryViewReader,
+                                                           rewind_request_bodies,
+                                                           upload_block_blob_from_mmap)
+
+
+class _BlockBlobService(object):
+    """ Reads the blocks it is given the way the HTTP layer does. """
+
+    MAX_BLOCK_SIZE = 1000
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.staged = {}
+        self.content = None
+        self.request_callback = None
+        self.fail_block = None
+
+    def put_block(self, container_name, blob_name, block, block_id, **kwargs):
+        if block_id == self.fail_block:
+            raise ValueError('failed')
+        chunks = []
+        for chunk in iter(lambda: block.read(256), b''):
+            self.assert_view(chunk)
+            chunks.append(bytes(chunk))
+        with self.lock:
+            self.staged[block_id] = b''.join(chunks)
+
+    @staticmethod
+    def assert_view(chunk):
+        assert isinstance(chunk, memoryview), 'a block was copied'
+
+    def put_block_list(self, container_name, blob_name, block_list, **kwargs):
+        self.content = b''.join(self.staged[b.id] for b in block_list)
+        return kwargs
+
+
+class Test_storage_mmap_upload(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        self.content = os.urandom(3500)
+        os.write(fd, self.content)
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_memory_view_reader(self):
+        reader = MemoryViewReader(memoryview(b'0123456789'))
+        self.assertEqual(len(reader), 10)
+        chunk = reader.read(4)
+        self.assertIsInstance(chunk, memoryview)
+        self.assertEqual(bytes(chunk), b'0123')
+        self.assertEqual(bytes(reader.read()), b'456789')
+        self.assertEqual(reader.read(4), b'')
+        # reading past the end starts over, for a retried request
+        self.assertEqual(bytes(reader.read(2)), b'01')
+        reader.seek(-3, os.SEEK_END)
+        self.assertEqual(reader.tell(), 7)
+        self.assertEqual(bytes(reader.read(10)), b'789')
+
+    def test_rewind_request_bodies(self):
+        calls = []
+        client = mock.MagicMock(request_callback=calls.append)
+        rewind_request_bodies(client)
+        rewind_request_bodies(client)
+
+        reader = MemoryViewReader(memoryview(b'0123456789'))
+        reader.read(5)
+        request = mock.MagicMock(body=reader)
+        client.request_callback(request)
+        self.assertEqual(reader.tell(), 0)
+        # the callback set before is still called, once
+        self.assertEqual(calls, [request])
+
+    def test_upload_block_blob_from_mmap(self):
+        client = _BlockBlobService()
+        progress = []
+        result = upload_block_blob_from_mmap(client, 'container', 'blob', self.path,
+                                             max_connections=3,
+                                             progress_callback=lambda c, t: progress.append(c),
+                                             metadata={'a': 'b'})
+        self.assertEqual(client.content, self.content)
+        self.assertEqual(len(client.staged), 4)
+        self.assertEqual(result['metadata'], {'a': 'b'})
+        self.assertEqual(sorted(progress), [1000, 2000, 3000, 3500])
+        self.assertTrue(getattr(client.request_callback, 'rewinds_request_bodies', False))
+
+    def test_upload_block_blob_from_mmap_failure(self):
+        client = _BlockBlobService()
+        client.fail_block = '{:032d}'.format(2)
+        with self.assertRaises(CLIError):
+            upload_block_blob_from_mmap(client, 'container', 'blob', self.path)
+        self.assertIsNone(client.content)
+
+    def test_upload_block_blob_from_mmap_unmappable_file(self):
+        client = _BlockBlobService()
+        with mock.patch('mmap.mmap', side_effect=OverflowError('cannot fit into an index')):
+            with self.assertRaises(FileNotMappedError):
+                upload_block_blob_from_mmap(client, 'container', 'blob', self.path)
+        self.assertEqual(client.staged, {})
+        self.assertIsNone(client.request_callback)
+
+    def test_upload_blob_falls_back_to_sdk(self):
+        from azure.cli.command_modules.storage.custom import upload_blob
+        client = mock.MagicMock(MAX_SINGLE_PUT_SIZE=1000)
+        with mock.patch('mmap.mmap', side_effect=OverflowError('cannot fit into an index')):
+            upload_blob(client, 'container', 'blob', self.path, blob_type='block')
+        self.assertFalse(client.put_block.called)
+        self.assertEqual(client.create_blob_from_path.call_args[1]['file_path'], self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import unittest
+
+import mock
+from six import StringIO
+
+from azure.cli.command_modules.storage.progress import TransferProgress, get_progress_mode
+
+MB = 1024 * 1024
+
+
+class Test_storage_transfer_progress(unittest.TestCase):
+
+    def setUp(self):
+        self.now = [100.0]
+        patcher = mock.patch('azure.cli.command_modules.storage.progress.timeit.default_timer',
+                             lambda: self.now[0])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_rates_and_eta(self):
+        progress = TransferProgress('upload', 2, 100 * MB, mode='off')
+        for _ in range(10):
+            self.now[0] += 1
+            progress.update(bytes_done=2 * MB)
+        # the rate picks up over the last seconds while the average lags behind
+        for _ in range(5):
+            self.now[0] += 1
+            progress.update(bytes_done=10 * MB)
+        progress.update(files_done=1, retries=1)
+
+        state = progress.snapshot()
+        self.assertEqual(state['bytesDone'], 70 * MB)
+        self.assertEqual(state['filesDone'], 1)
+        self.assertEqual(state['retries'], 1)
+        self.assertEqual(state['rateMBps'], 10)
+        self.assertAlmostEqual(state['averageMBps'], 70.0 / 15, places=3)
+        self.assertEqual(state['etaSeconds'], 3)
+
+    def test_file_progress(self):
+        progress = TransferProgress('download', 2, mode='off')
+        first = progress.track_file(10)
+        first.callback(4, 10)
+        first.callback(4, 10)
+        first.done()
+        # a file of unknown size learns it from the callback
+        second = progress.track_file(None)
+        second.callback(5, 20)
+        self.assertEqual((progress.files_done, progress.bytes_done, progress.bytes_total),
+                         (1, 15, 20))
+        second.callback(20, 20)
+        second.done()
+        self.assertEqual((progress.files_done, progress.bytes_done), (2, 30))
+
+    def test_json_events(self):
+        stream = StringIO()
+        progress = TransferProgress('copy', 3, mode='json', stream=stream)
+        self.now[0] += 2
+        progress.report(1, 5 * MB, bytes_total=10 * MB)
+        self.now[0] += 0.5
+        progress.report(2, 6 * MB, files_failed=1)
+        progress.done()
+
+        events = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual([e['event'] for e in events], ['progress', 'done'])
+        self.assertEqual(events[0]['filesDone'], 1)
+        self.assertEqual(events[0]['bytesTotal'], 10 * MB)
+        self.assertEqual((events[1]['filesDone'], events[1]['filesFailed']), (2, 1))
+
+    def test_status_line(self):
+        stream = StringIO()
+        progress = TransferProgress('upload', 1, 10 * MB, mode='tty', stream=stream)
+        self.now[0] += 1
+        progress.update(bytes_done=5 * MB)
+        progress.update(files_done=1, bytes_done=5 * MB)
+        progress.done()
+
+        lines = stream.getvalue().split('\r')[1:]
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith('upload: 0/1 files, 5.0/10.0 MiB'))
+        self.assertTrue(lines[1].startswith('upload: 1/1 files, 10.0/10.0 MiB'))
+        self.assertTrue(lines[1].endswith('\n'))
+
+    def test_watch_retries(self):
+        calls = []
+        client = mock.MagicMock(retry_callback=calls.append)
+        TransferProgress('upload', mode='off').watch_retries(client)
+        progress = TransferProgress('upload', mode='off')
+        progress.watch_retries(client)
+
+        client.retry_callback('context')
+        self.assertEqual(progress.retries, 1)
+        # the callback set before is still called, once
+        self.assertEqual(calls, ['context'])
+
+    @mock.patch('azure.cli.core._config.az_config')
+    def test_get_progress_mode(self, az_config):
+        az_config.get.return_value = 'JSON'
+        self.assertEqual(get_progress_mode(), 'json')
+        az_config.get.return_value = None
+        with mock.patch('sys.stderr') as stderr:
+            stderr.isatty.return_value = True
+            self.assertEqual(get_progress_mode(), 'tty')
+            stderr.isatty.return_value = False
+            self.assertEqual(get_progress_mode(), 'log')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+from six import StringIO
+
+from azure.cli.core._util import CLIError
+from azure.cli.command_modules.storage.sas import (generate_sas_tokens,
+                                                   storage_blob_generate_sas_batch,
+                                                   storage_file_generate_sas_batch)
+
+ACCOUNT_KEY = 'c2VjcmV0c2VjcmV0c2VjcmV0c2VjcmV0c2VjcmV0'
+
+
+class Test_storage_sas_batch(unittest.TestCase):
+
+    def setUp(self):
+        from azure.storage.blob import BlockBlobService
+        from azure.storage.file import FileService
+        self.blob_service = BlockBlobService('account', ACCOUNT_KEY)
+        self.file_service = FileService('account', ACCOUNT_KEY)
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _run(self, command, *args, **kwargs):
+        stdout = StringIO()
+        with mock.patch('sys.stdout', stdout):
+            command(*args, **kwargs)
+        return [line.split('\t') for line in stdout.getvalue().splitlines()]
+
+    def test_tokens_match_the_sdk(self):
+        names = ['blob{}'.format(i) for i in range(25)]
+        kwargs = dict(permission='r', expiry='2017-01-02T00:00Z', protocol='https')
+        expected = [(n, self.blob_service.generate_blob_shared_access_signature('c', n, **kwargs))
+                    for n in names]
+        with mock.patch('azure.cli.command_modules.storage.sas.SIGN_CHUNK_SIZE', 4):
+            self.assertEqual(list(generate_sas_tokens('account', ACCOUNT_KEY, 'blob', 'c', names,
+                                                      **kwargs)), expected)
+            self.assertEqual(list(generate_sas_tokens('account', ACCOUNT_KEY, 'blob', 'c', names,
+                                                      processes=2, **kwargs)), expected)
+
+    def test_blob_batch_from_names_file(self):
+        names_file = os.path.join(self.folder, 'names.txt')
+        with open(names_file, 'w') as f:
+            f.write('a.txt\n\ndir/b.txt\n')
+        lines = self._run(storage_blob_generate_sas_batch, self.blob_service, 'container',
+                          names_file=names_file, permission='r', expiry='2017-01-02T00:00Z')
+
+        self.assertEqual([name for name, _ in lines], ['a.txt', 'dir/b.txt'])
+        token = self.blob_service.generate_blob_shared_access_signature(
+            'container', 'dir/b.txt', permission='r', expiry='2017-01-02T00:00Z')
+        self.assertEqual(lines[1][1], self.blob_service.make_blob_url('container', 'dir/b.txt',
+                                                                      sas_token=token))
+
+    def test_file_batch_from_pattern(self):
+        from azure.storage.file.models import File
+        self.file_service.list_directories_and_files = mock.MagicMock(
+            return_value=[File('a.txt'), File('b.log')])
+        lines = self._run(storage_file_generate_sas_batch, self.file_service, 'share',
+                          pattern='*.txt', permission='r', expiry='2017-01-02T00:00Z')
+
+        token = self.file_service.generate_file_shared_access_signature(
+            'share', None, 'a.txt', permission='r', expiry='2017-01-02T00:00Z')
+        self.assertEqual(lines, [['a.txt', self.file_service.make_file_url('share', None, 'a.txt',
+                                                                           sas_token=token)]])
+
+    def test_batch_usage_errors(self):
+        with self.assertRaises(CLIError):
+            storage_blob_generate_sas_batch(self.blob_service, 'container')
+        with self.assertRaises(CLIError):
+            storage_blob_generate_sas_batch(self.blob_service, 'container', pattern='*',
+                                            names_file='-')
+        self.blob_service.account_key = None
+        with self.assertRaises(CLIError):
+            storage_blob_generate_sas_batch(self.blob_service, 'container', pattern='a.txt')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import threading
+import time
+import unittest
+
+import mock
+
+from azure.cli.core._util import CLIError
+from azure.cli.command_modules.storage.custom import add_cors, get_logging, list_cors
+from azure.cli.command_modules.storage._validators import transform_logging_list_output
+
+
+class _Properties(object):  # pylint: disable=too-few-public-methods
+
+    def __init__(self, cors, logging):
+        self.cors = cors
+        self.logging = logging
+
+
+class _ServiceClient(object):
+    """ The service properties of one service of one account. """
+
+    def __init__(self, accounts, service, account_name):
+        self.accounts = accounts
+        self.name = service.__name__
+        self.account_name = account_name
+
+    def _get(self, timeout=None):
+        self.accounts.wait()
+        if self.account_name == 'broken':
+            raise ValueError('Server busy')
+        return _Properties(list(self.accounts.cors.get((self.account_name, self.name), [])),
+                           {'read': self.account_name})
+
+    def _set(self, cors=None, timeout=None):
+        self.accounts.wait()
+        if self.account_name == 'broken':
+            raise ValueError('Server busy')
+        self.accounts.cors[(self.account_name, self.name)] = cors
+
+    def __getattr__(self, name):
+        if name.startswith('get_'):
+            return self._get
+        if name.startswith('set_'):
+            return self._set
+        raise AttributeError(name)
+
+
+class _Accounts(object):
+    """ Storage accounts keeping the number of their requests in flight at once. """
+
+    def __init__(self, names):
+        self.names = names
+        self.cors = {}
+        self.lock = threading.Lock()
+        self.in_flight = self.max_in_flight = 0
+
+    def wait(self):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.05)
+        with self.lock:
+            self.in_flight -= 1
+
+    def client(self, service, account_name, account_key, connection_string, sas_token):
+        assert account_key == 'key-' + account_name
+        return _ServiceClient(self, service, account_name)
+
+    def storage_client(self):
+        scf = mock.MagicMock()
+        accounts = []
+        for name in self.names:
+            account = mock.MagicMock(id='/subscriptions/sub/resourceGroups/rg/providers/'
+                                        'Microsoft.Storage/storageAccounts/' + name)
+            account.name = name
+            accounts.append(account)
+        scf.storage_accounts.list.return_value = accounts
+        scf.storage_accounts.list_by_resource_group.return_value = accounts
+        return scf
+
+    @staticmethod
+    def account_key(account_name, resource_group_name=None):
+        assert resource_group_name == 'rg'
+        return 'key-' + account_name
+
+
+class Test_storage_service_properties(unittest.TestCase):
+
+    def _patch(self, accounts):
+        # the keys are looked up through the storage account cache
+        for target, value in [('azure.cli.command_modules.storage.custom.'
+                               'generic_data_service_factory', accounts.client),
+                              ('azure.cli.command_modules.storage.custom.storage_client_factory',
+                               accounts.storage_client),
+                              ('azure.cli.core.commands.storage_account_cache.'
+                               'get_storage_account_key', accounts.account_key)]:
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_services_at_once(self):
+        accounts = _Accounts(['account'])
+        self._patch(accounts)
+        add_cors('bfqt', ['*'], ['GET'], account_name='account', account_key='key-account')
+        self.assertGreater(accounts.max_in_flight, 1)
+        result = list_cors('bfqt', account_name='account', account_key='key-account')
+        self.assertEqual(sorted(result), ['blob', 'file', 'queue', 'table'])
+        self.assertEqual(result['blob'][0].allowed_origins, ['*'])
+
+    def test_fan_out(self):
+        accounts = _Accounts(['b', 'a', 'broken'])
+        self._patch(accounts)
+        result = get_logging('bq', resource_group_name='rg')
+        self.assertEqual([entry['account'] for entry in result], ['a', 'b', 'broken'])
+        self.assertEqual(result[0]['services']['blob'], {'read': 'a'})
+        self.assertEqual(result[1]['services']['queue'], {'read': 'b'})
+        self.assertNotIn('errors', result[0])
+        self.assertEqual(result[2]['errors'], {'blob': 'Server busy', 'queue': 'Server busy'})
+
+        with self.assertRaises(CLIError) as ex:
+            add_cors('b', ['*'], ['GET'], account_names=['a', 'broken'])
+        self.assertIn('1 of 2', str(ex.exception))
+        self.assertEqual(len(accounts.cors[('a', 'BaseBlobService')]), 1)
+
+        with self.assertRaises(CLIError):
+            get_logging('b', account_names=['a', 'missing'])
+
+    def test_fan_out_table(self):
+        result = [{'account': 'a', 'services': {
+            'blob': {'read': True, 'write': False, 'delete': False,
+                     'retentionPolicy': {'days': 7}},
+            'queue': {'read': False, 'write': False, 'delete': False,
+                      'retentionPolicy': {'days': None}}}}]
+        rows = transform_logging_list_output(result)
+        self.assertEqual([(r['Account'], r['Service']) for r in rows],
+                         [('a', 'blob'), ('', 'queue')])
+
+
+if __name__ == '__main__':
+    unittest.main()
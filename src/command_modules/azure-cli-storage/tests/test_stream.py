@@ -0,0 +1,125 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import io
+import random
+import threading
+import time
+import unittest
+
+import mock
+
+from azure.cli.command_modules.storage.stream import (download_blob_to_stream,
+                                                      get_window_slots, read_chunks,
+                                                      upload_block_blob_from_stream)
+
+
+class _TricklingStream(object):
+    """ A pipe returning fewer bytes than asked for. """
+
+    def __init__(self, content):
+        self.stream = io.BytesIO(content)
+        self.reads = 0
+
+    def read(self, size):
+        self.reads += 1
+        return self.stream.read(min(size, 3))
+
+
+class _BlockBlobService(object):
+    """ Keeps the staged blocks and the committed content of a single blob in memory. """
+
+    def __init__(self, content=b''):
+        self.lock = threading.Lock()
+        self.staged = {}
+        self.content = content
+        self.in_flight = self.max_in_flight = 0
+        self.fail_block = None
+
+    def put_block(self, container_name, blob_name, block, block_id, **kwargs):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(random.random() / 100)
+            if block_id == self.fail_block:
+                raise ValueError('failed')
+            self.staged[block_id] = block
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def put_block_list(self, container_name, blob_name, block_list, **kwargs):
+        self.content = b''.join(self.staged[b.id] for b in block_list)
+        return 'committed'
+
+    def get_blob_properties(self, container_name, blob_name, **kwargs):
+        blob = mock.MagicMock()
+        blob.properties.content_length = len(self.content)
+        blob.properties.etag = 'etag'
+        return blob
+
+    def get_blob_to_bytes(self, container_name, blob_name, start_range=None, end_range=None,
+                          if_match=None, **kwargs):
+        assert if_match == 'etag'
+        time.sleep(random.random() / 100)
+        return mock.MagicMock(content=self.content[start_range:end_range + 1])
+
+
+class Test_storage_blob_stream(unittest.TestCase):
+
+    def test_read_chunks(self):
+        stream = _TricklingStream(b'0123456789')
+        self.assertEqual(list(read_chunks(stream, 4)), [b'0123', b'4567', b'89'])
+        self.assertEqual(list(read_chunks(io.BytesIO(b'01234567'), 4)), [b'0123', b'4567'])
+        self.assertEqual(list(read_chunks(io.BytesIO(b''), 4)), [])
+
+    def test_get_window_slots(self):
+        self.assertEqual(get_window_slots(64, 4, 8), 8)
+        self.assertEqual(get_window_slots(16, 4, 8), 4)
+        self.assertEqual(get_window_slots(2, 4, 8), 1)
+
+    def test_upload_from_stream(self):
+        content = bytes(bytearray(random.getrandbits(8) for _ in range(1000)))
+        client = _BlockBlobService()
+        result = upload_block_blob_from_stream(client, 'container', 'blob',
+                                               _TricklingStream(content), block_size=64,
+                                               max_connections=8, window=256)
+        self.assertEqual(result, 'committed')
+        self.assertEqual(client.content, content)
+        self.assertEqual(len(client.staged), 16)
+        # the window holds 4 blocks, so only 4 are staged at once
+        self.assertLessEqual(client.max_in_flight, 4)
+
+    def test_upload_from_empty_stream(self):
+        client = _BlockBlobService(b'old')
+        upload_block_blob_from_stream(client, 'container', 'blob', io.BytesIO(b''), block_size=64)
+        self.assertEqual(client.content, b'')
+
+    def test_upload_from_stream_failure(self):
+        from azure.cli.core._util import CLIError
+        client = _BlockBlobService(b'old')
+        client.fail_block = '{:032d}'.format(3)
+        with self.assertRaises(CLIError):
+            upload_block_blob_from_stream(client, 'container', 'blob', io.BytesIO(b'x' * 1000),
+                                          block_size=64, max_connections=2)
+        self.assertEqual(client.content, b'old')
+
+    def test_download_to_stream(self):
+        content = bytes(bytearray(random.getrandbits(8) for _ in range(1000)))
+        client = _BlockBlobService(content)
+        stream = io.BytesIO()
+        download_blob_to_stream(client, 'container', 'blob', stream, range_size=64,
+                                max_connections=8, window=256)
+        self.assertEqual(stream.getvalue(), content)
+
+        stream = io.BytesIO()
+        download_blob_to_stream(client, 'container', 'blob', stream, range_size=64,
+                                start_range=100, end_range=299, max_connections=4)
+        self.assertEqual(stream.getvalue(), content[100:300])
+
+
+if __name__ == '__main__':
+    unittest.main()
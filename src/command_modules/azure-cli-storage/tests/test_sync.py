@@ -0,0 +1,205 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import mock
+
+from azure.cli.command_modules.storage.sync import (FileManifest, RemoteItem, get_file_md5,
+                                                    get_files_md5, plan_sync)
+
+
+class Test_storage_sync(unittest.TestCase):
+
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.files = []
+        for name, content in (('same', b'same'), ('resized', b'resized'), ('new', b'new'),
+                              ('touched', b'touched')):
+            path = os.path.join(self.source, name)
+            with open(path, 'wb') as f:
+                f.write(content)
+            self.files.append((path, name))
+        self.now = time.time()
+
+    def tearDown(self):
+        shutil.rmtree(self.source)
+
+    def _remote_items(self, md5=False):
+        def _item(name, size, last_modified):
+            content_md5 = get_file_md5(os.path.join(self.source, name)) if md5 else None
+            return RemoteItem(size, last_modified, content_md5)
+
+        return {'same': _item('same', 4, self.now + 60),
+                'resized': _item('resized', 1, self.now + 60),
+                'touched': _item('touched', 7, self.now - 60),
+                'stale': RemoteItem(5, self.now + 60, None)}
+
+    def test_plan_sync_by_modification_time(self):
+        uploads, extraneous = plan_sync(self.files, self._remote_items())
+        self.assertEqual(sorted(n for _, n in uploads), ['new', 'resized', 'touched'])
+        self.assertEqual(extraneous, ['stale'])
+
+    def test_plan_sync_by_md5(self):
+        manifest = FileManifest(os.path.join(self.source, 'manifest.json'))
+        uploads, _ = plan_sync(self.files, self._remote_items(md5=True), manifest)
+        # the content of 'touched' didn't change, only its modification time
+        self.assertEqual(sorted(n for _, n in uploads), ['new', 'resized'])
+
+    def test_file_manifest_caches_md5(self):
+        filename = os.path.join(self.source, 'manifest.json')
+        path = self.files[0][0]
+        manifest = FileManifest(filename)
+        self.assertEqual(manifest.get_md5(path), get_file_md5(path))
+        manifest.save()
+
+        with mock.patch('azure.cli.command_modules.storage.sync.get_file_md5') as get_md5:
+            manifest = FileManifest(filename)
+            self.assertEqual(manifest.get_md5(path), get_file_md5(path))
+            self.assertFalse(get_md5.called)
+
+            with open(path, 'ab') as f:
+                f.write(b'changed')
+            manifest.get_md5(path)
+            self.assertTrue(get_md5.called)
+
+    def test_file_manifest_prune(self):
+        filename = os.path.join(self.source, 'manifest.json')
+        manifest = FileManifest(filename)
+        for path, _ in self.files:
+            manifest.get_md5(path)
+        manifest.prune(self.source, [self.files[0][0]])
+        manifest.save()
+
+        with mock.patch('azure.cli.command_modules.storage.sync.get_file_md5') as get_md5:
+            manifest = FileManifest(filename)
+            manifest.get_md5(self.files[0][0])
+            self.assertFalse(get_md5.called)
+            manifest.get_md5(self.files[1][0])
+            self.assertTrue(get_md5.called)
+
+    def test_get_files_md5_in_parallel(self):
+        paths = [path for path, _ in self.files]
+        expected = dict((path, get_file_md5(path)) for path in paths)
+        with mock.patch('azure.cli.command_modules.storage.sync.PARALLEL_HASH_THRESHOLD', 0), \
+                mock.patch('azure.cli.command_modules.storage.sync.HASH_GROUP_SIZE', 5):
+            self.assertEqual(get_files_md5(paths, max_workers=2), expected)
+
+    def test_file_manifest_hash_files(self):
+        filename = os.path.join(self.source, 'manifest.json')
+        paths = [path for path, _ in self.files]
+        manifest = FileManifest(filename)
+        self.assertEqual(manifest.hash_files(paths),
+                         dict((path, get_file_md5(path)) for path in paths))
+        manifest.save()
+
+        # a file replaced by another one of the same size and modification time is hashed again
+        replaced = paths[0]
+        stat = os.stat(replaced)
+        with open(replaced + '.new', 'wb') as f:
+            f.write(b'sane')
+        os.utime(replaced + '.new', (stat.st_atime, stat.st_mtime))
+        os.rename(replaced + '.new', replaced)
+
+        with mock.patch('azure.cli.command_modules.storage.sync.get_files_md5',
+                        return_value={replaced: 'new md5'}) as get_md5s:
+            manifest = FileManifest(filename)
+            md5s = manifest.hash_files(paths)
+            get_md5s.assert_called_once_with([replaced], [4], None)
+            self.assertEqual(md5s[replaced], 'new md5')
+            self.assertEqual(md5s[paths[1]], get_file_md5(paths[1]))
+
+    def test_file_manifest_discards_entries_without_inode(self):
+        filename = os.path.join(self.source, 'manifest.json')
+        path = self.files[0][0]
+        stat = os.stat(path)
+        manifest = FileManifest(filename)
+        manifest._session.data[path] = [stat.st_size, stat.st_mtime, 'old md5']  # pylint: disable=protected-access
+        self.assertEqual(manifest.get_md5(path), get_file_md5(path))
+
+
+class Test_storage_blob_sync(unittest.TestCase):
+
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        for name in ('a', 'b'):
+            with open(os.path.join(self.source, name), 'wb') as f:
+                f.write(name.encode('utf-8'))
+
+    def tearDown(self):
+        shutil.rmtree(self.source)
+
+    def _blob(self, name, size):
+        from datetime import datetime, timedelta
+        blob = mock.MagicMock()
+        blob.name = name
+        blob.properties.content_length = size
+        blob.properties.last_modified = datetime.utcnow() + timedelta(hours=1)
+        blob.properties.content_settings.content_md5 = None
+        return blob
+
+    def test_blob_sync(self):
+        from azure.cli.command_modules.storage.blob import storage_blob_sync
+
+        client = mock.MagicMock(MAX_SINGLE_PUT_SIZE=64 * 1024 * 1024, MAX_BLOCK_SIZE=4 * 1024 * 1024)
+        client.list_blobs.return_value = [self._blob('a', 1), self._blob('b', 5),
+                                          self._blob('c', 1)]
+        with mock.patch('azure.cli.command_modules.storage.transfer.print', create=True):
+            result = storage_blob_sync(client, self.source, 'container', 'container',
+                                       delete_destination=True, max_connections=2)
+
+        self.assertEqual(result, {'uploaded': ['b'], 'deleted': ['c'], 'unchanged': 1})
+        self.assertEqual(client.create_blob_from_path.call_args[1]['blob_name'], 'b')
+        self.assertEqual(client.delete_blob.call_args[0], ('container', 'c'))
+
+    def test_blob_sync_lists_prefix_of_pattern(self):
+        from azure.cli.command_modules.storage.blob import storage_blob_sync
+
+        client = mock.MagicMock()
+        client.list_blobs.return_value = [self._blob('a', 1), self._blob('ab', 1)]
+        result = storage_blob_sync(client, self.source, 'container', 'container', pattern='a*',
+                                   delete_destination=True, dryrun=True)
+        self.assertEqual(client.list_blobs.call_args[1]['prefix'], 'a')
+        self.assertEqual(result, {'uploaded': [], 'deleted': [], 'unchanged': 1})
+
+    def test_blob_upload_batch_put_md5(self):
+        from azure.cli.command_modules.storage.blob import storage_blob_upload_batch
+        from azure.storage.blob.models import ContentSettings
+
+        client = mock.MagicMock(MAX_SINGLE_PUT_SIZE=64 * 1024 * 1024, MAX_BLOCK_SIZE=4 * 1024 * 1024)
+        source_files = [(os.path.join(self.source, name), name) for name in ('a', 'b')]
+        manifest = FileManifest(os.path.join(self.source, 'manifest.json'))
+        with mock.patch('azure.cli.command_modules.storage.sync.get_file_manifest',
+                        return_value=manifest), \
+                mock.patch('azure.cli.command_modules.storage.transfer.print', create=True):
+            storage_blob_upload_batch(client, self.source, 'container', source_files=source_files,
+                                      destination_container_name='container', blob_type='block',
+                                      content_settings=ContentSettings(content_type='text/plain'),
+                                      put_md5=True)
+
+        settings = dict((c[1]['blob_name'], c[1]['content_settings'])
+                        for c in client.create_blob_from_path.call_args_list)
+        for path, name in source_files:
+            self.assertEqual(settings[name].content_md5, get_file_md5(path))
+            self.assertEqual(settings[name].content_type, 'text/plain')
+
+    def test_blob_sync_dryrun(self):
+        from azure.cli.command_modules.storage.blob import storage_blob_sync
+
+        client = mock.MagicMock()
+        client.list_blobs.return_value = [self._blob('c', 1)]
+        result = storage_blob_sync(client, self.source, 'container', 'container',
+                                   delete_destination=True, dryrun=True)
+        self.assertEqual(result, {'uploaded': [], 'deleted': [], 'unchanged': 0})
+        self.assertFalse(client.create_blob_from_path.called)
+        self.assertFalse(client.delete_blob.called)
+
+
+if __name__ == '__main__':
+    unittest.main()
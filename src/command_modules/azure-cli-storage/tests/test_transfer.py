@@ -0,0 +1,391 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import mock
+
+from azure.cli.command_modules.storage.transfer import (ConnectionBudget, CopyResult,
+                                                        TransferJournal, plan_connections,
+                                                        poll_copies, run_transfers)
+
+MB = 1024 * 1024
+
+
+class Test_storage_transfer(unittest.TestCase):
+
+    def test_plan_connections_small_files(self):
+        connections_for = plan_connections([MB] * 1000, 8, 64 * MB, 4 * MB)
+        self.assertEqual(connections_for(MB), 1)
+
+    def test_plan_connections_mixed_sizes(self):
+        # one large file holding most of the bytes gets most of the budget
+        connections_for = plan_connections([1024 * MB] + [MB] * 100, 8, 64 * MB, 4 * MB)
+        self.assertEqual(connections_for(1024 * MB), 7)
+        self.assertEqual(connections_for(MB), 1)
+
+        # large files running side by side split their share
+        connections_for = plan_connections([1024 * MB] * 4, 8, 64 * MB, 4 * MB)
+        self.assertEqual(connections_for(1024 * MB), 2)
+
+        # never more connections than blocks
+        connections_for = plan_connections([65 * MB], 32, 64 * MB, 4 * MB)
+        self.assertEqual(connections_for(65 * MB), 17)
+
+    def test_connection_budget(self):
+        self.assertEqual(ConnectionBudget(4).acquire(10), 4)
+
+        budget = ConnectionBudget(4)
+        self.assertEqual(budget.acquire(3), 3)
+        acquired = threading.Event()
+
+        def _acquire():
+            budget.acquire(2)
+            acquired.set()
+
+        thread = threading.Thread(target=_acquire)
+        thread.start()
+        self.assertFalse(acquired.wait(0.1))
+        budget.release(3)
+        thread.join()
+        self.assertTrue(acquired.is_set())
+
+    def test_run_transfers_within_budget(self):
+        lock = threading.Lock()
+        state = {'running': 0, 'peak': 0}
+        release = threading.Event()
+
+        def _action(connections):
+            with lock:
+                state['running'] += connections
+                state['peak'] = max(state['peak'], state['running'])
+                if state['running'] == 4:
+                    release.set()
+            release.wait(5)
+            with lock:
+                state['running'] -= connections
+            return connections
+
+        transfers = [(1, 1, _action)] * 20 + [(100, 3, _action)]
+        results = run_transfers(transfers, 4)
+        self.assertEqual(results, [1] * 20 + [3])
+        self.assertEqual(state['peak'], 4)
+
+    def test_run_transfers_failure(self):
+        def _fail(_):
+            raise ValueError('failed')
+
+        action = mock.MagicMock(return_value=None)
+        with self.assertRaises(ValueError):
+            run_transfers([(2, 1, _fail)] + [(1, 1, action)] * 100, 1)
+        # the larger transfer runs first, its failure cancels the others
+        self.assertFalse(action.called)
+
+    def test_transfer_journal(self):
+        folder = tempfile.mkdtemp()
+        try:
+            path = os.path.join(folder, 'journal')
+            journal = TransferJournal(path)
+            journal.record('c', 'a', '0x1', 10, completed=False)
+            journal.record('c', 'b', '0x2', 20, completed=False)
+            journal.record('c', 'a', '0x1', 10, completed=True)
+            with open(path, 'a') as f:
+                f.write('{"source": "c", "name": "b", "et')
+
+            journal = TransferJournal(path)
+            self.assertTrue(journal.is_completed('c', 'a', '0x1', 10))
+            self.assertFalse(journal.is_completed('c', 'a', '0x3', 10))
+            self.assertFalse(journal.is_completed('c', 'b', '0x2', 20))
+            self.assertFalse(journal.is_completed('other', 'a', '0x1', 10))
+
+            journal.record('c', 'b', '0x2', 20, completed=True)
+            self.assertTrue(TransferJournal(path).is_completed('c', 'b', '0x2', 20))
+        finally:
+            shutil.rmtree(folder)
+
+
+def _copy(status, progress=None):
+    return mock.MagicMock(status=status, progress=progress, status_description=None)
+
+
+class Test_storage_copy_batch(unittest.TestCase):
+
+    @mock.patch('time.sleep')
+    def test_poll_copies(self, sleep):
+        statuses = {'a': iter([_copy('pending', '5/10'), _copy('success', '10/10')]),
+                    'b': iter([_copy('failed', '0/20')])}
+        copies = [CopyResult('a', _copy('pending', '0/10')), CopyResult('b', _copy('pending')),
+                  CopyResult('c', _copy('success', '30/30'))]
+        report = mock.MagicMock()
+        progress = poll_copies(copies, lambda name: next(statuses[name]), 4, report)
+
+        self.assertEqual(progress.pending(), [])
+        self.assertEqual([name for name, _ in progress.failed()], ['b'])
+        self.assertEqual(report.call_args_list[0][0][0],
+                         '1 pending, 1 succeeded, 1 failed, 0.0 of 0.0 MiB copied')
+        # the interval between the polls backs off
+        self.assertEqual([c[0][0] for c in sleep.call_args_list], [1, 2])
+
+    @mock.patch('time.sleep')
+    def test_blob_copy_batch_wait(self, _):
+        from azure.cli.command_modules.storage.blob import storage_blob_copy_batch
+        from azure.cli.core._util import CLIError
+
+        client = mock.MagicMock(account_name='account')
+        client.copy_blob.side_effect = lambda container, name, url: _copy('pending')
+        client.make_blob_url.side_effect = lambda container, name: name
+        client.get_blob_properties.side_effect = \
+            lambda container, name: mock.MagicMock(properties=mock.MagicMock(
+                copy=_copy('failed' if name == 'b' else 'success')))
+        source_client = mock.MagicMock(account_name='account')
+        source_client.list_blobs.return_value = [mock.MagicMock(), mock.MagicMock()]
+        source_client.list_blobs.return_value[0].name = 'a'
+        source_client.list_blobs.return_value[1].name = 'b'
+
+        result = storage_blob_copy_batch(client, source_client, 'destination', 'source',
+                                         pattern='*')
+        self.assertEqual(result, ['a', 'b'])
+        self.assertFalse(client.get_blob_properties.called)
+
+        with self.assertRaises(CLIError) as context:
+            storage_blob_copy_batch(client, source_client, 'destination', 'source', pattern='*',
+                                    wait=True)
+        self.assertIn('1 of 2 copies did not complete', str(context.exception))
+
+
+class _BlobService(object):
+    """ Serves the content of a few blobs the way the SDK's get_blob_to_path does. """
+
+    def __init__(self, blobs):
+        self.blobs = blobs
+        self.calls = []
+
+    def _blob(self, name):
+        content, etag = self.blobs[name]
+        blob = mock.MagicMock()
+        blob.name = name
+        blob.properties.etag = etag
+        blob.properties.content_length = len(content)
+        return blob
+
+    def list_blobs(self, _, prefix=None, **kwargs):
+        return [self._blob(name) for name in sorted(self.blobs) if name.startswith(prefix or '')]
+
+    def get_blob_to_path(self, _, name, path, open_mode='wb', start_range=None, end_range=None,
+                         if_match=None, **kwargs):
+        from azure.common import AzureHttpError
+        content, etag = self.blobs[name]
+        self.calls.append((name, start_range))
+        if if_match and if_match != etag:
+            raise AzureHttpError('precondition failed', 412)
+        with open(path, open_mode) as f:
+            f.write(content[start_range or 0:(end_range + 1) if end_range else None])
+        return self._blob(name)
+
+
+class Test_storage_blob_download_batch(unittest.TestCase):
+
+    def setUp(self):
+        self.destination = tempfile.mkdtemp()
+        self.service = _BlobService({'a.txt': (b'a' * 10, '0x1'),
+                                     'dir/b.txt': (b'b' * 100, '0x2')})
+
+    def tearDown(self):
+        shutil.rmtree(self.destination)
+
+    def _download(self):
+        from azure.cli.command_modules.storage.blob import storage_blob_download_batch
+        self.service.calls = []
+        return storage_blob_download_batch(self.service, 'container', self.destination,
+                                           'container', pattern='*', max_connections=4)
+
+    def _read(self, name):
+        with open(os.path.join(self.destination, name), 'rb') as f:
+            return f.read()
+
+    def test_download_batch_skips_completed_blobs(self):
+        self.assertEqual(sorted(self._download()), ['a.txt', 'dir/b.txt'])
+        self.assertEqual(self._read('dir/b.txt'), b'b' * 100)
+        self.assertEqual(len(self.service.calls), 2)
+
+        self._download()
+        self.assertEqual(self.service.calls, [])
+
+        # a changed blob is downloaded again
+        self.service.blobs['a.txt'] = (b'c' * 5, '0x3')
+        self._download()
+        self.assertEqual(self.service.calls, [('a.txt', None)])
+        self.assertEqual(self._read('a.txt'), b'c' * 5)
+
+    def test_download_batch_resumes_partial_blob(self):
+        from azure.cli.command_modules.storage.blob import DOWNLOAD_JOURNAL_FILE_NAME
+
+        os.mkdir(os.path.join(self.destination, 'dir'))
+        with open(os.path.join(self.destination, 'dir', 'b.txt.partial'), 'wb') as f:
+            f.write(b'b' * 40)
+        journal = TransferJournal(os.path.join(self.destination, DOWNLOAD_JOURNAL_FILE_NAME))
+        journal.record('container', 'dir/b.txt', '0x2', 100, completed=False)
+
+        self._download()
+        self.assertIn(('dir/b.txt', 40), self.service.calls)
+        self.assertEqual(self._read('dir/b.txt'), b'b' * 100)
+        self.assertFalse(os.path.exists(os.path.join(self.destination, 'dir', 'b.txt.partial')))
+
+    def test_download_batch_restarts_changed_partial_blob(self):
+        from azure.cli.command_modules.storage.blob import DOWNLOAD_JOURNAL_FILE_NAME
+
+        with open(os.path.join(self.destination, 'a.txt.partial'), 'wb') as f:
+            f.write(b'x' * 4)
+        journal = TransferJournal(os.path.join(self.destination, DOWNLOAD_JOURNAL_FILE_NAME))
+        journal.record('container', 'a.txt', '0x0', 10, completed=False)
+
+        self._download()
+        self.assertIn(('a.txt', None), self.service.calls)
+        self.assertEqual(self._read('a.txt'), b'a' * 10)
+
+
+class Test_storage_blob_upload_batch(unittest.TestCase):
+
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        for i in range(10):
+            with open(os.path.join(self.source, 'file{}'.format(i)), 'wb') as f:
+                f.write(b'x' * i)
+
+    def tearDown(self):
+        shutil.rmtree(self.source)
+
+    def test_upload_batch_uploads_every_file(self):
+        from azure.cli.command_modules.storage.blob import storage_blob_upload_batch
+        from azure.cli.command_modules.storage.util import glob_files_locally
+
+        client = mock.MagicMock(MAX_SINGLE_PUT_SIZE=64 * MB, MAX_BLOCK_SIZE=4 * MB)
+        source_files = list(glob_files_locally(self.source, None))
+        with mock.patch('azure.cli.command_modules.storage.transfer.print', create=True):
+            storage_blob_upload_batch(client, self.source, 'container', source_files=source_files,
+                                      destination_container_name='container', blob_type='block',
+                                      max_connections=4)
+
+        uploaded = sorted(c[1]['blob_name'] for c in client.create_blob_from_path.call_args_list)
+        self.assertEqual(uploaded, sorted('file{}'.format(i) for i in range(10)))
+        self.assertTrue(all(c[1]['max_connections'] == 1
+                            for c in client.create_blob_from_path.call_args_list))
+
+    def test_upload_batch_large_blobs_single_connection(self):
+        from azure.cli.command_modules.storage.blob import storage_blob_upload_batch
+        from azure.cli.command_modules.storage.util import glob_files_locally
+
+        # until storage SDK issue #190 is fixed, blobs larger than a single put aren't uploaded
+        # over several connections
+        client = mock.MagicMock(MAX_SINGLE_PUT_SIZE=4, MAX_BLOCK_SIZE=1)
+        source_files = list(glob_files_locally(self.source, None))
+        with mock.patch('azure.cli.command_modules.storage.transfer.print', create=True):
+            storage_blob_upload_batch(client, self.source, 'container', source_files=source_files,
+                                      destination_container_name='container', blob_type='block')
+
+        self.assertEqual(client.create_blob_from_path.call_count, 10)
+        self.assertTrue(all(c[1]['max_connections'] == 1
+                            for c in client.create_blob_from_path.call_args_list))
+
+
+class Test_storage_file_upload_batch(unittest.TestCase):
+
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        for path in ('a.txt', os.path.join('x', 'b.txt'), os.path.join('x', 'y', 'c.txt'),
+                     os.path.join('x', 'y', 'd.txt'), os.path.join('z', 'e.txt')):
+            path = os.path.join(self.source, path)
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with open(path, 'wb') as f:
+                f.write(b'x')
+
+    def tearDown(self):
+        shutil.rmtree(self.source)
+
+    def test_upload_batch_creates_directories_once(self):
+        from azure.cli.command_modules.storage.file import storage_file_upload_batch
+
+        client = mock.MagicMock(MAX_RANGE_SIZE=4 * MB)
+        client.make_file_url.side_effect = lambda _, directory, name: os.path.join(directory, name)
+        with mock.patch('azure.cli.command_modules.storage.transfer.print', create=True):
+            urls = storage_file_upload_batch(client, 'share', self.source, max_connections=4)
+
+        self.assertEqual(sorted(urls), sorted(['a.txt', os.path.join('x', 'b.txt'),
+                                               os.path.join('x', 'y', 'c.txt'),
+                                               os.path.join('x', 'y', 'd.txt'),
+                                               os.path.join('z', 'e.txt')]))
+        created = [c[1]['directory_name'] for c in client.create_directory.call_args_list]
+        self.assertEqual(sorted(created[:2]), ['x', 'z'])
+        self.assertEqual(created[2:], [os.path.join('x', 'y')])
+        self.assertTrue(all(c[1]['max_connections'] == 1
+                            for c in client.create_file_from_path.call_args_list))
+
+
+class Test_storage_delete_batch(unittest.TestCase):
+
+    def _blob(self, name, last_modified):
+        from datetime import datetime
+        blob = mock.MagicMock()
+        blob.name = name
+        blob.properties.last_modified = datetime(2016, last_modified, 1)
+        return blob
+
+    def test_blob_delete_batch(self):
+        from datetime import datetime
+        from azure.common import AzureHttpError
+        from azure.cli.command_modules.storage.blob import storage_blob_delete_batch
+
+        client = mock.MagicMock()
+        client.list_blobs.return_value = [self._blob('logs/{}'.format(i), i) for i in range(1, 7)]
+
+        def _delete_blob(_, name, **kwargs):
+            if name == 'logs/2':
+                raise AzureHttpError('not found', 404)
+            if name == 'logs/3':
+                raise AzureHttpError('This operation is not permitted because the blob has '
+                                     'snapshots.', 409)
+
+        client.delete_blob.side_effect = _delete_blob
+        result = storage_blob_delete_batch(client, 'container', 'container', pattern='logs/*',
+                                           if_unmodified_since=datetime(2016, 4, 15),
+                                           max_connections=2)
+
+        self.assertEqual(result['deleted'], 2)
+        self.assertEqual(result['skipped'], 1)
+        self.assertEqual([f['name'] for f in result['failed']], ['logs/3'])
+        self.assertIn('--delete-snapshots', result['failed'][0]['error'])
+        # the blobs modified since weren't even sent a request
+        self.assertEqual(sorted(c[0][1] for c in client.delete_blob.call_args_list),
+                         ['logs/1', 'logs/2', 'logs/3', 'logs/4'])
+
+    def test_blob_delete_batch_dryrun(self):
+        from azure.cli.command_modules.storage.blob import storage_blob_delete_batch
+
+        client = mock.MagicMock()
+        client.list_blobs.return_value = [self._blob('a', 1)]
+        result = storage_blob_delete_batch(client, 'container', 'container', dryrun=True)
+        self.assertEqual(result, {'deleted': 0, 'skipped': 0, 'failed': []})
+        self.assertFalse(client.delete_blob.called)
+
+    def test_file_delete_batch(self):
+        from azure.cli.command_modules.storage.file import storage_file_delete_batch
+
+        client = mock.MagicMock()
+        with mock.patch('azure.cli.command_modules.storage.util.glob_files_remotely',
+                        return_value=iter([('', 'a.txt'), ('x', 'b.txt')])):
+            result = storage_file_delete_batch(client, 'share', pattern='*.txt')
+
+        self.assertEqual(result, {'deleted': 2, 'skipped': 0, 'failed': []})
+        calls = sorted((c[0] for c in client.delete_file.call_args_list), key=lambda c: c[2])
+        self.assertEqual(calls, [('share', None, 'a.txt'), ('share', 'x', 'b.txt')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,182 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import threading
+import unittest
+
+import mock
+
+from azure.cli.command_modules.storage.util import (collect_blobs, collect_blob_objects,
+                                                    glob_files_remotely,
+                                                    _can_match_prefix, _can_prune_directories,
+                                                    _get_literal_prefix)
+
+
+class _BlobService(object):
+    """ Lists blob names with the prefix and delimiter semantics of the service. """
+
+    def __init__(self, names):
+        self.names = sorted(names)
+        self.calls = []
+
+    def list_blobs(self, _, prefix=None, delimiter=None):
+        from azure.storage.blob.models import Blob, BlobPrefix
+        self.calls.append((prefix, delimiter))
+        prefix = prefix or ''
+        results = []
+        for name in self.names:
+            if not name.startswith(prefix):
+                continue
+            rest = name[len(prefix):]
+            if delimiter and delimiter in rest:
+                item = BlobPrefix()
+                item.name = prefix + rest[:rest.index(delimiter) + 1]
+                if not results or results[-1].name != item.name:
+                    results.append(item)
+            else:
+                results.append(Blob(name=name))
+        return results
+
+
+class Test_storage_util(unittest.TestCase):
+
+    def setUp(self):
+        self.service = _BlobService(['readme.txt',
+                                     'logs/2016-12/01.log', 'logs/2016-12/01.txt',
+                                     'logs/2017-01/01.log', 'logs/2017-01/deep/01.log',
+                                     'logs/2017-02/01.log', 'images/a.png'])
+
+    def test_get_literal_prefix(self):
+        self.assertEqual(_get_literal_prefix('logs/2017-0?/*.log'), 'logs/2017-0')
+        self.assertEqual(_get_literal_prefix('logs/[0-9]*'), 'logs/')
+        self.assertEqual(_get_literal_prefix('*.log'), '')
+        self.assertEqual(_get_literal_prefix('readme.txt'), 'readme.txt')
+        self.assertEqual(_get_literal_prefix(None), '')
+
+    def test_can_match_prefix(self):
+        self.assertTrue(_can_match_prefix('logs/2017-0?/*.log', 'logs/2017-01/'))
+        self.assertFalse(_can_match_prefix('logs/2017-0?/*.log', 'logs/2016-12/'))
+        self.assertTrue(_can_match_prefix('logs/[!0]*/x', 'logs/2016/'))
+        self.assertFalse(_can_match_prefix('logs/[!2]*/x', 'logs/2016/'))
+        # wildcards match the delimiter as well, like fnmatch does
+        self.assertTrue(_can_match_prefix('logs/*/01.log', 'logs/2017-01/deep/'))
+        self.assertFalse(_can_match_prefix('a?/b', 'abc/'))
+
+    def test_can_prune_directories(self):
+        self.assertTrue(_can_prune_directories('logs/2017-0?/*.log', 'logs/2017-0'))
+        self.assertFalse(_can_prune_directories('logs/2017-0?/*.log', 'logs/2017-01/'))
+        self.assertTrue(_can_prune_directories('logs/[ab]?/x/*', 'logs/ab/'))
+        self.assertFalse(_can_prune_directories('logs/[ab]*/x/*', 'logs/ab/'))
+        self.assertFalse(_can_prune_directories('*/01.log', ''))
+
+    def test_collect_blobs_flat_listing_with_prefix(self):
+        names = collect_blobs(self.service, 'container', 'logs/2017*')
+        self.assertEqual(self.service.calls, [])  # names are listed lazily
+        self.assertEqual(list(names), ['logs/2017-01/01.log', 'logs/2017-01/deep/01.log',
+                                       'logs/2017-02/01.log'])
+        self.assertEqual(self.service.calls, [('logs/2017', None)])
+
+    def test_collect_blobs_prunes_virtual_directories(self):
+        names = list(collect_blobs(self.service, 'container', 'logs/2017-0?/*.log'))
+        self.assertEqual(names, ['logs/2017-01/01.log', 'logs/2017-01/deep/01.log',
+                                 'logs/2017-02/01.log'])
+        # below the months nothing can be ruled out, each month is listed flat
+        self.assertEqual(self.service.calls, [('logs/2017-0', '/'), ('logs/2017-01/', None),
+                                              ('logs/2017-02/', None)])
+
+        self.service.calls = []
+        names = list(collect_blobs(self.service, 'container', 'logs/[!2]*/*.log'))
+        self.assertEqual(names, [])
+        self.assertEqual(self.service.calls, [('logs/', '/')])
+
+        self.service.calls = []
+        names = list(collect_blobs(self.service, 'container', 'logs/2017-0[12]/d*/*.log'))
+        self.assertEqual(names, ['logs/2017-01/deep/01.log'])
+        self.assertEqual(self.service.calls, [('logs/2017-0', '/'), ('logs/2017-01/', '/'),
+                                              ('logs/2017-01/deep/', None),
+                                              ('logs/2017-02/', '/')])
+
+    def test_collect_blobs_flat_listing_when_nothing_can_be_pruned(self):
+        # any virtual directory can match a leading '*', one flat listing beats walking them all
+        names = list(collect_blobs(self.service, 'container', 'l*/2016-??/*.txt'))
+        self.assertEqual(names, ['logs/2016-12/01.txt'])
+        self.assertEqual(self.service.calls, [('l', None)])
+
+        self.service.calls = []
+        names = list(collect_blobs(self.service, 'container', '*/01.log'))
+        self.assertEqual(len(names), 4)
+        self.assertEqual(self.service.calls, [(None, None)])
+
+    def test_collect_blobs_without_pattern(self):
+        self.assertEqual(list(collect_blobs(self.service, 'container')), self.service.names)
+        self.assertEqual([b.name for b in collect_blob_objects(self.service, 'container')],
+                         self.service.names)
+        self.assertEqual(self.service.calls, [(None, None), (None, None)])
+
+    def test_collect_blob_objects_missing_blob(self):
+        from azure.common import AzureMissingResourceHttpError
+        service = mock.MagicMock()
+        service.get_blob_properties.side_effect = AzureMissingResourceHttpError('not found', 404)
+        self.assertEqual(collect_blob_objects(service, 'container', 'missing.txt'), [])
+        self.assertFalse(service.list_blobs.called)
+
+    def test_collect_blobs_without_wildcards(self):
+        service = mock.MagicMock()
+        self.assertEqual(collect_blobs(service, 'container', 'readme.txt'), ['readme.txt'])
+        self.assertFalse(service.list_blobs.called)
+
+
+class _FileService(object):
+    """ Lists the directories and files of a share made of the given file paths. """
+
+    def __init__(self, paths):
+        self.paths = paths
+        self.listed = []
+        self.blocked = {}
+
+    def list_directories_and_files(self, _, directory_name):
+        from azure.storage.file.models import Directory, File
+        if directory_name in self.blocked:
+            self.blocked[directory_name].wait(5)
+        self.listed.append(directory_name)
+        prefix = directory_name + '/' if directory_name else ''
+        items = {}
+        for path in self.paths:
+            if path.startswith(prefix):
+                rest = path[len(prefix):]
+                name = rest.split('/')[0]
+                items[name] = Directory(name) if '/' in rest else File(name)
+        return [items[name] for name in sorted(items)]
+
+
+class Test_storage_file_globbing(unittest.TestCase):
+
+    def setUp(self):
+        self.service = _FileService(['readme.txt', 'a/1.txt', 'a/b/2.txt', 'a/b/c/3.log',
+                                     'd/4.txt', 'e/f/5.txt'])
+
+    def test_glob_files_remotely(self):
+        files = sorted(glob_files_remotely(self.service, 'share', None))
+        self.assertEqual(files, [('', 'readme.txt'), ('a', '1.txt'), ('a/b', '2.txt'),
+                                 ('a/b/c', '3.log'), ('d', '4.txt'), ('e/f', '5.txt')])
+
+    def test_glob_files_remotely_prunes_directories(self):
+        files = sorted(glob_files_remotely(self.service, 'share', 'a/b/*.txt'))
+        self.assertEqual(files, [('a/b', '2.txt')])
+        self.assertEqual(sorted(self.service.listed), ['', 'a', 'a/b', 'a/b/c'])
+
+    def test_glob_files_remotely_streams_files(self):
+        # the files found so far are yielded while a directory is still being listed
+        release = threading.Event()
+        self.service.blocked['a/b'] = release
+        files = glob_files_remotely(self.service, 'share', None)
+        found = [next(files), next(files), next(files)]
+        self.assertNotIn(('a/b', '2.txt'), found)
+        release.set()
+        self.assertEqual(len(found + list(files)), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
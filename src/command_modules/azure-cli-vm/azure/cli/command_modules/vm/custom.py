@@ -40,10 +40,9 @@ logger = azlogging.get_az_logger(__name__)
 
 
 def get_resource_group_location(resource_group_name):
-    from azure.mgmt.resource.resources import ResourceManagementClient
-    client = get_mgmt_service_client(ResourceManagementClient)
-    # pylint: disable=no-member
-    return client.resource_groups.get(resource_group_name).location
+    from azure.cli.core.commands.resource_group_cache import \
+        get_resource_group_location as _get_cached_location
+    return _get_cached_location(resource_group_name)
 
 
 def get_vm(resource_group_name, vm_name, expand=None):
@@ -755,13 +754,11 @@ def enable_boot_diagnostics(resource_group_name, vm_name, storage):
     if urlparse(storage).scheme:
         storage_uri = storage
     else:
-        storage_mgmt_client = _get_storage_management_client()
-        storage_accounts = storage_mgmt_client.storage_accounts.list()
-        storage_account = next((a for a in list(storage_accounts)
-                                if a.name.lower() == storage.lower()), None)
+        from azure.cli.core.commands.storage_account_cache import get_storage_account_info
+        storage_account = get_storage_account_info(storage)
         if storage_account is None:
             raise CLIError('{} does\'t exist.'.format(storage))
-        storage_uri = storage_account.primary_endpoints.blob
+        storage_uri = storage_account['endpoints']['blob']
 
     if (vm.diagnostics_profile and
             vm.diagnostics_profile.boot_diagnostics and
@@ -801,30 +798,23 @@ def get_boot_log(resource_group_name, vm_name):
     blob_uri = virtual_machine.instance_view.boot_diagnostics.serial_console_log_blob_uri
 
     # Find storage account for diagnostics
-    storage_mgmt_client = _get_storage_management_client()
+    from azure.cli.core.commands.storage_account_cache import get_storage_account_info
     if not blob_uri:
         raise CLIError('No console log available')
-    try:
-        storage_accounts = storage_mgmt_client.storage_accounts.list()
-        matching_storage_account = (a for a in list(storage_accounts)
-                                    if blob_uri.startswith(a.primary_endpoints.blob))
-        storage_account = next(matching_storage_account)
-    except StopIteration:
+    # the account name is the first label of the blob endpoint's host name
+    storage_account_name = urlparse(blob_uri).netloc.split('.')[0]
+    storage_account = get_storage_account_info(storage_account_name)
+    if not storage_account or not storage_account['endpoints'].get('blob') or \
+            not blob_uri.startswith(storage_account['endpoints']['blob']):
         raise CLIError('Failed to find storage accont for console log file')
 
-    regex = r'/subscriptions/[^/]+/resourceGroups/(?P<rg>[^/]+)/.+'
-    match = re.search(regex, storage_account.id, re.I)
-    rg = match.group('rg')
-    # Get account key
-    keys = storage_mgmt_client.storage_accounts.list_keys(rg, storage_account.name)
-
     # Extract container and blob name from url...
     container, blob = urlparse(blob_uri).path.split('/')[-2:]
 
     storage_client = get_data_service_client(
         BlockBlobService,
-        storage_account.name,
-        keys.keys[0].value,
+        storage_account_name,
+        storage_account['keys'][0],
         endpoint_suffix=CLOUD.suffixes.storage_endpoint)  # pylint: disable=no-member
 
     class StreamWriter(object):  # pylint: disable=too-few-public-methods